@@ -0,0 +1,107 @@
+"""
+Serve recorded store pages locally, standing in for the real stores.
+
+Every store gets its own port, so per-host request budgets apply per store as they do
+against the real shops. Pages are available at http://127.0.0.1:<port>/<query>/<page>,
+where the query has spaces replaced with underscores; missing pages return 404.
+
+Usage (from the repository root):
+    python -m benchmarks.fixture_server [--latency 0.3] [--jitter 0.1]
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from benchmarks.fixtures import FIXTURES_DIR, load_manifest, page_path, query_slug
+
+
+def make_handler(store, queries, fixtures_dir, latency, jitter):
+    """
+    Build a request handler serving the recorded pages of a store.
+
+    Parameters:
+    - store: str, the store name
+    - queries: dict, recorded queries mapped to numbers of recorded pages
+    - fixtures_dir: str, the fixtures directory
+    - latency: float, mean response delay in seconds
+    - jitter: float, maximum deviation of the delay from the mean in seconds
+
+    Returns:
+    - BaseHTTPRequestHandler subclass
+    """
+    # Load pages once, so serving does not touch the disk
+    pages = {}
+
+    for query, page_count in queries.items():
+        for page in range(1, page_count + 1):
+            with open(page_path(fixtures_dir, store, query, page), 'rb') as f:
+                pages[(query_slug(query), str(page))] = f.read()
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+            parts = unquote(self.path.split("?")[0]).strip("/").split("/")
+            content = pages.get(tuple(parts)) if len(parts) == 2 else None
+
+            if content is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def serve(fixtures_dir=FIXTURES_DIR, latency=0.0, jitter=0.0, ports=None):
+    """
+    Serve recorded pages of every store until the process is stopped.
+
+    Parameters:
+    - fixtures_dir: str, the fixtures directory
+    - latency: float, mean response delay in seconds
+    - jitter: float, maximum deviation of the delay from the mean in seconds
+    - ports: multiprocessing.Queue, receives a dict of store names mapped to their ports once serving (optional)
+    """
+    manifest = load_manifest(fixtures_dir)
+    store_ports = {}
+
+    for store, queries in manifest["stores"].items():
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(store, queries, fixtures_dir, latency, jitter))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        store_ports[store] = server.server_address[1]
+
+    if ports is not None:
+        ports.put(store_ports)
+    else:
+        for store, port in store_ports.items():
+            print(f"{store:<24} http://127.0.0.1:{port}/")
+
+    threading.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded store pages")
+    parser.add_argument('--latency', type=float, default=0.0, help="mean response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="maximum deviation of the delay in seconds")
+    parser.add_argument('--fixtures-dir', default=FIXTURES_DIR, help="directory with recorded pages")
+    args = parser.parse_args()
+
+    serve(args.fixtures_dir, args.latency, args.jitter)
+
+
+if __name__ == "__main__":
+    main()
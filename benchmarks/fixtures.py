@@ -0,0 +1,93 @@
+import json
+import os
+import re
+
+
+# Recorded store pages, kept out of the repository
+FIXTURES_DIR = os.path.join('benchmarks', 'fixtures')
+MANIFEST_FILE = 'manifest.json'
+
+# Queries recorded by default, a mix of broad and narrow searches
+DEFAULT_QUERIES = [
+    "мультитул leatherman",
+    "турнікет",
+    "плитоноска",
+    "рюкзак",
+    "берці",
+    "тактичні рукавиці",
+]
+
+
+def store_slug(name):
+    """
+    Turn a store name into a directory name.
+
+    Parameters:
+    - name: str, the store name
+
+    Returns:
+    - str, the directory name
+    """
+    return re.sub(r'\W+', '-', name.lower()).strip('-')
+
+
+def query_slug(query):
+    """
+    Turn a normalized query into a directory name, also used as the query part of fixture URLs.
+
+    Parameters:
+    - query: str, the normalized query
+
+    Returns:
+    - str, the directory name
+    """
+    return query.replace(" ", "_")
+
+
+def page_path(fixtures_dir, store, query, page):
+    """
+    Build the path of a recorded page.
+
+    Parameters:
+    - fixtures_dir: str, the fixtures directory
+    - store: str, the store name
+    - query: str, the normalized query
+    - page: int, the page number
+
+    Returns:
+    - str, the path of the page file
+    """
+    return os.path.join(fixtures_dir, store_slug(store), query_slug(query), f"{page}.html")
+
+
+def load_manifest(fixtures_dir=FIXTURES_DIR):
+    """
+    Load the description of recorded fixtures.
+
+    Parameters:
+    - fixtures_dir: str, the fixtures directory
+
+    Returns:
+    - dict with 'recorded_at' timestamp and 'stores' mapping store names to {query: number of recorded pages}
+    """
+    manifest_path = os.path.join(fixtures_dir, MANIFEST_FILE)
+
+    if not os.path.isfile(manifest_path):
+        raise FileNotFoundError(f"No fixtures found at {fixtures_dir}, record them with 'python -m benchmarks.record_fixtures'")
+
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, fixtures_dir=FIXTURES_DIR):
+    """
+    Save the description of recorded fixtures.
+
+    Parameters:
+    - manifest: dict, see load_manifest()
+    - fixtures_dir: str, the fixtures directory
+    """
+    os.makedirs(fixtures_dir, exist_ok=True)
+
+    with open(os.path.join(fixtures_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
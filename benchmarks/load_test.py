@@ -0,0 +1,374 @@
+"""
+Load test the bot with concurrent synthetic Telegram chats.
+
+Drives handle_message of telegram-bot.py with fake private and group chat messages, while
+stores are served from recorded pages by the fixture server. Every chat sends messages one
+after another, group chats also send unrelated messages which the bot must ignore. Telegram
+API calls are simulated with a fixed delay.
+
+Reports end-to-end reply latency, time to the first reply (the search placeholder),
+event loop lag and saturation of the default thread pool at each number of chats.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test [--chats 10 50 100] [--messages 3] [--group-share 0.3]
+                                   [--latency 0.3] [--jitter 0.1] [--no-cache]
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+# Modules of lib log into the logs directory
+os.makedirs('logs', exist_ok=True)
+
+from telegram import Chat
+
+from lib import http_client, scraper, websites_scraper
+from lib.bot_usage import UsageRecorder
+from lib.parse_pool import ParsePool, PARSE_WORKERS
+from lib.result_cache import ResultCache
+from lib.store_registry import store_registry
+
+from benchmarks.fixtures import FIXTURES_DIR, load_manifest
+from benchmarks.report import build_report, format_report, percentile, save_report, summarize_latencies
+from benchmarks.run_benchmark import start_fixture_server, point_websites_at_fixtures
+
+
+def load_bot():
+    """
+    Import telegram-bot.py as a module, its name is not a valid module name.
+
+    Returns:
+    - module, the bot module
+    """
+    spec = importlib.util.spec_from_file_location("telegram_bot", "telegram-bot.py")
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    return bot
+
+
+class TrackingExecutor(ThreadPoolExecutor):
+    def __init__(self, max_workers):
+        """
+        Thread pool counting submitted work items which have not finished yet.
+
+        Parameters:
+        - max_workers: int, number of worker threads
+        """
+        super().__init__(max_workers=max_workers)
+        self.workers = max_workers
+        self.pending = 0
+        self.lock = threading.Lock()
+
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Submit a work item, counting it as pending until it finishes.
+        """
+        with self.lock:
+            self.pending += 1
+
+        future = super().submit(fn, *args, **kwargs)
+        future.add_done_callback(self.on_done)
+        return future
+
+
+    def on_done(self, future):
+        """
+        Done callback of submitted work items.
+        """
+        with self.lock:
+            self.pending -= 1
+
+
+class LoopMonitor:
+    def __init__(self, executor, interval=0.05):
+        """
+        Samples event loop lag and thread pool usage while the load runs.
+
+        Lag is how much later than scheduled a sleeping task wakes up, which is the time
+        the loop spent running other code without yielding.
+
+        Parameters:
+        - executor: TrackingExecutor object, the default executor of the loop
+        - interval: float, number of seconds between samples
+        """
+        self.executor = executor
+        self.interval = interval
+        self.lags = []
+        self.pool_samples = []
+
+
+    async def run(self):
+        """
+        Take samples until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            scheduled_at = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - scheduled_at))
+            self.pool_samples.append(self.executor.pending)
+
+
+    def summary(self):
+        """
+        Summarize the samples.
+
+        Returns:
+        - dict, loop lag percentiles, average share of busy workers and the deepest queue of waiting work items
+        """
+        workers = self.executor.workers
+
+        return {
+            "loop_lag_p50": percentile(self.lags, 50),
+            "loop_lag_p99": percentile(self.lags, 99),
+            "loop_lag_max": max(self.lags) if self.lags else None,
+            "pool_utilization": sum(min(pending, workers) for pending in self.pool_samples) / (workers * len(self.pool_samples)) if self.pool_samples else 0.0,
+            "pool_max_queued": max((max(0, pending - workers) for pending in self.pool_samples), default=0),
+        }
+
+
+class FakeMessage:
+    def __init__(self, chat_id, chat_type, text, api_latency):
+        """
+        Incoming message of a synthetic chat, recording the bot's replies.
+
+        Parameters:
+        - chat_id: int, the chat ID
+        - chat_type: str, telegram.Chat type of the chat
+        - text: str, the message text
+        - api_latency: float, simulated duration of a Telegram API call in seconds
+        """
+        self.chat_id = chat_id
+        self.chat = SimpleNamespace(id=chat_id, type=chat_type)
+        self.text = text
+        self.api_latency = api_latency
+        self.first_reply_at = None
+        self.final_text = None
+
+
+    async def reply_text(self, text, **kwargs):
+        """
+        Simulate sending a reply to the message.
+        """
+        await asyncio.sleep(self.api_latency)
+
+        if self.first_reply_at is None:
+            self.first_reply_at = time.monotonic()
+
+        self.final_text = text
+        return FakeSentMessage(self, text)
+
+
+class FakeSentMessage:
+    def __init__(self, incoming, text):
+        """
+        Message sent by the bot, editable like telegram.Message.
+
+        Parameters:
+        - incoming: FakeMessage object, the message it replies to
+        - text: str, the message text
+        """
+        self.incoming = incoming
+        self.text = text
+
+
+    async def edit_text(self, text, **kwargs):
+        """
+        Simulate editing the message, the last text is the reply the chat ends up with.
+        """
+        await asyncio.sleep(self.incoming.api_latency)
+        self.text = text
+        self.incoming.final_text = text
+
+
+    async def reply_text(self, text, **kwargs):
+        """
+        Simulate replying to the original message.
+        """
+        return await self.incoming.reply_text(text, **kwargs)
+
+
+async def run_level(bot, chats, args, queries, executor):
+    """
+    Run the synthetic chats concurrently and summarize their replies.
+
+    Parameters:
+    - bot: module, the bot module
+    - chats: int, number of concurrent chats
+    - args: argparse.Namespace, the load settings
+    - queries: list of str, queries the chats search for
+    - executor: TrackingExecutor object, the default executor of the loop
+
+    Returns:
+    - dict, the level summary
+    """
+    monitor = LoopMonitor(executor)
+    monitor_task = asyncio.create_task(monitor.run())
+
+    reply_latencies = []
+    first_reply_latencies = []
+    errors = 0
+    group_chats = int(chats * args.group_share)
+
+    async def chat(chat_id):
+        nonlocal errors
+
+        is_group = chat_id < group_chats
+        context = SimpleNamespace(user_data={})
+
+        for _ in range(args.messages):
+            # Group chats are mostly chatter not addressed to the bot
+            if is_group:
+                for _ in range(args.group_noise):
+                    noise = FakeMessage(chat_id, Chat.SUPERGROUP, "всім привіт", args.api_latency)
+                    await bot.handle_message(SimpleNamespace(message=noise, effective_chat=noise.chat), context)
+
+            query = random.choice(queries)
+            text = f"{bot.BOT_USERNAME} {query}" if is_group else query
+            message = FakeMessage(chat_id, Chat.SUPERGROUP if is_group else Chat.PRIVATE, text, args.api_latency)
+
+            started_at = time.monotonic()
+            await bot.handle_message(SimpleNamespace(message=message, effective_chat=message.chat), context)
+            finished_at = time.monotonic()
+
+            if message.first_reply_at is None or message.final_text is None or message.final_text.startswith("⚠"):
+                errors += 1
+            else:
+                reply_latencies.append(finished_at - started_at)
+                first_reply_latencies.append(message.first_reply_at - started_at)
+
+            await asyncio.sleep(random.uniform(0, 2 * args.think_time))
+
+    started_at = time.monotonic()
+    await asyncio.gather(*(chat(chat_id) for chat_id in range(chats)))
+    wall_time = time.monotonic() - started_at
+
+    monitor_task.cancel()
+
+    return {
+        "level": chats,
+        "errors": errors,
+        **summarize_latencies(reply_latencies, wall_time),
+        "first_reply_p95": percentile(first_reply_latencies, 95),
+        **monitor.summary(),
+    }
+
+
+async def run(args, bot, queries):
+    """
+    Run the load at every number of chats.
+
+    Parameters:
+    - args: argparse.Namespace, the load settings
+    - bot: module, the bot module
+    - queries: list of str, queries the chats search for
+
+    Returns:
+    - list of dict, level summaries
+    """
+    executor = TrackingExecutor(args.threads)
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    usage_recorder_task = asyncio.create_task(bot.usage_recorder.run())
+
+    if websites_scraper.parse_pool is not None:
+        await websites_scraper.parse_pool.warm_up(store_registry.get_websites())
+
+    try:
+        levels = []
+        for chats in args.chats:
+            levels.append(await run_level(bot, chats, args, queries, executor))
+        return levels
+    finally:
+        usage_recorder_task.cancel()
+        await asyncio.gather(usage_recorder_task, return_exceptions=True)
+        if websites_scraper.parse_pool is not None:
+            websites_scraper.parse_pool.close()
+        await http_client.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the bot with concurrent synthetic chats")
+    parser.add_argument('--chats', type=int, nargs='+', default=[10, 50, 100], help="numbers of concurrent chats")
+    parser.add_argument('--messages', type=int, default=3, help="number of searches per chat")
+    parser.add_argument('--group-share', type=float, default=0.3, help="share of group chats")
+    parser.add_argument('--group-noise', type=int, default=5, help="unrelated messages sent before each search in group chats")
+    parser.add_argument('--think-time', type=float, default=1.0, help="mean pause between searches of a chat in seconds")
+    parser.add_argument('--api-latency', type=float, default=0.05, help="simulated Telegram API call duration in seconds")
+    parser.add_argument('--threads', type=int, default=min(32, (os.cpu_count() or 1) + 4), help="default thread pool size")
+    parser.add_argument('--latency', type=float, default=0.3, help="mean store response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.1, help="maximum deviation of the delay in seconds")
+    parser.add_argument('--no-cache', action='store_true', help="disable the result cache")
+    parser.add_argument('--page-cache', action='store_true', help="keep the on-disk page cache enabled")
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS, help="parse worker processes (0 parses on the event loop)")
+    parser.add_argument('--fixtures-dir', default=FIXTURES_DIR, help="directory with recorded pages")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.fixtures_dir)
+    queries = sorted({query for store_queries in manifest["stores"].values() for query in store_queries})
+
+    bot = load_bot()
+
+    # Keep synthetic searches out of the real usage statistics
+    usage_dir = tempfile.mkdtemp()
+    bot.usage_recorder = UsageRecorder(os.path.join(usage_dir, 'usage.db'))
+
+    if args.no_cache:
+        scraper.result_cache = ResultCache(ttl=0, maxsize=0)
+
+    if not args.page_cache:
+        # Fixture pages must be requested every time, and must not end up in the bot's page cache
+        websites_scraper.page_cache = None
+
+    websites_scraper.parse_pool = ParsePool(args.parse_workers) if args.parse_workers > 0 else None
+
+    # Keep synthetic searches out of the price history
+    scraper.price_history = None
+
+    server, store_ports = start_fixture_server(args.fixtures_dir, args.latency, args.jitter)
+
+    try:
+        fixture_websites = point_websites_at_fixtures(store_ports)
+        levels = asyncio.run(run(args, bot, queries))
+    finally:
+        server.terminate()
+
+    settings = {
+        "messages": args.messages,
+        "group_share": args.group_share,
+        "threads": args.threads,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "cache": not args.no_cache,
+        "page_cache": args.page_cache,
+        "parse_workers": args.parse_workers,
+        "stores": len(fixture_websites),
+        "queries": len(queries),
+    }
+
+    report = build_report("load", settings, levels)
+    print(format_report(report))
+
+    for level in levels:
+        print(
+            f"{level['level']:>6} chats: first reply p95 {level['first_reply_p95'] or 0:.3f}s, "
+            f"loop lag p50/p99/max {level['loop_lag_p50'] or 0:.3f}/{level['loop_lag_p99'] or 0:.3f}/{level['loop_lag_max'] or 0:.3f}s, "
+            f"thread pool {level['pool_utilization']:.0%} busy, up to {level['pool_max_queued']} queued"
+        )
+
+    print(f"Saved to {save_report(report)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    main()
@@ -0,0 +1,112 @@
+"""
+Record search result pages of every store for offline benchmarks.
+
+Usage (from the repository root):
+    python -m benchmarks.record_fixtures [--query "мультитул leatherman" ...] [--max-pages 10]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+# Modules of lib log into the logs directory
+os.makedirs('logs', exist_ok=True)
+
+from lib import http_client, normalize_query, websites_scraper
+from lib.store_registry import store_registry
+from lib.websites_scraper import ScrapeSession
+
+from benchmarks.fixtures import FIXTURES_DIR, DEFAULT_QUERIES, page_path, save_manifest
+
+
+async def record_store(website, query, client, fixtures_dir, max_pages):
+    """
+    Record the pages a search of a store goes through, including the page which stops it.
+
+    Parameters:
+    - website: WebsiteScraper object, the store to record
+    - query: str, the normalized query
+    - client: httpx.AsyncClient, the client used to send requests
+    - fixtures_dir: str, the fixtures directory
+    - max_pages: int, maximum number of pages to record
+
+    Returns:
+    - int, number of recorded pages
+    """
+    session = ScrapeSession(query)
+    url_query = query.replace(" ", website.search_query_separator)
+
+    for page in range(1, max_pages + 1):
+        url = website.build_url(page, url_query)
+        content = await website.fetch_data_async(client, url, session)
+
+        # Missing pages are served as 404 by the fixture server
+        if not content:
+            return page - 1
+
+        path = page_path(fixtures_dir, website.name, query, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        # Stop where the scraper stops
+        is_duplicate, products = website.process_page(session, content, url)
+
+        if is_duplicate or products == []:
+            return page
+
+    return max_pages
+
+
+async def record(queries, fixtures_dir, max_pages):
+    """
+    Record pages of every store for every query and save the manifest.
+
+    Parameters:
+    - queries: list of str, the queries to record
+    - fixtures_dir: str, the fixtures directory
+    - max_pages: int, maximum number of pages recorded per store and query
+    """
+    client = http_client.get_client()
+    manifest = {"recorded_at": time.time(), "stores": {}}
+    websites = store_registry.get_websites()
+
+    try:
+        for query in queries:
+            results = await asyncio.gather(
+                *(record_store(website, query, client, fixtures_dir, max_pages) for website in websites),
+                return_exceptions=True
+            )
+
+            for website, pages in zip(websites, results):
+                if isinstance(pages, Exception):
+                    logging.error(f"Failed to record {website.name} for '{query}': {pages!r}")
+                    continue
+
+                manifest["stores"].setdefault(website.name, {})[query] = pages
+                print(f"{website.name:<24} {query:<28} {pages} pages")
+    finally:
+        await http_client.close_client()
+
+    save_manifest(manifest, fixtures_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record store result pages for offline benchmarks")
+    parser.add_argument('--query', action='append', help="query to record, may be repeated (default: a built-in set)")
+    parser.add_argument('--max-pages', type=int, default=10, help="maximum number of pages per store and query")
+    parser.add_argument('--fixtures-dir', default=FIXTURES_DIR, help="directory to store the pages in")
+    args = parser.parse_args()
+
+    queries = [normalize_query(query) for query in (args.query or DEFAULT_QUERIES)]
+
+    # Record what the stores serve now, not what the bot cached earlier
+    websites_scraper.page_cache = None
+
+    asyncio.run(record(queries, args.fixtures_dir, args.max_pages))
+
+
+if __name__ == "__main__":
+    main()
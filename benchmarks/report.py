@@ -0,0 +1,162 @@
+"""
+Save benchmark reports and compare them across commits.
+
+Usage (from the repository root):
+    python -m benchmarks.report [report.json ...]    (default: all saved reports)
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import time
+
+
+# Saved reports, kept out of the repository
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+
+
+def percentile(values, percent):
+    """
+    Calculate a percentile of values.
+
+    Parameters:
+    - values: list of float, the values
+    - percent: float, the percentile between 0 and 100
+
+    Returns:
+    - float, the percentile or None if there are no values
+    """
+    if not values:
+        return None
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def summarize_latencies(latencies, wall_time):
+    """
+    Summarize latencies of a benchmark run.
+
+    Parameters:
+    - latencies: list of float, latencies of completed operations in seconds
+    - wall_time: float, duration of the whole run in seconds
+
+    Returns:
+    - dict, number of operations, throughput per second and latency percentiles
+    """
+    return {
+        "completed": len(latencies),
+        "throughput": len(latencies) / wall_time if wall_time else 0.0,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else None,
+    }
+
+
+def current_commit():
+    """
+    Describe the checked out commit.
+
+    Returns:
+    - str, short commit hash with a '-dirty' suffix for uncommitted changes, or 'unknown'
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+    return f"{commit}-dirty" if dirty else commit
+
+
+def build_report(name, settings, levels):
+    """
+    Build a report of a benchmark run on the current commit.
+
+    Parameters:
+    - name: str, the benchmark name
+    - settings: dict, the benchmark settings
+    - levels: list of dict, summaries of the benchmark levels
+
+    Returns:
+    - dict, the report
+    """
+    return {"benchmark": name, "commit": current_commit(), "created_at": time.time(), "settings": settings, "levels": levels}
+
+
+def save_report(report, results_dir=RESULTS_DIR):
+    """
+    Save a report for later comparison.
+
+    Parameters:
+    - report: dict, the report
+    - results_dir: str, the directory of saved reports
+
+    Returns:
+    - str, path of the saved report
+    """
+    os.makedirs(results_dir, exist_ok=True)
+
+    created_at = time.strftime('%Y%m%d-%H%M%S', time.localtime(report['created_at']))
+    path = os.path.join(results_dir, f"{created_at}-{report['benchmark']}-{report['commit']}.json")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return path
+
+
+def format_seconds(value):
+    """
+    Format an optional number of seconds for a report table.
+
+    Parameters:
+    - value: float or None, the number of seconds
+
+    Returns:
+    - str, the formatted value
+    """
+    return "-" if value is None else f"{value:.3f}"
+
+
+def format_report(report):
+    """
+    Format the levels of a report as a table.
+
+    Parameters:
+    - report: dict, the report
+
+    Returns:
+    - str, the table
+    """
+    lines = [
+        f"{report['benchmark']} @ {report['commit']}  {report.get('settings', {})}",
+        f"{'level':>6} {'done':>6} {'errors':>6} {'ops/s':>8} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}",
+    ]
+
+    for level in report["levels"]:
+        lines.append(
+            f"{level['level']:>6} {level['completed']:>6} {level['errors']:>6} {level['throughput']:>8.2f} "
+            f"{format_seconds(level['p50']):>8} {format_seconds(level['p90']):>8} {format_seconds(level['p95']):>8} "
+            f"{format_seconds(level['p99']):>8} {format_seconds(level['max']):>8}"
+        )
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare saved benchmark reports")
+    parser.add_argument('reports', nargs='*', help="report files (default: all reports in benchmarks/results)")
+    args = parser.parse_args()
+
+    for path in args.reports or sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            print(format_report(json.load(f)))
+        print()
+
+
+if __name__ == "__main__":
+    main()
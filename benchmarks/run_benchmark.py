@@ -0,0 +1,213 @@
+"""
+Benchmark searches end to end against recorded store pages.
+
+Starts the fixture server in a separate process, points every store at it and runs
+closed-loop searches at each concurrency level, reporting throughput and latency
+percentiles. Reports are saved under the current commit for comparison.
+
+Per-host request budgets (HOST_MAX_IN_FLIGHT, HOST_RATE_LIMIT) apply as in the bot,
+set HOST_RATE_LIMIT=0 to measure the scraper without the rate limit.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmark [--target output] [--concurrency 1 4 16] [--searches 50]
+                                       [--latency 0.3] [--jitter 0.1] [--cache] [--parse-workers 4]
+"""
+import argparse
+import asyncio
+import copy
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+
+# Modules of lib log into the logs directory
+os.makedirs('logs', exist_ok=True)
+
+from lib import http_client, scraper, websites_scraper
+from lib.store_registry import store_registry
+from lib.parse_pool import ParsePool, PARSE_WORKERS
+from lib.result_cache import ResultCache
+
+from benchmarks.fixtures import FIXTURES_DIR, load_manifest
+from benchmarks.fixture_server import serve
+from benchmarks.report import build_report, format_report, save_report, summarize_latencies
+
+
+def start_fixture_server(fixtures_dir, latency, jitter):
+    """
+    Start the fixture server in a separate process, so serving does not compete with the benchmark for the GIL.
+
+    Parameters:
+    - fixtures_dir: str, the fixtures directory
+    - latency: float, mean response delay in seconds
+    - jitter: float, maximum deviation of the delay in seconds
+
+    Returns:
+    - tuple, (multiprocessing.Process, dict of store names mapped to ports)
+    """
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(fixtures_dir, latency, jitter, ports), daemon=True)
+    process.start()
+    return process, ports.get(timeout=60)
+
+
+def point_websites_at_fixtures(store_ports):
+    """
+    Replace the scraped websites with copies requesting pages from the fixture server.
+
+    Parameters:
+    - store_ports: dict, store names mapped to fixture server ports
+
+    Returns:
+    - list of WebsiteScraper objects, the redirected websites
+    """
+    fixture_websites = []
+
+    for website in store_registry.get_websites():
+        if website.name not in store_ports:
+            logging.warning(f"No fixtures recorded for {website.name}, leaving it out")
+            continue
+
+        fixture_website = copy.copy(website)
+        fixture_website.base_url = f"http://127.0.0.1:{store_ports[website.name]}/{{query}}/{{page}}"
+        fixture_website.search_query_separator = "_"
+        fixture_website.catalog_url = None
+        # Pages sorted by price are not recorded, the cheapest-first search pages through the recorded ones
+        fixture_website.cheapest_url = fixture_website.base_url if website.cheapest_url else None
+        fixture_websites.append(fixture_website)
+
+    store_registry.pin(fixture_websites)
+    return fixture_websites
+
+
+async def run_level(search, queries, concurrency, searches):
+    """
+    Run searches with a fixed number of concurrent clients, each starting a new search once its previous one finishes.
+
+    Parameters:
+    - search: coroutine function, runs a search for a query
+    - queries: list of str, queries used in turn
+    - concurrency: int, number of concurrent clients
+    - searches: int, total number of searches
+
+    Returns:
+    - dict, the level summary
+    """
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+
+    async def client():
+        nonlocal errors
+
+        while (i := next(counter)) < searches:
+            started_at = time.monotonic()
+
+            try:
+                await search(queries[i % len(queries)])
+            except Exception as e:
+                errors += 1
+                logging.error(f"Search failed: {e!r}")
+                continue
+
+            latencies.append(time.monotonic() - started_at)
+
+    started_at = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    return {"level": concurrency, "errors": errors, **summarize_latencies(latencies, time.monotonic() - started_at)}
+
+
+async def run(args, queries):
+    """
+    Run the benchmark at every concurrency level.
+
+    Parameters:
+    - args: argparse.Namespace, the benchmark settings
+    - queries: list of str, the recorded queries
+
+    Returns:
+    - list of dict, level summaries
+    """
+    if args.target == "aggregate":
+        search = lambda query: scraper.aggregate_data(store_registry.get_websites(), query)
+    elif args.target == "cheapest":
+        search = lambda query: scraper.generate_cheapest_output(query)
+    else:
+        search = lambda query: scraper.generate_formatted_output(query)
+
+    try:
+        # Open connections, start parse workers and load the user agent data before measuring
+        await search(queries[0])
+
+        levels = []
+        for concurrency in args.concurrency:
+            levels.append(await run_level(search, queries, concurrency, args.searches))
+        return levels
+    finally:
+        if websites_scraper.parse_pool is not None:
+            websites_scraper.parse_pool.close()
+        await http_client.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark searches against recorded store pages")
+    parser.add_argument('--target', choices=["aggregate", "output", "cheapest"], default="output",
+                        help="benchmark aggregate_data, the whole generate_formatted_output or generate_cheapest_output")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help="concurrency levels")
+    parser.add_argument('--searches', type=int, default=50, help="number of searches per level")
+    parser.add_argument('--latency', type=float, default=0.3, help="mean store response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.1, help="maximum deviation of the delay in seconds")
+    parser.add_argument('--cache', action='store_true', help="keep the result cache enabled")
+    parser.add_argument('--page-cache', action='store_true', help="keep the on-disk page cache enabled")
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS, help="parse worker processes (0 parses on the event loop)")
+    parser.add_argument('--fixtures-dir', default=FIXTURES_DIR, help="directory with recorded pages")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    manifest = load_manifest(args.fixtures_dir)
+    queries = sorted({query for store_queries in manifest["stores"].values() for query in store_queries})
+
+    if not args.cache:
+        # Concurrent identical searches are still coalesced, as they are in the bot
+        scraper.result_cache = ResultCache(ttl=0, maxsize=0)
+
+    if not args.page_cache:
+        # Fixture pages must be requested every time, and must not end up in the bot's page cache
+        websites_scraper.page_cache = None
+
+    websites_scraper.parse_pool = ParsePool(args.parse_workers) if args.parse_workers > 0 else None
+
+    # Keep synthetic searches out of the price history
+    scraper.price_history = None
+
+    server, store_ports = start_fixture_server(args.fixtures_dir, args.latency, args.jitter)
+
+    try:
+        fixture_websites = point_websites_at_fixtures(store_ports)
+        levels = asyncio.run(run(args, queries))
+    finally:
+        server.terminate()
+
+    settings = {
+        "target": args.target,
+        "searches": args.searches,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "cache": args.cache,
+        "page_cache": args.page_cache,
+        "parse_workers": args.parse_workers,
+        "stores": len(fixture_websites),
+        "queries": len(queries),
+        "fixtures_recorded_at": manifest["recorded_at"],
+    }
+
+    report = build_report("search", settings, levels)
+    print(format_report(report))
+    print(f"Saved to {save_report(report)}")
+
+
+if __name__ == "__main__":
+    main()
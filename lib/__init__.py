@@ -1,3 +1,13 @@
-from .websites_list import websites
-from .scraper import generate_formatted_output
-from .bot_usage import generate_bot_usage_data
\ No newline at end of file
+from .store_registry import store_registry
+from .scraper import generate_formatted_output, result_cache, catalog_crawler, SEARCH_DEADLINE
+from .scraper import generate_cheapest_output, format_store_items, format_price_history, register_result, result_handles
+from .scraper import search_watched, format_price_alert
+from .websites_scraper import normalize_query
+from .bot_usage import UsageRecorder
+from .http_client import close_client
+from .metrics import start_metrics_server, readiness, METRICS_PORT
+from .warmup import warm_up, keep_warm, WARMUP_INTERVAL
+from .parse_pool import parse_pool
+from .page_cache import page_cache
+from .price_history import price_history
+from .watchlist import WatchList, WatchScheduler, parse_watch_request
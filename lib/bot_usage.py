@@ -1,34 +1,208 @@
+import asyncio
 import csv
+import logging
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime
 
 
-def generate_bot_usage_data(data_dir, chat_id):
-    """
-    Appends a new row with 'chat_id' and current timestamp to a CSV file.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    day TEXT NOT NULL,
+    query TEXT,
+    latency REAL,
+    stores_found INTEGER,
+    stores_timed_out INTEGER
+);
+CREATE INDEX IF NOT EXISTS searches_day_chat ON searches (day, chat_id);
+CREATE INDEX IF NOT EXISTS searches_timestamp_query ON searches (timestamp, query);
+CREATE INDEX IF NOT EXISTS searches_timestamp_latency ON searches (timestamp, latency);
+"""
 
-    Parameters:
-        - data_dir (str): The path to the CSV file.
-        - chat_id: The chat ID value to be appended to the CSV file.
 
-    If the CSV file does not exist, it will be created with a header row containing 'chat_id' and 'timestamp'.
-    If the file already exists, a new row will be appended with the provided 'chat_id' and the current date and time.
+class UsageRecorder:
+    def __init__(self, db_path, flush_interval=10, batch_size=100):
+        """
+        Records bot searches into a local SQLite database.
 
-    Example:
-        append_to_csv('path/to/your/file.csv', '123456')
-    """
-    # Check if the file exists to determine whether to write the header
-    file_exists = os.path.isfile(data_dir)
-    
-    # Get current date and time
-    current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    with open(data_dir, mode='a', newline='') as f:
-        writer = csv.writer(f)
+        Records are buffered in memory and written in batches from a worker thread,
+        so handling a message never waits for the disk.
 
-        # Write header if the file is newly created
-        if not file_exists:
-            writer.writerow(['chat_id', 'timestamp'])
+        Parameters:
+        - db_path: str, path to the SQLite database file
+        - flush_interval: float, number of seconds between periodic writes of buffered records
+        - batch_size: int, number of buffered records which triggers an immediate write
+        """
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.buffer = []
+        self.flush_task = None
 
-        # Write the chat_id and timestamp
-        writer.writerow([chat_id, current_datetime])
\ No newline at end of file
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        # The connection is used from worker threads, one at a time
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.connection_lock = threading.Lock()
+
+
+    def record(self, chat_id, query, latency=None, stores_found=None, stores_timed_out=None):
+        """
+        Buffer a record of a search.
+
+        Parameters:
+        - chat_id: int, the chat the search came from
+        - query: str, the normalized search query
+        - latency: float, number of seconds the search took (optional)
+        - stores_found: int, number of stores which had the product (optional)
+        - stores_timed_out: int, number of stores which did not respond in time (optional)
+        """
+        timestamp = time.time()
+        day = time.strftime('%Y-%m-%d', time.localtime(timestamp))
+        self.buffer.append((chat_id, timestamp, day, query, latency, stores_found, stores_timed_out))
+
+        # Write a full batch right away instead of waiting for the periodic flush
+        if len(self.buffer) >= self.batch_size and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.ensure_future(self.flush())
+
+
+    def write(self, rows):
+        """
+        Write records to the database, called from a worker thread.
+
+        Parameters:
+        - rows: list of tuples, the records to write
+        """
+        with self.connection_lock, self.connection:
+            self.connection.executemany(
+                """INSERT INTO searches (chat_id, timestamp, day, query, latency, stores_found, stores_timed_out)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+
+
+    async def flush(self):
+        """
+        Write all buffered records to the database.
+        """
+        if not self.buffer:
+            return
+
+        rows, self.buffer = self.buffer, []
+
+        try:
+            await asyncio.to_thread(self.write, rows)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write {len(rows)} usage records: {e}")
+
+
+    async def run(self):
+        """
+        Write buffered records every flush_interval until cancelled, flushing the rest on cancellation.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+    def query_stats(self, days, top):
+        """
+        Compute usage aggregates from the database, called from a worker thread.
+
+        Parameters:
+        - days: int, number of recent days to aggregate
+        - top: int, number of most frequent queries to return
+
+        Returns:
+        - dict, see stats()
+        """
+        since = time.time() - days * 86400
+        first_day = time.strftime('%Y-%m-%d', time.localtime(since))
+
+        with self.connection_lock:
+            daily_users = self.connection.execute(
+                """SELECT day, COUNT(DISTINCT chat_id), COUNT(*) FROM searches
+                   WHERE day > ? GROUP BY day ORDER BY day DESC""",
+                (first_day,)
+            ).fetchall()
+
+            top_queries = self.connection.execute(
+                """SELECT query, COUNT(*) AS searches FROM searches
+                   WHERE timestamp >= ? AND query IS NOT NULL
+                   GROUP BY query ORDER BY searches DESC LIMIT ?""",
+                (since, top)
+            ).fetchall()
+
+            latencies_count = self.connection.execute(
+                "SELECT COUNT(*) FROM searches WHERE timestamp >= ? AND latency IS NOT NULL",
+                (since,)
+            ).fetchone()[0]
+
+            latency_p95 = None
+
+            if latencies_count:
+                latency_p95 = self.connection.execute(
+                    """SELECT latency FROM searches WHERE timestamp >= ? AND latency IS NOT NULL
+                       ORDER BY latency LIMIT 1 OFFSET ?""",
+                    (since, min(latencies_count - 1, int(latencies_count * 0.95)))
+                ).fetchone()[0]
+
+        return {"daily_users": daily_users, "top_queries": top_queries, "latency_p95": latency_p95}
+
+
+    async def stats(self, days=7, top=10):
+        """
+        Return usage aggregates of recent days, including buffered records.
+
+        Parameters:
+        - days: int, number of recent days to aggregate
+        - top: int, number of most frequent queries to return
+
+        Returns:
+        - dict with the following keys:
+            - daily_users: list of tuples (day, number of users, number of searches), latest day first
+            - top_queries: list of tuples (query, number of searches)
+            - latency_p95: float, 95th percentile of search latency in seconds or None if nothing was recorded
+        """
+        await self.flush()
+        return await asyncio.to_thread(self.query_stats, days, top)
+
+
+    def import_csv(self, csv_path):
+        """
+        Import records of the former CSV usage log into an empty database.
+
+        Parameters:
+        - csv_path: str, path to the CSV file with 'chat_id' and 'timestamp' columns
+
+        Returns:
+        - int, number of imported records
+        """
+        if not os.path.isfile(csv_path):
+            return 0
+
+        with self.connection_lock:
+            if self.connection.execute("SELECT 1 FROM searches LIMIT 1").fetchone():
+                return 0
+
+        rows = []
+
+        with open(csv_path, newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    timestamp = datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S')
+                    rows.append((int(row['chat_id']), timestamp.timestamp(), timestamp.strftime('%Y-%m-%d'), None, None, None, None))
+                except (KeyError, TypeError, ValueError):
+                    logging.warning(f"Skipping malformed usage record: {row}")
+
+        self.write(rows)
+        return len(rows)
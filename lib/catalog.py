@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from lib import http_client
+from lib.websites_scraper import Product, ScrapeSession, normalize_query, tokenize, is_prefix_token
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    store TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price TEXT NOT NULL,
+    in_stock INTEGER NOT NULL,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS products_store_scope ON products (store, scope);
+
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT NOT NULL,
+    product_id INTEGER NOT NULL REFERENCES products (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS tokens_token ON tokens (token);
+CREATE INDEX IF NOT EXISTS tokens_product ON tokens (product_id);
+
+CREATE TABLE IF NOT EXISTS scopes (
+    store TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    crawled_at REAL NOT NULL,
+    PRIMARY KEY (store, scope)
+);
+"""
+
+
+class CatalogIndex:
+    def __init__(self, db_path):
+        """
+        Local store of crawled products with an inverted index of name tokens.
+
+        Products are grouped into scopes: the empty scope holds the whole catalog of a store,
+        other scopes hold products found by searching the store for a seed query. A query can
+        be answered from a scope only if it contains all tokens of the seed query.
+
+        Parameters:
+        - db_path: str, path to the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        # The connection is used from worker threads, one at a time
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        self.connection_lock = threading.Lock()
+
+
+    def write_scope(self, store, scope, products, crawled_at=None):
+        """
+        Replace products of a store's scope with freshly crawled ones, called from a worker thread.
+
+        Parameters:
+        - store: str, the website name
+        - scope: str, the seed query ("" for the whole catalog)
+        - products: list of Product objects, the crawled products
+        - crawled_at: float, the crawl timestamp (current time if not specified)
+        """
+        crawled_at = crawled_at or time.time()
+
+        with self.connection_lock, self.connection:
+            self.connection.execute("DELETE FROM products WHERE store = ? AND scope = ?", (store, scope))
+
+            for product in products:
+                cursor = self.connection.execute(
+                    "INSERT INTO products (store, scope, name, price, in_stock, url) VALUES (?, ?, ?, ?, ?, ?)",
+                    (store, scope, product.name, product.price, int(product.stock_status), product.url)
+                )
+                self.connection.executemany(
+                    "INSERT INTO tokens (token, product_id) VALUES (?, ?)",
+                    [(token, cursor.lastrowid) for token in tokenize(product.name)]
+                )
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO scopes (store, scope, crawled_at) VALUES (?, ?, ?)",
+                (store, scope, crawled_at)
+            )
+
+
+    def covering_scopes(self, store, query, max_age):
+        """
+        Find fresh scopes of a store which contain every product matching the query.
+        Called from a worker thread holding the connection lock.
+
+        Parameters:
+        - store: str, the website name
+        - query: str, the search query
+        - max_age: float, maximum age of a scope in seconds
+
+        Returns:
+        - tuple, (list of covering scopes, oldest crawl timestamp among them or None)
+        """
+        query_tokens = tokenize(query)
+        rows = self.connection.execute(
+            "SELECT scope, crawled_at FROM scopes WHERE store = ? AND crawled_at >= ?",
+            (store, time.time() - max_age)
+        ).fetchall()
+
+        scopes = [(scope, crawled_at) for scope, crawled_at in rows if tokenize(scope) <= query_tokens]
+
+        if not scopes:
+            return [], None
+
+        return [scope for scope, _ in scopes], min(crawled_at for _, crawled_at in scopes)
+
+
+    def search(self, store, query, scopes):
+        """
+        Find in-stock products of a store whose names match all query stems.
+        Called from a worker thread holding the connection lock.
+
+        Parameters:
+        - store: str, the website name
+        - query: str, the search query
+        - scopes: list of str, scopes to search in
+
+        Returns:
+        - list of Product objects, the matching products
+        """
+        token_filters = []
+        parameters = [store, *scopes]
+
+        # Match query stems exactly or as prefixes of indexed stems, the same way as live scraping
+        for query_token in sorted(tokenize(query)):
+            if is_prefix_token(query_token):
+                token_filters.append("SELECT product_id FROM tokens WHERE token >= ? AND token < ?")
+                parameters += [query_token, query_token + "\U0010ffff"]
+            else:
+                token_filters.append("SELECT product_id FROM tokens WHERE token = ?")
+                parameters.append(query_token)
+
+        scope_placeholders = ", ".join("?" * len(scopes))
+        token_filter = f"AND id IN ({' INTERSECT '.join(token_filters)})" if token_filters else ""
+
+        rows = self.connection.execute(
+            f"""SELECT DISTINCT name, price, url FROM products
+                WHERE store = ? AND scope IN ({scope_placeholders}) AND in_stock = 1 {token_filter}""",
+            parameters
+        ).fetchall()
+
+        return [Product(name=name, price=price, stock_status=True, url=url) for name, price, url in rows]
+
+
+    def select_products(self, websites, query, max_age):
+        """
+        Answer a query from the index, called from a worker thread.
+
+        Returns:
+        - tuple, see lookup()
+        """
+        results = {}
+        oldest_crawl = None
+
+        for website in websites:
+            with self.connection_lock:
+                scopes, crawled_at = self.covering_scopes(website.name, query, max_age)
+                products = self.search(website.name, query, scopes) if scopes else []
+
+            # A miss may mean the crawl did not reach the product, leave it to live scraping
+            if not products:
+                continue
+
+            results[website] = products
+            oldest_crawl = crawled_at if oldest_crawl is None else min(oldest_crawl, crawled_at)
+
+        return results, oldest_crawl
+
+
+    async def replace_scope(self, store, scope, products, crawled_at=None):
+        """
+        Replace products of a store's scope with freshly crawled ones.
+
+        Parameters:
+        - store: str, the website name
+        - scope: str, the seed query ("" for the whole catalog)
+        - products: list of Product objects, the crawled products
+        - crawled_at: float, the crawl timestamp (current time if not specified)
+        """
+        try:
+            await asyncio.to_thread(self.write_scope, store, scope, products, crawled_at)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write {len(products)} products of {store} to the catalog index: {e}")
+
+
+    async def lookup(self, websites, query, max_age):
+        """
+        Answer a query from the index for every website whose fresh index covers it.
+
+        Parameters:
+        - websites: list of WebsiteScraper objects, websites to look up
+        - query: str, the search query
+        - max_age: float, maximum age of indexed data in seconds
+
+        Returns:
+        - tuple, (dict mapping websites to lists of Product objects, oldest crawl timestamp or None)
+        """
+        try:
+            return await asyncio.to_thread(self.select_products, websites, query, max_age)
+        except sqlite3.Error as e:
+            # Every website is scraped live instead
+            logging.error(f"Failed to look up '{query}' in the catalog index: {e}")
+            return {}, None
+
+
+class CatalogCrawler:
+    def __init__(self, index, get_websites, seed_queries, interval):
+        """
+        Periodically crawls websites and stores their products in the catalog index.
+
+        Websites with a catalog_url are crawled through their whole catalog, others through
+        their search pages for each of the seed queries.
+
+        Parameters:
+        - index: CatalogIndex object, the index to fill
+        - get_websites: callable, returns the list of WebsiteScraper objects to crawl
+        - seed_queries: list of str, queries crawled on websites without a catalog_url
+        - interval: float, number of seconds between the starts of consecutive crawls
+        """
+        self.index = index
+        self.get_websites = get_websites
+        self.seed_queries = [normalize_query(query) for query in seed_queries if normalize_query(query)]
+        self.interval = interval
+
+
+    async def crawl_website(self, website, client):
+        """
+        Crawl a single website and replace its products in the index.
+
+        A crawl cut short by a failed request keeps the previously indexed products,
+        which expire after CATALOG_MAX_AGE, so searches are scraped live meanwhile.
+
+        Parameters:
+        - website: WebsiteScraper object, the website to crawl
+        - client: httpx.AsyncClient, the client used to send requests
+        """
+        if website.catalog_url:
+            # An empty query matches every product on the catalog pages
+            session = ScrapeSession("")
+            products = await website.scrape_async("", client, base_url=website.catalog_url, session=session)
+
+            if session.failed:
+                logging.warning(f"Crawl of {website.name} catalog failed, keeping the indexed products")
+                return
+
+            await self.index.replace_scope(website.name, "", products)
+            logging.info(f"Crawled {len(products)} products from {website.name} catalog")
+            return
+
+        for seed_query in self.seed_queries:
+            session = ScrapeSession(seed_query)
+            products = await website.scrape_async(seed_query, client, session=session)
+
+            if session.failed:
+                logging.warning(f"Crawl of {website.name} for '{seed_query}' failed, keeping the indexed products")
+                continue
+
+            await self.index.replace_scope(website.name, seed_query, products)
+            logging.info(f"Crawled {len(products)} products from {website.name} for '{seed_query}'")
+
+
+    async def crawl(self):
+        """
+        Crawl all websites one by one, so the crawl does not compete with user searches for connections.
+        """
+        client = http_client.get_client()
+
+        for website in self.get_websites():
+            try:
+                await self.crawl_website(website, client)
+            except Exception as e:
+                logging.error(f"Error crawling {website.name}: {e!r}")
+
+
+    async def run(self):
+        """
+        Crawl all websites every interval until cancelled.
+        """
+        while True:
+            started_at = time.monotonic()
+            await self.crawl()
+            await asyncio.sleep(max(0, self.interval - (time.monotonic() - started_at)))
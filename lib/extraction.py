@@ -0,0 +1,242 @@
+import re
+
+import soupsieve
+
+
+# Named price cleaning rules: (remove whitespace before matching, pattern of the price)
+PRICE_PATTERNS = {
+    "thousands": (False, r"\b\d{1,3}(?:\s\d{3})*\b"),   # "1 234 грн" -> "1234"
+    "integer": (False, r"\d+"),                         # "1234.00" -> "1234"
+    "compact": (True, r"\d+"),                          # "1 234,00 грн" -> "1234"
+}
+
+# Removes everything except digits from a matched price
+non_digits = re.compile(r"\D")
+
+
+class FieldSpec:
+    def __init__(self, spec):
+        """
+        Compiled rule locating a single value (text or attribute) inside a product container.
+
+        Parameters:
+        - spec: str, list or dict, CSS selector, chain of selectors or a dict with the following keys:
+            - select: str or list of str, CSS selector or a chain of selectors applied one inside another
+            - index: int, position among all elements matched by the last selector (first match if not specified)
+            - attr: str, attribute to read instead of the element text
+            - before: str, keep only the text before this separator
+        """
+        if not isinstance(spec, dict):
+            spec = {"select": spec}
+
+        selectors = spec["select"] if isinstance(spec["select"], list) else [spec["select"]]
+
+        self.selectors = [soupsieve.compile(selector) for selector in selectors]
+        self.index = spec.get("index")
+        self.attr = spec.get("attr")
+        self.before = spec.get("before")
+
+
+    def find(self, container):
+        """
+        Find the element matched by the rule.
+
+        Parameters:
+        - container: Tag object, the product container
+
+        Returns:
+        - Tag object or None if the element is missing
+        """
+        element = container
+
+        for selector in self.selectors[:-1]:
+            element = selector.select_one(element)
+            if element is None:
+                return None
+
+        if self.index is None:
+            return self.selectors[-1].select_one(element)
+
+        elements = self.selectors[-1].select(element)
+
+        try:
+            return elements[self.index]
+        except IndexError:
+            return None
+
+
+    def value(self, container):
+        """
+        Read the value matched by the rule.
+
+        Parameters:
+        - container: Tag object, the product container
+
+        Returns:
+        - str or None if the element or the attribute is missing
+        """
+        element = self.find(container)
+
+        if element is None:
+            return None
+
+        value = element.get(self.attr) if self.attr else element.text
+
+        if value is not None and self.before:
+            value = value.split(self.before)[0]
+
+        return value
+
+
+class PriceSpec(FieldSpec):
+    def __init__(self, spec):
+        """
+        Compiled rule locating a price and cleaning it to a string of digits.
+
+        Parameters:
+        - spec: str, list or dict, same as FieldSpec with additional keys:
+            - pattern: str, name from PRICE_PATTERNS or a regular expression (default "thousands")
+            - pick: str, "first" or "last" match of the pattern in the text (default "first")
+        """
+        if not isinstance(spec, dict):
+            spec = {"select": spec}
+
+        super().__init__(spec)
+
+        pattern = spec.get("pattern", "thousands")
+        self.remove_whitespace, pattern = PRICE_PATTERNS.get(pattern, (False, pattern))
+        self.pattern = re.compile(pattern)
+        self.pick_last = spec.get("pick", "first") == "last"
+
+
+    def value(self, container):
+        """
+        Read the price matched by the rule.
+
+        Parameters:
+        - container: Tag object, the product container
+
+        Returns:
+        - str, digits of the price or None if the price was not found
+        """
+        text = super().value(container)
+
+        if text is None:
+            return None
+
+        if self.remove_whitespace:
+            text = "".join(text.split())
+
+        if self.pick_last:
+            matches = self.pattern.findall(text)
+            price = matches[-1] if matches else None
+        else:
+            match = self.pattern.search(text)
+            price = match.group(0) if match else None
+
+        if not price:
+            return None
+
+        return non_digits.sub("", price)
+
+
+class StockRule:
+    def __init__(self, spec):
+        """
+        Compiled rule deciding whether a product is in stock.
+
+        Parameters:
+        - spec: dict, one of the following:
+            - {"absent": selector}: in stock if the container has no element matching the selector
+            - {"present": selector}: in stock if the container has an element matching the selector
+            - {"select": selector, "contains": str or list of str}: in stock if the element text contains any of the phrases
+            - {"select": selector, "not_contains": str}: in stock if the element text does not contain the phrase
+        """
+        if "absent" in spec:
+            self.kind, self.selector = "absent", soupsieve.compile(spec["absent"])
+        elif "present" in spec:
+            self.kind, self.selector = "present", soupsieve.compile(spec["present"])
+        elif "contains" in spec:
+            self.kind, self.selector = "contains", soupsieve.compile(spec["select"])
+            self.phrases = spec["contains"] if isinstance(spec["contains"], list) else [spec["contains"]]
+        elif "not_contains" in spec:
+            self.kind, self.selector = "not_contains", soupsieve.compile(spec["select"])
+            self.phrases = [spec["not_contains"]]
+        else:
+            raise ValueError(f"Unknown stock rule: {spec}")
+
+
+    def check(self, container):
+        """
+        Check the rule against a product container.
+
+        Parameters:
+        - container: Tag object, the product container
+
+        Returns:
+        - bool, True if the rule holds
+        """
+        element = self.selector.select_one(container)
+
+        if self.kind == "absent":
+            return element is None
+        if self.kind == "present":
+            return element is not None
+
+        # A missing element means the stock status can not be confirmed
+        if element is None:
+            return False
+
+        text = element.text
+
+        if self.kind == "contains":
+            return any(phrase in text for phrase in self.phrases)
+        return not any(phrase in text for phrase in self.phrases)
+
+
+class ExtractionSpec:
+    def __init__(self, spec):
+        """
+        Declarative description of how to extract product information from a product container,
+        compiled once into CSS selectors and regular expressions.
+
+        Parameters:
+        - spec: dict, with the following keys:
+            - name: FieldSpec definition of the product name
+            - price: PriceSpec definition of the product price
+            - stock: StockRule definition or a list of them, all of which must hold for an in-stock product
+        """
+        missing_fields = {"name", "price", "stock"} - set(spec)
+
+        if missing_fields:
+            raise ValueError(f"Extraction spec is missing fields: {', '.join(sorted(missing_fields))}")
+
+        stock_rules = spec["stock"] if isinstance(spec["stock"], list) else [spec["stock"]]
+
+        self.spec = spec
+        self.name = FieldSpec(spec["name"])
+        self.price = PriceSpec(spec["price"])
+        self.stock = [StockRule(rule) for rule in stock_rules]
+
+
+    def extract(self, container):
+        """
+        Extract information about an in-stock product from a product container.
+
+        Parameters:
+        - container: Tag object, the product container
+
+        Returns:
+        - dict with 'name' and 'price' keys or None if the product is out of stock or its name or price is missing
+        """
+        # Check the stock first, out-of-stock products are skipped anyway
+        if not all(rule.check(container) for rule in self.stock):
+            return None
+
+        name = self.name.value(container)
+        price = self.price.value(container)
+
+        if name is None or price is None:
+            return None
+
+        return {'name': name.strip(), 'price': price}
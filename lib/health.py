@@ -0,0 +1,230 @@
+import logging
+import os
+import time
+from collections import deque
+
+from lib.metrics import CollectedMetric
+
+
+# Circuit states of a website, every one is exposed at /metrics
+CIRCUIT_STATES = ("closed", "half_open", "open")
+
+# Circuit breaker settings shared by all websites
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_COOL_DOWN = float(os.getenv('CIRCUIT_COOL_DOWN', 300))
+HEALTH_WINDOW = int(os.getenv('HEALTH_WINDOW', 100))
+
+
+class StoreHealth:
+    def __init__(self, name, failure_threshold, cool_down, window):
+        """
+        Tracks request outcomes of a website and decides whether it should be scraped.
+
+        The circuit is closed while the website works. After failure_threshold consecutive
+        failures it opens and the website is skipped for cool_down seconds. Then it becomes
+        half-open: a single search probes the website, and its first request closes the
+        circuit on success or opens it again on failure.
+
+        Parameters:
+        - name: str, the website name
+        - failure_threshold: int, number of consecutive failures which opens the circuit
+        - cool_down: float, number of seconds the website is skipped for
+        - window: int, number of recent requests used for the error rate and latency percentiles
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self.recent = deque(maxlen=window)   # (succeeded, latency in seconds)
+
+
+    def allow(self):
+        """
+        Decide whether a search should scrape the website.
+
+        Returns:
+        - bool, False if the website should be skipped
+        """
+        now = time.monotonic()
+
+        if self.state == "open" and now - self.opened_at >= self.cool_down:
+            self.state = "half_open"
+            self.probe_started_at = None
+
+        if self.state == "half_open":
+            # Let a single search probe the website, or another one if the probe never reported back
+            if self.probe_started_at is None or now - self.probe_started_at >= self.cool_down:
+                self.probe_started_at = now
+                return True
+            return False
+
+        return self.state == "closed"
+
+
+    def record_success(self, latency=None):
+        """
+        Record a successful request.
+
+        Parameters:
+        - latency: float, request duration in seconds (optional)
+        """
+        self.recent.append((True, latency))
+        self.consecutive_failures = 0
+
+        if self.state != "closed":
+            logging.warning(f"{self.name} recovered, closing the circuit")
+            self.state = "closed"
+
+
+    def record_failure(self, latency=None):
+        """
+        Record a failed request, opening the circuit if the website keeps failing.
+
+        Parameters:
+        - latency: float, request duration in seconds (optional)
+        """
+        self.recent.append((False, latency))
+        self.consecutive_failures += 1
+
+        if self.state == "half_open" or (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+            logging.warning(f"{self.name} failed {self.consecutive_failures} times in a row, skipping it for {self.cool_down:.0f} sec.")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+    def latency_percentile(self, percentile):
+        """
+        Calculate a percentile of recent request latencies.
+
+        Parameters:
+        - percentile: float, the percentile between 0 and 100
+
+        Returns:
+        - float, the latency in seconds or None if no latencies were recorded
+        """
+        latencies = sorted(latency for _, latency in self.recent if latency is not None)
+
+        if not latencies:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+
+    def snapshot(self):
+        """
+        Return the current health of the website.
+
+        Returns:
+        - dict, circuit state, consecutive failures, error rate and latency percentiles
+        """
+        failures = sum(1 for succeeded, _ in self.recent if not succeeded)
+
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "error_rate": failures / len(self.recent) if self.recent else 0.0,
+            "latency_p50": self.latency_percentile(50),
+            "latency_p95": self.latency_percentile(95)
+        }
+
+
+class HealthRegistry:
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cool_down=CIRCUIT_COOL_DOWN, window=HEALTH_WINDOW):
+        """
+        Holds StoreHealth objects of all websites, creating them on first use.
+
+        Parameters:
+        - failure_threshold: int, number of consecutive failures which opens a circuit
+        - cool_down: float, number of seconds an unhealthy website is skipped for
+        - window: int, number of recent requests kept per website
+        """
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.window = window
+        self.stores = {}
+
+
+    def get(self, name):
+        """
+        Return health of a website.
+
+        Parameters:
+        - name: str, the website name
+
+        Returns:
+        - StoreHealth object
+        """
+        if name not in self.stores:
+            self.stores[name] = StoreHealth(name, self.failure_threshold, self.cool_down, self.window)
+        return self.stores[name]
+
+
+    def snapshot(self):
+        """
+        Return health of all tracked websites.
+
+        Returns:
+        - dict, website names mapped to their health snapshots
+        """
+        return {name: health.snapshot() for name, health in self.stores.items()}
+
+
+# Health of websites shared by all searches
+store_health = HealthRegistry()
+
+
+def health_gauges():
+    """
+    Read the health of all tracked websites for /metrics.
+
+    Returns:
+    - dict, metric names mapped to dicts of label values and values
+    """
+    gauges = {"state": {}, "consecutive_failures": {}, "error_rate": {}, "latency": {}}
+
+    for name, snapshot in store_health.snapshot().items():
+        for state in CIRCUIT_STATES:
+            gauges["state"][(name, state)] = int(snapshot["state"] == state)
+
+        gauges["consecutive_failures"][(name,)] = snapshot["consecutive_failures"]
+        gauges["error_rate"][(name,)] = snapshot["error_rate"]
+
+        for quantile, key in (("0.5", "latency_p50"), ("0.95", "latency_p95")):
+            if snapshot[key] is not None:
+                gauges["latency"][(name, quantile)] = snapshot[key]
+
+    return gauges
+
+
+# Health of every website exposed at /metrics
+CollectedMetric(
+    "store_circuit_state",
+    "Circuit breaker state per store, 1 for the current state",
+    "gauge",
+    ("store", "state"),
+    lambda: health_gauges()["state"]
+)
+CollectedMetric(
+    "store_consecutive_failures",
+    "Number of consecutive failed requests per store",
+    "gauge",
+    ("store",),
+    lambda: health_gauges()["consecutive_failures"]
+)
+CollectedMetric(
+    "store_error_rate",
+    f"Share of failed requests among the last {HEALTH_WINDOW} requests per store",
+    "gauge",
+    ("store",),
+    lambda: health_gauges()["error_rate"]
+)
+CollectedMetric(
+    "store_request_latency_seconds",
+    f"Latency percentiles of the last {HEALTH_WINDOW} requests per store",
+    "gauge",
+    ("store", "quantile"),
+    lambda: health_gauges()["latency"]
+)
@@ -0,0 +1,220 @@
+import asyncio
+import contextlib
+import os
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+from lib.metrics import CollectedMetric
+
+
+# Request budgets applied to every website host, shared by all searches
+HOST_MAX_IN_FLIGHT = int(os.getenv('HOST_MAX_IN_FLIGHT', 4))
+HOST_RATE_LIMIT = float(os.getenv('HOST_RATE_LIMIT', 5))
+HOST_BURST = float(os.getenv('HOST_BURST', HOST_MAX_IN_FLIGHT))
+
+
+class HostQueue:
+    def __init__(self, max_in_flight, rate_limit, burst):
+        """
+        Admits requests to a single host within its concurrency and rate budgets.
+
+        Waiting requests are queued per search and searches are served round-robin,
+        so a search paging deep into the results does not hold back the others.
+
+        Parameters:
+        - max_in_flight: int, maximum number of concurrent requests
+        - rate_limit: float, number of requests per second (not limited if 0)
+        - burst: float, number of requests which may start at once after an idle period
+        """
+        self.max_in_flight = max_in_flight
+        self.rate_limit = rate_limit
+        self.burst = max(1.0, burst)
+        self.in_flight = 0
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.waiters = OrderedDict()   # search key -> deque of futures, in round-robin order
+        self.wakeup = None
+
+
+    def refill(self):
+        """
+        Add rate tokens earned since the last refill.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate_limit)
+        self.updated_at = now
+
+
+    def can_start(self):
+        """
+        Check if a request can start now, taking its rate token if so.
+
+        Returns:
+        - bool, True if the request may start
+        """
+        if self.in_flight >= self.max_in_flight:
+            return False
+
+        if self.rate_limit <= 0:
+            return True
+
+        self.refill()
+
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+
+    async def acquire(self, key):
+        """
+        Wait until a request of the given search may start.
+
+        Parameters:
+        - key: hashable, identifies the search the request belongs to
+        """
+        if not self.waiters and self.can_start():
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(key, deque()).append(waiter)
+        self.dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Give the slot back if it was granted right before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+
+    def release(self):
+        """
+        Free the slot of a finished request and admit the next waiting ones.
+        """
+        self.in_flight -= 1
+        self.dispatch()
+
+
+    def dispatch(self):
+        """
+        Admit waiting requests while the budgets allow, taking one request per search in turn.
+        """
+        while self.waiters:
+            key, queue = next(iter(self.waiters.items()))
+
+            # Drop requests whose searches gave up waiting
+            while queue and queue[0].done():
+                queue.popleft()
+
+            if not queue:
+                del self.waiters[key]
+                continue
+
+            if not self.can_start():
+                break
+
+            queue.popleft().set_result(None)
+            self.in_flight += 1
+
+            # Move the search to the end of the round
+            del self.waiters[key]
+            if queue:
+                self.waiters[key] = queue
+
+        # Wake up once the next rate token is earned, unless a finishing request does it first
+        if self.waiters and self.in_flight < self.max_in_flight and self.rate_limit > 0 and self.wakeup is None:
+            delay = (1 - self.tokens) / self.rate_limit
+            self.wakeup = asyncio.get_running_loop().call_later(delay, self.on_wakeup)
+
+
+    def on_wakeup(self):
+        """
+        Timer callback admitting requests delayed by the rate limit.
+        """
+        self.wakeup = None
+        self.dispatch()
+
+
+class HostScheduler:
+    def __init__(self, max_in_flight=HOST_MAX_IN_FLIGHT, rate_limit=HOST_RATE_LIMIT, burst=HOST_BURST):
+        """
+        Shared scheduler of website requests, keeping a separate queue for every host.
+
+        Parameters:
+        - max_in_flight: int, maximum number of concurrent requests per host
+        - rate_limit: float, number of requests per second per host (not limited if 0)
+        - burst: float, number of requests which may start at once on an idle host
+        """
+        self.max_in_flight = max_in_flight
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.hosts = {}
+
+
+    def queue(self, url):
+        """
+        Return the queue of the URL's host, creating it on first use.
+
+        Parameters:
+        - url: str, the requested URL
+
+        Returns:
+        - HostQueue object
+        """
+        host = urlsplit(url).netloc
+
+        if host not in self.hosts:
+            self.hosts[host] = HostQueue(self.max_in_flight, self.rate_limit, self.burst)
+        return self.hosts[host]
+
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url, key=None):
+        """
+        Hold a request slot of the URL's host for the duration of the block.
+
+        Parameters:
+        - url: str, the requested URL
+        - key: hashable, identifies the search the request belongs to (optional)
+        """
+        queue = self.queue(url)
+        await queue.acquire(key)
+
+        try:
+            yield
+        finally:
+            queue.release()
+
+
+    def stats(self):
+        """
+        Return the current load of every host.
+
+        Returns:
+        - dict, host names mapped to numbers of in-flight and waiting requests
+        """
+        return {
+            host: {
+                "in_flight": queue.in_flight,
+                "waiting": sum(len(waiters) for waiters in queue.waiters.values())
+            }
+            for host, queue in self.hosts.items()
+        }
+
+
+# Scheduler of website requests shared by all searches
+host_scheduler = HostScheduler()
+
+# Load of every host exposed at /metrics
+CollectedMetric(
+    "host_requests",
+    "Requests to a store host holding a slot (in_flight) or queued for one (waiting)",
+    "gauge",
+    ("host", "state"),
+    lambda: {(host, state): count for host, load in host_scheduler.stats().items() for state, count in load.items()}
+)
@@ -0,0 +1,93 @@
+import os
+
+import httpx
+from fake_useragent import UserAgent
+
+# httpx decodes brotli responses only if a brotli package is installed
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+# Connection pool settings shared by every store request
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', 50))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 120))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 30))
+
+# Ask stores for compressed pages, preferring brotli when it can be decoded
+ACCEPT_ENCODING = "br, gzip, deflate" if brotli is not None else "gzip, deflate"
+
+# Shared client, created lazily inside the running event loop
+_client = None
+
+# Pool of browser user agents, loaded once
+_user_agents = None
+
+
+def create_client():
+    """
+    Create a new asynchronous HTTP client with a keep-alive connection pool, requesting compressed responses.
+
+    Returns:
+    - httpx.AsyncClient, the configured client
+    """
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=HTTP_TIMEOUT,
+        follow_redirects=True,
+        headers={"Accept-Encoding": ACCEPT_ENCODING}
+    )
+
+
+def get_client():
+    """
+    Return the shared HTTP client, creating it on first use.
+
+    Connections are pooled per host, so consecutive pages and concurrent searches
+    against the same store reuse already opened sockets.
+
+    Returns:
+    - httpx.AsyncClient, the shared client
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = create_client()
+
+    return _client
+
+
+def random_user_agent():
+    """
+    Pick a random browser user agent from the shared pool, loading the pool on first use.
+
+    Returns:
+    - str, the user agent
+    """
+    global _user_agents
+
+    if _user_agents is None:
+        _user_agents = UserAgent()
+
+    return _user_agents.random
+
+
+async def close_client():
+    """
+    Close the shared HTTP client and release all pooled connections.
+    """
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+
+
+# Local metrics endpoint (disabled if the port is 0)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+# Bucket upper bounds of latency histograms in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# All metrics, in the order they are exposed
+registry = []
+
+# Whether the bot finished its warm-up, reported at /ready
+readiness = {"ready": False}
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        """
+        Cumulative histogram of observed values, exposed in the Prometheus text format.
+
+        Parameters:
+        - name: str, the metric name
+        - documentation: str, the metric description
+        - labelnames: tuple of str, names of labels every observation is made with
+        - buckets: tuple of float, bucket upper bounds in ascending order
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series = {}   # label values -> [bucket counts, sum, count]
+        registry.append(self)
+
+
+    def observe(self, value, *labelvalues):
+        """
+        Record an observed value.
+
+        Parameters:
+        - value: float, the observed value
+        - labelvalues: str, values of the labels in the order of labelnames
+        """
+        series = self.series.get(labelvalues)
+
+        if series is None:
+            series = self.series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+
+        series[1] += value
+        series[2] += 1
+
+
+    def render(self):
+        """
+        Render the histogram in the Prometheus text format.
+
+        Returns:
+        - str, the exposition lines
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+
+        for labelvalues, (bucket_counts, total, count) in sorted(self.series.items()):
+            labels = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(self.labelnames, labelvalues))
+            separator = "," if labels else ""
+
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{labels}{separator}le="{bound}"}} {bucket_count}')
+
+            lines.append(f'{self.name}_bucket{{{labels}{separator}le="+Inf"}} {count}')
+            series_labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{series_labels} {total}")
+            lines.append(f"{self.name}_count{series_labels} {count}")
+
+        return "\n".join(lines)
+
+
+class CollectedMetric:
+    def __init__(self, name, documentation, metric_type, labelnames, collect):
+        """
+        Gauge or counter whose values are kept by another component and read when metrics are rendered.
+
+        Parameters:
+        - name: str, the metric name
+        - documentation: str, the metric description
+        - metric_type: str, "gauge" or "counter"
+        - labelnames: tuple of str, names of the labels
+        - collect: callable, returns a dict mapping tuples of label values to the current values
+        """
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = labelnames
+        self.collect = collect
+        registry.append(self)
+
+
+    def render(self):
+        """
+        Render the current values in the Prometheus text format.
+
+        Returns:
+        - str, the exposition lines
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+        for labelvalues, value in sorted(self.collect().items()):
+            labels = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(self.labelnames, labelvalues))
+            series_labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{series_labels} {value}")
+
+        return "\n".join(lines)
+
+
+def escape_label(value):
+    """
+    Escape a label value for the Prometheus text format.
+
+    Parameters:
+    - value: str, the label value
+
+    Returns:
+    - str, the escaped value
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics():
+    """
+    Render all registered metrics in the Prometheus text format.
+
+    Returns:
+    - str, the metrics page
+    """
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+stage_seconds = Histogram(
+    "store_stage_seconds",
+    "Time spent in a scraping stage per store (queue, connect, tls, fetch, parse_queue, parse, extract, scrape)",
+    ("store", "stage"),
+    LATENCY_BUCKETS
+)
+
+pages_fetched = Histogram(
+    "store_pages_fetched",
+    "Number of pages fetched per store scrape",
+    ("store",),
+    (1, 2, 3, 5, 10, 20, 50)
+)
+
+response_bytes = Histogram(
+    "store_response_bytes",
+    "Bytes downloaded per page request per store, after transfer compression",
+    ("store",),
+    (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000)
+)
+
+search_seconds = Histogram(
+    "search_seconds",
+    "Total time of a search across all stores",
+    (),
+    LATENCY_BUCKETS
+)
+
+
+async def handle_metrics_request(reader, writer):
+    """
+    Answer a single HTTP request of the metrics endpoint.
+
+    Parameters:
+    - reader: asyncio.StreamReader, the request stream
+    - writer: asyncio.StreamWriter, the response stream
+    """
+    try:
+        request_line = await reader.readline()
+
+        # Skip request headers
+        while (await reader.readline()).strip():
+            pass
+
+        parts = request_line.decode('latin-1').split()
+
+        path = parts[1].split("?")[0] if len(parts) >= 2 and parts[0] == "GET" else None
+
+        if path == "/metrics":
+            status, body = "200 OK", render_metrics().encode()
+        elif path == "/ready":
+            status, body = ("200 OK", b"ready\n") if readiness["ready"] else ("503 Service Unavailable", b"warming up\n")
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        logging.warning(f"Metrics request failed: {e!r}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Start serving metrics at http://host:port/metrics and readiness at http://host:port/ready.
+
+    Parameters:
+    - host: str, the address to listen on
+    - port: int, the port to listen on
+
+    Returns:
+    - asyncio.Server, the running server
+    """
+    return await asyncio.start_server(handle_metrics_request, host, port)
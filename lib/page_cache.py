@@ -0,0 +1,364 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Pages younger than the TTL are served without a request, older ones are revalidated with the store
+PAGE_CACHE_TTL = float(os.getenv('PAGE_CACHE_TTL', 300))
+# Pages are kept for conditional requests up to this age (the cache is disabled if 0)
+PAGE_CACHE_MAX_AGE = float(os.getenv('PAGE_CACHE_MAX_AGE', 86400))
+# Megabytes of recently used pages kept in memory in front of the database
+PAGE_CACHE_MEMORY_MB = float(os.getenv('PAGE_CACHE_MEMORY_MB', 64))
+# Number of seconds between periodic writes of buffered pages
+PAGE_CACHE_FLUSH_INTERVAL = float(os.getenv('PAGE_CACHE_FLUSH_INTERVAL', 10))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    content BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_stored_at ON pages (stored_at);
+"""
+
+# Number of writes between removals of expired pages
+PRUNE_EVERY = 100
+
+# Cache-Control directives forbidding a shared cache to store a response
+UNCACHEABLE_DIRECTIVES = {"no-store", "private"}
+
+
+def is_cacheable(cache_control):
+    """
+    Check if a response may be stored in the page cache.
+
+    Parameters:
+    - cache_control: str, the Cache-Control header of the response (optional)
+
+    Returns:
+    - bool, False if the response forbids storing it
+    """
+    if not cache_control:
+        return True
+
+    directives = {directive.split("=")[0].strip().lower() for directive in cache_control.split(",")}
+    return not directives & UNCACHEABLE_DIRECTIVES
+
+
+class CachedPage:
+    def __init__(self, content, etag, last_modified, stored_at):
+        """
+        Represents a cached page with its validators.
+
+        Parameters:
+        - content: bytes, the decoded page content
+        - etag: str, the ETag header of the response (optional)
+        - last_modified: str, the Last-Modified header of the response (optional)
+        - stored_at: float, timestamp of the last download or revalidation
+        """
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+
+class PageCache:
+    def __init__(self, db_path, ttl, max_age, memory_size=64 * 2**20, flush_interval=10, batch_size=50):
+        """
+        Cache of fetched pages in memory, backed by a SQLite database.
+
+        Recently used pages are served from memory, so a cache hit never leaves the event loop.
+        New and revalidated pages are buffered and written in batches, compressed, by the cache's
+        own worker thread, which also reads pages missing in memory. The URLs stored in the
+        database are known in memory, so pages which were never cached are not looked up.
+        The database is opened on first use, so importing the module creates no files.
+
+        Parameters:
+        - db_path: str, path to the SQLite database file
+        - ttl: float, number of seconds a page is served without revalidation
+        - max_age: float, number of seconds a page is kept for revalidation
+        - memory_size: int, number of bytes of page content kept in memory
+        - flush_interval: float, number of seconds between periodic writes of buffered pages
+        - batch_size: int, number of buffered pages which triggers an immediate write
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.memory_size = memory_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pages = OrderedDict()      # url -> CachedPage, least recently used first
+        self.memory_used = 0
+        self.pending = {}               # url -> CachedPage to write or None to delete
+        self.touched = {}               # url -> timestamp of a revalidation to write
+        self.flush_task = None
+        self.writes = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-cache")
+        self.connection = None
+        self.stored_urls = None
+        self.open_lock = threading.Lock()
+
+
+    def open(self):
+        """
+        Open the database and load the stored URLs, unless already done.
+        """
+        with self.open_lock:
+            if self.connection is not None:
+                return
+
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+
+            # The connection is used from the cache's worker thread only, after the URLs are loaded
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.executescript(SCHEMA)
+            self.stored_urls = {
+                url for url, in connection.execute("SELECT url FROM pages WHERE stored_at >= ?", (time.time() - self.max_age,))
+            }
+            self.connection = connection
+
+
+    def read(self, url):
+        """
+        Read a page from the database, called from the cache's worker thread.
+
+        Parameters:
+        - url: str, the page URL
+
+        Returns:
+        - CachedPage object or None if the page is missing or too old
+        """
+        row = self.connection.execute(
+            "SELECT content, etag, last_modified, stored_at FROM pages WHERE url = ? AND stored_at >= ?",
+            (url, time.time() - self.max_age)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        content, etag, last_modified, stored_at = row
+        return CachedPage(zlib.decompress(content), etag, last_modified, stored_at)
+
+
+    def write(self, pending, touched):
+        """
+        Write buffered pages to the database, called from the cache's worker thread.
+
+        Parameters:
+        - pending: dict, URLs mapped to CachedPage objects to store or None to delete
+        - touched: dict, URLs of revalidated pages mapped to the revalidation timestamps
+        """
+        rows = [
+            (url, zlib.compress(page.content, 1), page.etag, page.last_modified, page.stored_at)
+            for url, page in pending.items() if page is not None
+        ]
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages (url, content, etag, last_modified, stored_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self.connection.executemany(
+                "DELETE FROM pages WHERE url = ?", [(url,) for url, page in pending.items() if page is None]
+            )
+            self.connection.executemany(
+                "UPDATE pages SET stored_at = ? WHERE url = ?", [(stored_at, url) for url, stored_at in touched.items()]
+            )
+
+            self.writes += 1
+
+            if self.writes % PRUNE_EVERY == 0:
+                self.connection.execute("DELETE FROM pages WHERE stored_at < ?", (time.time() - self.max_age,))
+
+
+    def remember(self, url, page):
+        """
+        Keep a page in memory, dropping the least recently used pages over the memory size.
+
+        Parameters:
+        - url: str, the page URL
+        - page: CachedPage object, the page
+        """
+        previous_page = self.pages.pop(url, None)
+
+        if previous_page is not None:
+            self.memory_used -= len(previous_page.content)
+
+        self.pages[url] = page
+        self.memory_used += len(page.content)
+
+        while self.memory_used > self.memory_size and self.pages:
+            _, evicted_page = self.pages.popitem(last=False)
+            self.memory_used -= len(evicted_page.content)
+
+
+    def forget(self, url):
+        """
+        Remove a page from memory and from the database.
+
+        Parameters:
+        - url: str, the page URL
+        """
+        page = self.pages.pop(url, None)
+
+        if page is not None:
+            self.memory_used -= len(page.content)
+
+        self.touched.pop(url, None)
+        self.open()
+
+        if url in self.stored_urls:
+            self.stored_urls.discard(url)
+            self.pending[url] = None
+            self.schedule_flush()
+
+
+    def is_fresh(self, page):
+        """
+        Check if a cached page can be served without revalidation.
+
+        Parameters:
+        - page: CachedPage object, the cached page
+
+        Returns:
+        - bool, True if the page is younger than the TTL
+        """
+        return time.time() - page.stored_at < self.ttl
+
+
+    async def get(self, url):
+        """
+        Return a cached page.
+
+        Parameters:
+        - url: str, the page URL
+
+        Returns:
+        - CachedPage object or None if the page is not cached
+        """
+        if self.connection is None:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.open)
+
+        page = self.pages.get(url) or self.pending.get(url)
+
+        if page is not None:
+            if time.time() - page.stored_at >= self.max_age:
+                return None
+
+            self.remember(url, page)
+            return page
+
+        if url not in self.stored_urls:
+            return None
+
+        try:
+            page = await asyncio.get_running_loop().run_in_executor(self.executor, self.read, url)
+        except (sqlite3.Error, zlib.error) as e:
+            logging.error(f"Failed to read cached page {url}: {e}")
+            return None
+
+        if page is None:
+            # The page expired and was pruned
+            self.stored_urls.discard(url)
+            return None
+
+        self.remember(url, page)
+        return page
+
+
+    def put(self, url, content, etag=None, last_modified=None, cache_control=None):
+        """
+        Store a downloaded page, unless its response forbids it.
+
+        Parameters:
+        - url: str, the page URL
+        - content: bytes, the decoded page content
+        - etag: str, the ETag header of the response (optional)
+        - last_modified: str, the Last-Modified header of the response (optional)
+        - cache_control: str, the Cache-Control header of the response (optional)
+        """
+        if not is_cacheable(cache_control):
+            self.forget(url)
+            return
+
+        page = CachedPage(content, etag, last_modified, time.time())
+
+        self.open()
+        self.remember(url, page)
+        self.pending[url] = page
+        self.touched.pop(url, None)
+        self.stored_urls.add(url)
+        self.schedule_flush()
+
+
+    def revalidated(self, url, page):
+        """
+        Record that the store confirmed a cached page is unchanged.
+
+        Parameters:
+        - url: str, the page URL
+        - page: CachedPage object, the revalidated page
+        """
+        page.stored_at = time.time()
+        self.remember(url, page)
+
+        # A page not written yet is written with the new timestamp
+        if url not in self.pending:
+            self.touched[url] = page.stored_at
+            self.schedule_flush()
+
+
+    def schedule_flush(self):
+        """
+        Write a full batch right away instead of waiting for the periodic flush.
+        """
+        if len(self.pending) + len(self.touched) >= self.batch_size and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.ensure_future(self.flush())
+
+
+    async def flush(self):
+        """
+        Write all buffered pages to the database.
+        """
+        if not self.pending and not self.touched:
+            return
+
+        pending, self.pending = self.pending, {}
+        touched, self.touched = self.touched, {}
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.write, pending, touched)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write {len(pending)} pages to the page cache: {e}")
+
+
+    async def run(self):
+        """
+        Open the database, then write buffered pages every flush_interval until cancelled, flushing the rest on cancellation.
+        """
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.open)
+
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+# Page cache shared by all searches and the catalog crawler, its database is opened on first use
+if PAGE_CACHE_MAX_AGE > 0:
+    page_cache = PageCache(
+        os.path.join('data', 'pages.db'), PAGE_CACHE_TTL, PAGE_CACHE_MAX_AGE,
+        PAGE_CACHE_MEMORY_MB * 2**20, PAGE_CACHE_FLUSH_INTERVAL
+    )
+else:
+    page_cache = None
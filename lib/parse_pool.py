@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Number of worker processes parsing pages (pages are parsed on the event loop if 0)
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', os.cpu_count() or 1))
+
+# Workers are not forked from the bot process, which is multi-threaded, but started by a fork server
+# (or spawned where it is not available). Like spawned processes, they run the bot script again as
+# __mp_main__, so the script opens its databases in startup() only
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Parsing libraries the fork server imports once for all workers, lib is imported by each worker with its first page
+FORKSERVER_PRELOAD = ["bs4", "lxml.html", "soupsieve"]
+
+# Parsers of the websites in a worker process, by website name
+worker_websites = {}
+
+
+def load_website(definition):
+    """
+    Return the parser of a website in a worker process, building it if it is missing or its definition changed.
+
+    Parameters:
+    - definition: dict, the parser definition of the website (see WebsiteScraper.parser_definition)
+
+    Returns:
+    - WebsiteScraper object, able to parse pages only
+    """
+    # Imported here, the website scraper module imports this one
+    from lib.websites_scraper import WebsiteScraper
+
+    website = worker_websites.get(definition["name"])
+
+    if website is None or website.parser_definition != definition:
+        website = WebsiteScraper(
+            base_url="", search_query_url="", search_query_separator=" ",
+            social_network="", tel_vodafone="", tel_kyivstar="",
+            **definition
+        )
+        worker_websites[definition["name"]] = website
+
+    return website
+
+
+def init_worker(definitions):
+    """
+    Initializer of worker processes: compile parsers of the websites known at start.
+
+    Parameters:
+    - definitions: list of dict, parser definitions of the websites
+    """
+    for definition in definitions:
+        try:
+            load_website(definition)
+        except Exception as e:
+            logging.error(f"Parse worker failed to load {definition['name']}: {e}")
+
+
+def parse_in_worker(definition, content, query_tokens, previous_fingerprint, url):
+    """
+    Parse a page in a worker process, see WebsiteScraper.parse_page.
+    """
+    return load_website(definition).parse_page(content, query_tokens, previous_fingerprint, url)
+
+
+def worker_pid():
+    """
+    Task used to start worker processes ahead of the first page.
+
+    Returns:
+    - int, the worker process ID
+    """
+    return os.getpid()
+
+
+class ParsePool:
+    def __init__(self, workers):
+        """
+        Pool of worker processes parsing pages and extracting products.
+
+        Parsing is CPU-bound and holds the GIL, so in worker processes it uses every core
+        and leaves the event loop free for fetching. Pages go in as raw bytes and products
+        come back as (name, price) tuples. Workers compile the website parsers once, every
+        page carries the small parser definition, so stores reloaded later are picked up too.
+
+        Parameters:
+        - workers: int, number of worker processes
+        """
+        self.workers = workers
+        self.executor = None
+
+
+    def start(self, websites=()):
+        """
+        Create the worker pool unless it is running.
+
+        Parameters:
+        - websites: list of WebsiteScraper objects, websites whose parsers the workers load at start
+
+        Returns:
+        - ProcessPoolExecutor object, the pool
+        """
+        if self.executor is None:
+            context = multiprocessing.get_context(START_METHOD)
+
+            if START_METHOD == "forkserver":
+                context.set_forkserver_preload(FORKSERVER_PRELOAD)
+
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=([website.parser_definition for website in websites],)
+            )
+
+        return self.executor
+
+
+    async def warm_up(self, websites):
+        """
+        Start the worker processes and load the website parsers, so the first search does not wait for them.
+
+        Parameters:
+        - websites: list of WebsiteScraper objects, the websites to load
+        """
+        executor = self.start(websites)
+        loop = asyncio.get_running_loop()
+
+        try:
+            await asyncio.gather(*(loop.run_in_executor(executor, worker_pid) for _ in range(self.workers)))
+        except BrokenProcessPool as e:
+            logging.error(f"Parse workers failed to start: {e}")
+            self.restart(executor)
+
+
+    async def parse(self, website, content, query_tokens, previous_fingerprint, url):
+        """
+        Parse a page in a worker process.
+
+        Parameters:
+        - website: WebsiteScraper object, the website the page belongs to
+        - content: bytes, the HTML content of the page
+        - query_tokens: frozenset of str, stems of the search query
+        - previous_fingerprint: bytes, fingerprint of the previous page of the scraping run (optional)
+        - url: str, the page url used in logger
+
+        Returns:
+        - tuple, the result of WebsiteScraper.parse_page or None if the worker died
+        """
+        executor = self.start()
+        loop = asyncio.get_running_loop()
+
+        try:
+            return await loop.run_in_executor(
+                executor, parse_in_worker, website.parser_definition, content, query_tokens, previous_fingerprint, url
+            )
+        except BrokenProcessPool as e:
+            logging.error(f"Parse worker died while parsing {url}, restarting the pool: {e}")
+            self.restart(executor)
+            return None
+
+
+    def restart(self, executor):
+        """
+        Replace a broken pool with a new one on the next use.
+
+        Parameters:
+        - executor: ProcessPoolExecutor object, the broken pool
+        """
+        # Concurrent failures of the same pool restart it once
+        if self.executor is executor:
+            self.executor = None
+            executor.shutdown(cancel_futures=True)
+
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+# Pool of parse workers shared by all searches and the catalog crawler
+if PARSE_WORKERS > 0:
+    parse_pool = ParsePool(PARSE_WORKERS)
+else:
+    parse_pool = None
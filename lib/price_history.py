@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+# Number of days prices are kept for (price history is disabled if 0)
+PRICE_HISTORY_DAYS = float(os.getenv('PRICE_HISTORY_DAYS', 365))
+# Number of seconds between periodic writes of buffered prices
+PRICE_HISTORY_FLUSH_INTERVAL = float(os.getenv('PRICE_HISTORY_FLUSH_INTERVAL', 30))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS store_prices (
+    id INTEGER PRIMARY KEY,
+    query TEXT NOT NULL,
+    store TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    day TEXT NOT NULL,
+    price_min INTEGER NOT NULL,
+    price_max INTEGER NOT NULL,
+    products_qty INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS store_prices_query_timestamp ON store_prices (query, timestamp);
+CREATE INDEX IF NOT EXISTS store_prices_store_timestamp ON store_prices (store, timestamp);
+CREATE INDEX IF NOT EXISTS store_prices_timestamp ON store_prices (timestamp);
+
+CREATE TABLE IF NOT EXISTS product_prices (
+    id INTEGER PRIMARY KEY,
+    query TEXT NOT NULL,
+    store TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    product TEXT NOT NULL,
+    price INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS product_prices_query_timestamp ON product_prices (query, timestamp);
+CREATE INDEX IF NOT EXISTS product_prices_store_product_timestamp ON product_prices (store, product, timestamp);
+CREATE INDEX IF NOT EXISTS product_prices_timestamp ON product_prices (timestamp);
+"""
+
+# Number of writes between removals of expired prices
+PRUNE_EVERY = 100
+
+
+class PriceHistory:
+    def __init__(self, db_path, max_age, flush_interval=30, batch_size=1000):
+        """
+        Time series of prices found by searches in a local SQLite database.
+
+        Every search adds the price range and the number of products of each store,
+        and the price of each product. Prices are buffered in memory and written in
+        batches from a worker thread, so searches never wait for the disk. The database
+        is opened by the first worker thread using it, so importing the module creates no files.
+
+        Parameters:
+        - db_path: str, path to the SQLite database file
+        - max_age: float, number of seconds prices are kept for
+        - flush_interval: float, number of seconds between periodic writes of buffered prices
+        - batch_size: int, number of buffered product prices which triggers an immediate write
+        """
+        self.db_path = db_path
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.store_rows = []
+        self.product_rows = []
+        self.flush_task = None
+        self.writes = 0
+
+        # The connection is used from worker threads, one at a time
+        self.connection = None
+        self.connection_lock = threading.Lock()
+
+
+    def open(self):
+        """
+        Open the database, unless already done, called from a worker thread holding the connection lock.
+        """
+        if self.connection is not None:
+            return
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.executescript(SCHEMA)
+        self.connection = connection
+
+
+    def record(self, query, results):
+        """
+        Buffer the prices found by a search.
+
+        Parameters:
+        - query: str, the normalized search query
+        - results: list of dict, the websites' data from the search result
+        """
+        timestamp = time.time()
+        day = time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+        for website in results:
+            self.store_rows.append((
+                query, website["website"], timestamp, day,
+                website["price_uah_min"], website["price_uah_max"], website["products_qty"]
+            ))
+            self.product_rows.extend(
+                (query, website["website"], timestamp, product.name, int(product.price))
+                for product in website["products"]
+            )
+
+        # Write a full batch right away instead of waiting for the periodic flush
+        if len(self.product_rows) >= self.batch_size and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.ensure_future(self.flush())
+
+
+    def write(self, store_rows, product_rows):
+        """
+        Write prices to the database, called from a worker thread.
+
+        Parameters:
+        - store_rows: list of tuples, price ranges of stores
+        - product_rows: list of tuples, prices of products
+        """
+        with self.connection_lock:
+            self.open()
+
+            with self.connection:
+                self.connection.executemany(
+                    """INSERT INTO store_prices (query, store, timestamp, day, price_min, price_max, products_qty)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    store_rows
+                )
+                self.connection.executemany(
+                    "INSERT INTO product_prices (query, store, timestamp, product, price) VALUES (?, ?, ?, ?, ?)",
+                    product_rows
+                )
+
+                self.writes += 1
+
+                if self.writes % PRUNE_EVERY == 0:
+                    expired = time.time() - self.max_age
+                    self.connection.execute("DELETE FROM store_prices WHERE timestamp < ?", (expired,))
+                    self.connection.execute("DELETE FROM product_prices WHERE timestamp < ?", (expired,))
+
+
+    async def flush(self):
+        """
+        Write all buffered prices to the database.
+        """
+        if not self.store_rows:
+            return
+
+        store_rows, self.store_rows = self.store_rows, []
+        product_rows, self.product_rows = self.product_rows, []
+
+        try:
+            await asyncio.to_thread(self.write, store_rows, product_rows)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write {len(store_rows)} store prices to the price history: {e}")
+
+
+    async def run(self):
+        """
+        Write buffered prices every flush_interval until cancelled, flushing the rest on cancellation.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+    def query_trend(self, query, days, limit):
+        """
+        Read the price history of a query from the database, called from a worker thread.
+
+        Parameters:
+        - query: str, the normalized search query
+        - days: int, number of recent days to read
+        - limit: int, maximum number of days in the daily series
+
+        Returns:
+        - dict, see trend()
+        """
+        since = time.time() - days * 86400
+
+        with self.connection_lock:
+            self.open()
+
+            daily = self.connection.execute(
+                """SELECT day, MIN(price_min), COUNT(DISTINCT store) FROM store_prices
+                   WHERE query = ? AND timestamp >= ? GROUP BY day ORDER BY day DESC LIMIT ?""",
+                (query, since, limit)
+            ).fetchall()
+
+            # Bare columns of an aggregate query come from the row with the latest or the earliest timestamp
+            latest = self.connection.execute(
+                """SELECT store, MAX(timestamp), price_min, price_max, products_qty FROM store_prices
+                   WHERE query = ? AND timestamp >= ? GROUP BY store""",
+                (query, since)
+            ).fetchall()
+
+            earliest = dict(self.connection.execute(
+                """SELECT store, price_min FROM (
+                       SELECT store, MIN(timestamp), price_min FROM store_prices
+                       WHERE query = ? AND timestamp >= ? GROUP BY store
+                   )""",
+                (query, since)
+            ).fetchall())
+
+            lowest = self.connection.execute(
+                """SELECT product, store, price, timestamp FROM product_prices
+                   WHERE query = ? AND timestamp >= ? ORDER BY price LIMIT 1""",
+                (query, since)
+            ).fetchone()
+
+        stores = [
+            (store, timestamp, price_min, price_max, products_qty, earliest.get(store, price_min))
+            for store, timestamp, price_min, price_max, products_qty in sorted(latest, key=lambda row: row[2])
+        ]
+
+        return {"daily": daily, "stores": stores, "lowest": lowest}
+
+
+    async def trend(self, query, days=30, limit=10):
+        """
+        Return the price history of a query, including buffered prices.
+
+        Parameters:
+        - query: str, the normalized search query
+        - days: int, number of recent days to read
+        - limit: int, maximum number of days in the daily series
+
+        Returns:
+        - dict with the following keys:
+            - daily: list of tuples (day, lowest price, number of stores), latest day first
+            - stores: list of tuples (store, timestamp, lowest price, highest price, number of products,
+              lowest price of the earliest search in the period) of the latest search per store, cheapest first
+            - lowest: tuple (product, store, price, timestamp) of the lowest price in the period or None
+        """
+        await self.flush()
+        return await asyncio.to_thread(self.query_trend, query, days, limit)
+
+
+# Price history shared by all searches, its database is opened on first use
+if PRICE_HISTORY_DAYS > 0:
+    price_history = PriceHistory(
+        os.path.join('data', 'prices.db'), PRICE_HISTORY_DAYS * 86400, PRICE_HISTORY_FLUSH_INTERVAL
+    )
+else:
+    price_history = None
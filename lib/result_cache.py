@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, ttl, maxsize):
+        """
+        Caches search results by query with a time to live and a bounded size.
+
+        Identical queries arriving while a search for them is still running are not
+        started again, they wait for the result of the search which is already in flight.
+
+        Parameters:
+        - ttl: float, number of seconds a result stays valid
+        - maxsize: int, maximum number of cached results, least recently used are evicted first
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()   # key -> (expiration time, value)
+        self._in_flight = {}            # key -> asyncio.Task computing the value
+
+
+    def get(self, key):
+        """
+        Return a cached value if it is still valid.
+
+        Parameters:
+        - key: str, the cache key
+
+        Returns:
+        - cached value or None if the key is missing or expired
+        """
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        # Mark entry as the most recently used
+        self._entries.move_to_end(key)
+        return value
+
+
+    def lookup(self, key):
+        """
+        Return a cached value if it is still valid, counting it as a hit.
+
+        A missing value is not counted, the caller is expected to fall back to get_or_compute,
+        which counts the request.
+
+        Parameters:
+        - key: str, the cache key
+
+        Returns:
+        - cached value or None if the key is missing or expired
+        """
+        value = self.get(key)
+
+        if value is not None:
+            self.hits += 1
+
+        return value
+
+
+    def put(self, key, value):
+        """
+        Store a value in the cache, evicting the least recently used entries if the cache is full.
+
+        Parameters:
+        - key: str, the cache key
+        - value: the value to store
+        """
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+    async def get_or_compute(self, key, compute, cacheable=None):
+        """
+        Return a cached value or compute it once, sharing the computation between concurrent callers.
+
+        Parameters:
+        - key: str, the cache key
+        - compute: callable, returns a coroutine producing the value
+        - cacheable: callable, returns False for computed values which should not be cached (all are cached if not specified)
+
+        Returns:
+        - the cached or computed value
+        """
+        value = self.lookup(key)
+
+        if value is not None:
+            return value
+
+        task = self._in_flight.get(key)
+
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done_task: self._store_result(key, done_task, cacheable))
+
+        # Shield the shared task, so a cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+
+    def _store_result(self, key, task, cacheable):
+        """
+        Move a finished computation from in-flight tasks to the cache.
+
+        Parameters:
+        - key: str, the cache key
+        - task: asyncio.Task, the finished computation
+        - cacheable: callable or None, decides whether the computed value is cached
+        """
+        self._in_flight.pop(key, None)
+
+        if task.cancelled():
+            return
+
+        if task.exception() is not None:
+            logging.warning(f"Search for '{key}' failed, result is not cached: {task.exception()!r}")
+            return
+
+        if cacheable is None or cacheable(task.result()):
+            self.put(key, task.result())
+
+
+    def stats(self):
+        """
+        Return cache usage counters.
+
+        Returns:
+        - dict, numbers of hits, misses, coalesced requests, cached and in-flight entries
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+            "in_flight": len(self._in_flight)
+        }
@@ -1,9 +1,19 @@
 import asyncio
+import heapq
+import html
 import logging
+import secrets
 import time
 import os
 
-from lib.websites_list import websites   # list of WebsiteScraper objects
+from lib import http_client
+from lib.catalog import CatalogIndex, CatalogCrawler
+from lib.health import store_health
+from lib.metrics import CollectedMetric, stage_seconds, search_seconds
+from lib.price_history import price_history
+from lib.result_cache import ResultCache
+from lib.store_registry import store_registry
+from lib.websites_scraper import normalize_query
 
 
 # Create logs path
@@ -14,7 +24,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)  # Set the logging level for this module
 
 # Create file handler which logs messages to a file
-file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
+file_handler = logging.FileHandler(log_file_path, encoding='utf-8', delay=True)
 file_handler.setLevel(logging.WARNING)
 
 # Create a formatter and set it for the handler
@@ -24,89 +34,212 @@ file_handler.setFormatter(formatter)
 # Add the handler to the logger
 logger.addHandler(file_handler)
 
-
-async def async_scrape(website, product_name):
+# Time limits (seconds) for a single website and for the whole search
+STORE_TIMEOUT = float(os.getenv('STORE_TIMEOUT', 30))
+SEARCH_DEADLINE = float(os.getenv('SEARCH_DEADLINE', 45))
+
+# Cache of search results shared by all chats
+result_cache = ResultCache(
+    ttl=float(os.getenv('RESULT_CACHE_TTL', 600)),
+    maxsize=int(os.getenv('RESULT_CACHE_SIZE', 256))
+)
+
+# Labels of the result cache counters at /metrics
+RESULT_CACHE_COUNTERS = {"hit": "hits", "miss": "misses", "coalesced": "coalesced"}
+
+# Result cache usage exposed at /metrics, read from the current cache
+CollectedMetric(
+    "result_cache_requests_total",
+    "Searches answered from the result cache (hit), computed (miss) or joined to a running search (coalesced)",
+    "counter",
+    ("result",),
+    lambda: {(result,): result_cache.stats()[counter] for result, counter in RESULT_CACHE_COUNTERS.items()}
+)
+CollectedMetric(
+    "result_cache_entries",
+    "Searches in the result cache (cached) and running searches other chats may join (in_flight)",
+    "gauge",
+    ("state",),
+    lambda: {("cached",): result_cache.stats()["size"], ("in_flight",): result_cache.stats()["in_flight"]}
+)
+
+# Search results kept for the "show items" buttons of replies, by short random handles
+result_handles = ResultCache(
+    ttl=float(os.getenv('RESULT_HANDLE_TTL', 1800)),
+    maxsize=int(os.getenv('RESULT_HANDLE_SIZE', 1024))
+)
+
+# Number of the cheapest items shown per store
+ITEMS_PER_STORE = int(os.getenv('ITEMS_PER_STORE', 10))
+
+# Number of the cheapest items the cheapest-first search looks for
+CHEAPEST_TOP = int(os.getenv('CHEAPEST_TOP', 10))
+
+# Optional background crawler answering searches from a local catalog index (disabled if the interval is 0)
+CATALOG_CRAWL_INTERVAL = float(os.getenv('CATALOG_CRAWL_INTERVAL', 0))
+CATALOG_MAX_AGE = float(os.getenv('CATALOG_MAX_AGE', 2 * CATALOG_CRAWL_INTERVAL))
+CATALOG_SEED_QUERIES = [query for query in os.getenv('CATALOG_SEED_QUERIES', '').split(',') if query.strip()]
+
+if CATALOG_CRAWL_INTERVAL > 0:
+    catalog_index = CatalogIndex(os.path.join('data', 'catalog.db'))
+    catalog_crawler = CatalogCrawler(catalog_index, store_registry.get_websites, CATALOG_SEED_QUERIES, CATALOG_CRAWL_INTERVAL)
+else:
+    catalog_index = None
+    catalog_crawler = None
+
+
+async def async_scrape(website, product_name, limit=None):
     """
     Asynchronously scrape data from a website
 
     Args:
         website (str): website name
         product_name (str): name of the product to look for
+        limit (int): number of the cheapest products to look for, scraping pages sorted by price
+            if the website has them, all pages are scraped otherwise (optional)
 
     Returns:
         dict: dictionary with scraped prices for a given product from an input website 
     """
     logging.debug(f"Scraping data from {website.name}...")
 
-    # Use asyncio.to_thread to run the synchronous scrape method in a separate thread
-    products = await asyncio.to_thread(website.scrape, product_name)
+    # Pages sorted by price in ascending order hold the cheapest products first
+    if limit is not None and website.cheapest_url:
+        scraping = website.scrape_async(product_name, http_client.get_client(), base_url=website.cheapest_url, limit=limit)
+    else:
+        scraping = website.scrape_async(product_name, http_client.get_client())
+
+    # Run the native asynchronous scraper on the event loop using the shared connection pool
+    products = await asyncio.wait_for(scraping, timeout=STORE_TIMEOUT)
 
     return website, products
 
 
-async def aggregate_data(websites, product_name):
+def summarize_website(website, products, product_name):
     """
-    Aggregate data from multiple websites based on a given product.
+    Summarize products found on a website.
 
     Parameters:
-    - websites: list of WebsiteScraper objects, websites to scrape data from
-    - product_name: str, the product to search for
+    - website: WebsiteScraper object, the scraped website
+    - products: list of Product objects, products found on the website
+    - product_name: str, the searched product
 
     Returns:
-    - list of dictionaries, aggregated data for each website
+    - dict, the website's data
     """
-    aggregated_data = []
+    # Extract relevant information from products
+    try:
+        prices = [int(product.price) for product in products]
 
-    # Create a list of coroutines for asynchronous execution
-    tasks = [async_scrape(website, product_name) for website in websites]
+        price_uah_min = min(prices)
+        price_uah_max = max(prices)
 
-    # Gather and wait for results
-    results = await asyncio.gather(*tasks)
+    except ValueError:
+        # Log an error if conversion of price to integer was unsuccessful
+        logging.error("Conversion of price to integer was unsuccessful. Storing as a string...")
+        prices = [product.price for product in products]
+        logging.error("Got price (-s)", prices[0])
 
-    for website, products in results:
-        if products:
-            # Extract relevant information from products
-            try:
-                prices = sorted([int(product.price) for product in products])
+    except Exception as e:
+        logging.error("Unexpected error: ", e)
 
-                price_uah_min = prices[0]
-                price_uah_max = prices[-1]
+    products_qty = len(products)
 
-            except ValueError:
-                # Log an error if conversion of price to integer was unsuccessful
-                logging.error("Conversion of price to integer was unsuccessful. Storing as a string...")
-                prices = [product.price for product in products]
-                logging.error("Got price (-s)", prices[0])
+    # Products are kept as found, they are sorted only if the user asks to see them
+    website_data = {
+        "website": website.name,
+        "search_query_url": website.generate_search_query_url(product_name).replace(" ", website.search_query_separator),
+        "price_uah_min": price_uah_min,
+        "price_uah_max": price_uah_max,
+        "products_qty": products_qty,
+        "social_network": website.social_network,
+        "tel_vodafone": website.tel_vodafone,
+        "tel_kyivstar": website.tel_kyivstar,
+        "products": products
+    }
 
-            except Exception as e:
-                logging.error("Unexpected error: ", e)
+    return website_data
 
-            products_qty = len(products)
 
-            # Create the website's data dictionary without details if include_details is False
-            website_data = {
-                "website": website.name,
-                "search_query_url": website.generate_search_query_url(product_name).replace(" ", website.search_query_separator),
-                "price_uah_min": price_uah_min,
-                "price_uah_max": price_uah_max,
-                "products_qty": products_qty,
-                "social_network": website.social_network,
-                "tel_vodafone": website.tel_vodafone,
-                "tel_kyivstar": website.tel_kyivstar
-            }
+async def aggregate_data(websites, product_name, deadline=SEARCH_DEADLINE, on_progress=None, limit=None):
+    """
+    Aggregate data from multiple websites based on a given product.
 
-            # Store price as a string if the conversion to integer was unsuccessful
-            try:
-                website_data["details"] = [{"product": product.name, "price_uah": int(product.price)} for product in products]
-            except ValueError:
-                website_data["details"] = [{"product": product.name, "price_uah": product.price} for product in products]
-            except Exception as e:
-                logging.error("Unexpected error : ", e)
+    Websites are processed in the order they finish. Websites which do not finish
+    within STORE_TIMEOUT or before the search deadline are left out of the results
+    and counted as failures in their health. The time of every website and of the
+    whole search is recorded in metrics.
 
-            # Append the website's data to the aggregated data list
-            aggregated_data.append(website_data)
+    Parameters:
+    - websites: list of WebsiteScraper objects, websites to scrape data from
+    - product_name: str, the product to search for
+    - deadline: float, number of seconds after which the search returns the results collected so far
+    - on_progress: coroutine function, called with the data aggregated so far, the number of finished
+      and the total number of websites every time a website finishes (optional)
+    - limit: int, number of the cheapest products to look for on each website (all products if not specified)
 
-    return aggregated_data
+    Returns:
+    - tuple, (list of dictionaries with aggregated data for each website, list of names of timed out websites)
+    """
+    aggregated_data = []
+    timed_out = []
+
+    # Schedule scraping of every website concurrently
+    tasks = {asyncio.ensure_future(async_scrape(website, product_name, limit)): website for website in websites}
+
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    deadline_time = start_time + deadline
+    pending = set(tasks)
+    finished = 0
+
+    try:
+        # Handle websites in completion order until all finish or the deadline passes
+        while pending:
+            remaining = deadline_time - loop.time()
+            if remaining <= 0:
+                break
+
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                website = tasks[task]
+                finished += 1
+                stage_seconds.observe(loop.time() - start_time, website.name, "scrape")
+
+                if isinstance(task.exception(), asyncio.TimeoutError):
+                    store_health.get(website.name).record_failure()
+                    timed_out.append(website.name)
+                elif task.exception() is not None:
+                    logging.error(f"Error scraping {website.name}: {task.exception()!r}")
+                else:
+                    _, products = task.result()
+
+                    if products:
+                        aggregated_data.append(summarize_website(website, products, product_name))
+
+            # Progress reporting must never abort the search, which may be shared by several chats
+            if on_progress is not None and done:
+                try:
+                    await on_progress(aggregated_data, finished, len(tasks))
+                except Exception as e:
+                    logging.error(f"Failed to report progress of the search for '{product_name}': {e!r}")
+    finally:
+        # Stop scraping websites nobody waits for, also if the search fails or is cancelled
+        for task in pending:
+            task.cancel()
+
+    for task in pending:
+        stage_seconds.observe(loop.time() - start_time, tasks[task].name, "scrape")
+        store_health.get(tasks[task].name).record_failure()
+        timed_out.append(tasks[task].name)
+
+    search_seconds.observe(loop.time() - start_time)
+
+    if timed_out:
+        logging.warning(f"Search for '{product_name}' timed out for: {', '.join(timed_out)}")
+
+    return aggregated_data, timed_out
 
 
 def format_scraped_data(sorted_result, product_name):
@@ -144,35 +277,324 @@ def format_scraped_data(sorted_result, product_name):
     return formatted_message
 
 
-async def generate_formatted_output(product_name):
+def format_cheapest(sorted_result, product_name, top=CHEAPEST_TOP):
     """
-    Main scraper function which is used to scrape prices for a given product.
+    Format the cheapest products of all websites into a single string used in the response message.
+
+    Parameters:
+    - sorted_result: list of dict, the websites' data
+    - product_name: str, the searched product
+    - top: int, number of products to show
+
+    Returns:
+    - str, html formatted list of the cheapest products
+    """
+    cheapest = heapq.nsmallest(
+        top,
+        ((int(product.price), product.name, website) for website in sorted_result for product in website["products"]),
+        key=lambda item: item[0]
+    )
+
+    formatted_message = f"<b>{product_name}</b>\n"
+    formatted_message += f"Найдешевші товари: {len(cheapest)}\n\n"
+
+    for price, name, website in cheapest:
+        formatted_message += f"◽ <b>{price:,} грн.</b> {html.escape(name)}\n"
+        formatted_message += f"<a href='{website['search_query_url']}'>{website['website']}→</a>\n\n"
+
+    return formatted_message
+
+
+def format_search_notes(search_result):
+    """
+    Format notes about websites missing from a search result and the freshness of catalog prices.
+
+    Parameters:
+    - search_result: dict, the search result returned by search_websites
+
+    Returns:
+    - str, html formatted notes, empty if there are none
+    """
+    formatted_message = ""
+
+    # List websites which did not respond before the deadline
+    if search_result["timed_out"]:
+        formatted_message += f"⌛ Не відповіли вчасно: {', '.join(search_result['timed_out'])}\n\n"
+
+    # List websites which were skipped because they keep failing
+    if search_result["skipped"]:
+        formatted_message += f"⛔ Тимчасово недоступні: {', '.join(search_result['skipped'])}\n\n"
+
+    # Show freshness of prices taken from the local catalog
+    if search_result["catalog_time"] is not None:
+        catalog_time = time.strftime('%d.%m %H:%M', time.localtime(search_result["catalog_time"]))
+        formatted_message += f"🗂 Ціни з каталогу станом на {catalog_time}\n\n"
+
+    return formatted_message
+
+
+def format_store_items(website_data, product_name, limit=ITEMS_PER_STORE):
+    """
+    Format the cheapest products found on a website, sorting them only when they are asked for.
+
+    Parameters:
+    - website_data: dict, the website's data from the search result
+    - product_name: str, the searched product
+    - limit: int, maximum number of products to show
+
+    Returns:
+    - str, html formatted list of products
+    """
+    cheapest = heapq.nsmallest(limit, website_data["products"], key=lambda product: int(product.price))
+
+    formatted_message = f"<b>{website_data['website']}</b>: {html.escape(product_name)}\n\n"
+
+    for product in cheapest:
+        formatted_message += f"◽ {html.escape(product.name)} — {int(product.price):,} грн.\n"
+
+    if website_data["products_qty"] > len(cheapest):
+        formatted_message += f"\n... та ще {website_data['products_qty'] - len(cheapest)} шт.\n"
+
+    formatted_message += f"\n<a href='{website_data['search_query_url']}'>перейти→</a>"
+
+    return formatted_message
+
+
+def format_price_history(trend, product_name):
+    """
+    Format the price history of a product into a single string used in the response message.
+
+    Parameters:
+    - trend: dict, the price history returned by PriceHistory.trend
+    - product_name: str, the searched product
+
+    Returns:
+    - str, html formatted price history
+    """
+    formatted_message = f"<b>{html.escape(product_name)}</b>\n"
+
+    if not trend["stores"]:
+        formatted_message += "Історії цін ще немає, надішли назву товару для пошуку"
+        return formatted_message
+
+    formatted_message += "Найнижча ціна за днями:\n"
+    for day, price_min, stores_qty in trend["daily"]:
+        formatted_message += f"◽ {day[8:10]}.{day[5:7]}: {price_min:,} грн. ({stores_qty} маг.)\n"
+
+    formatted_message += "\nОстанні ціни магазинів:\n"
+    for store, timestamp, price_min, price_max, products_qty, first_price_min in trend["stores"]:
+        change = ""
+        if price_min != first_price_min:
+            change = f" {'↓' if price_min < first_price_min else '↑'}{abs(price_min - first_price_min) / first_price_min:.0%}"
+
+        formatted_message += f"<b>{store}</b> ({time.strftime('%d.%m', time.localtime(timestamp))})\n"
+        formatted_message += f"◽ {price_min:,} -- {price_max:,} грн.{change}, {products_qty} шт.\n"
+
+    if trend["lowest"] is not None:
+        product, store, price, timestamp = trend["lowest"]
+        formatted_message += f"\n🏷 Найнижча ціна: {price:,} грн. — {html.escape(product)}, {store}, {time.strftime('%d.%m', time.localtime(timestamp))}"
+
+    return formatted_message
+
+
+def format_price_alert(product_name, website_data, max_price=None):
+    """
+    Format a notification about a lower price of a watched product.
+
+    Parameters:
+    - product_name: str, the watched product
+    - website_data: dict, data of the website with the lowest price
+    - max_price: int, the maximum price of the watch (optional)
+
+    Returns:
+    - str, html formatted notification
+    """
+    formatted_message = f"🔔 <b>{html.escape(product_name)}</b>\n"
+    formatted_message += f"Ціна знизилась до {website_data['price_uah_min']:,} грн."
+
+    if max_price is not None:
+        formatted_message += f" (поріг {max_price:,} грн.)"
+
+    formatted_message += f"\n<b>{website_data['website']}</b>: <a href='{website_data['search_query_url']}'>перейти→</a>\n\n"
+    formatted_message += f"Припинити стеження: /unwatch {html.escape(product_name)}"
+
+    return formatted_message
+
+
+def register_result(search_result):
+    """
+    Keep a search result for a while, so its products can be shown on request.
+
+    Parameters:
+    - search_result: dict, the search result returned by search_websites
+
+    Returns:
+    - str, short handle of the result for result_handles
+    """
+    handle = secrets.token_urlsafe(6)
+    result_handles.put(handle, search_result)
+    return handle
+
+
+async def search_websites(product_name, deadline=SEARCH_DEADLINE, on_progress=None, limit=None):
+    """
+    Scrape all websites for a given product and sort the results by price.
 
     Args:
         product_name (str): product to scrape prices for
+        deadline (float): number of seconds after which the search returns partial results
+        on_progress (coroutine function): receives partial results as websites finish (optional)
+        limit (int): number of the cheapest products to look for on each website (all products if not specified)
 
     Returns:
-        str: html formated string containing the scraped prices for a product
+        dict: 'query' - the searched product,
+              'results' - dictionaries with website data sorted by the lowest price (products unsorted),
+              'timed_out' - names of websites which did not respond in time,
+              'skipped' - names of unhealthy websites which were not scraped,
+              'catalog_time' - timestamp of the oldest catalog data used or None if all websites were scraped live
     """
+    websites = store_registry.get_websites()
+    indexed_products, catalog_time = {}, None
 
-    # Start the timer
-    start_time = time.time()
+    # Answer from the local catalog for websites whose fresh crawled data covers the query
+    if catalog_index is not None:
+        indexed_products, catalog_time = await catalog_index.lookup(websites, product_name, CATALOG_MAX_AGE)
+
+    live_websites = [website for website in websites if website not in indexed_products]
+
+    # Skip websites which keep failing until their cool-down passes
+    skipped = [website.name for website in live_websites if not store_health.get(website.name).allow()]
+    live_websites = [website for website in live_websites if website.name not in skipped]
 
     # Aggregate data asynchronously
-    result = await aggregate_data(websites, product_name)
+    result, timed_out = await aggregate_data(live_websites, product_name, deadline, on_progress, limit)
+
+    # Keep prices of complete live searches, cheapest-first searches see only part of the products
+    if price_history is not None and limit is None:
+        price_history.record(normalize_query(product_name), result)
+
+    for website, products in indexed_products.items():
+        result.append(summarize_website(website, products, product_name))
 
     # Sorting the list of dictionaries based on 'price_uah_min'
     sorted_result = sorted(result, key=lambda x: x['price_uah_min'], reverse=False)  # Set reverse=True for descending order
 
-    # Sorting the 'details' list within each dictionary based on 'price_uah'
-    for entry in sorted_result:
-        entry['details'] = sorted(entry['details'], key=lambda x: x['price_uah'], reverse=False)  # Set reverse=True for descending order
+    return {"query": product_name, "results": sorted_result, "timed_out": timed_out, "skipped": skipped, "catalog_time": catalog_time}
+
+
+async def search_watched(product_name, deadline=SEARCH_DEADLINE):
+    """
+    Search for a watched product, sharing cached and running searches with users.
+
+    Parameters:
+    - product_name: str, the normalized product name
+    - deadline: float, number of seconds after which the search returns partial results
+
+    Returns:
+    - dict, the search result returned by search_websites
+    """
+    return await result_cache.get_or_compute(
+        normalize_query(product_name),
+        lambda: search_websites(product_name, deadline),
+        cacheable=lambda result: not result["timed_out"]
+    )
+
+
+async def generate_formatted_output(product_name, deadline=SEARCH_DEADLINE, on_progress=None):
+    """
+    Main scraper function which is used to scrape prices for a given product.
+
+    Results are cached by the normalized product name, and identical concurrent
+    searches share a single scraping run. Partial results of searches which hit
+    the deadline are returned but not cached.
+
+    Args:
+        product_name (str): product to scrape prices for
+        deadline (float): number of seconds after which the search returns partial results
+        on_progress (coroutine function): receives a formatted message with partial results every time
+            a website finishes, only called for searches which are actually scraped (optional)
+
+    Returns:
+        tuple: html formated string containing the scraped prices for a product,
+               and the search result dict returned by search_websites
+    """
+
+    # Start the timer
+    start_time = time.time()
+
+    async def report_progress(aggregated_data, finished, total):
+        # The final result is returned right after the last website finishes
+        if finished == total:
+            return
+
+        # Format results of the websites which finished so far
+        partial_result = sorted(aggregated_data, key=lambda x: x['price_uah_min'])
+        partial_output = format_scraped_data(partial_result, product_name)
+        partial_output += f"⏳ Опитано магазинів: {finished} з {total}"
+        await on_progress(partial_output)
+
+    # Reuse a cached or an already running search for the same query
+    search_result = await result_cache.get_or_compute(
+        normalize_query(product_name),
+        lambda: search_websites(product_name, deadline, report_progress if on_progress else None),
+        cacheable=lambda result: not result["timed_out"]
+    )
 
     # Format scraped data
-    formated_output =  format_scraped_data(sorted_result, product_name)
+    formated_output =  format_scraped_data(search_result["results"], product_name)
+    formated_output += format_search_notes(search_result)
     
     # Display elapsed time
     check_time = time.time() - start_time
-    formated_output += f"⏱ Час пошуку: {check_time:.0f} сек."
+    formated_output += f"⏱ Час пошуку: {check_time:.0f} сек. (ліміт {deadline:.0f} сек.)"
     
-    return formated_output
\ No newline at end of file
+    return formated_output, search_result
+
+
+async def generate_cheapest_output(product_name, deadline=SEARCH_DEADLINE, on_progress=None):
+    """
+    Cheapest-first search: find only the cheapest products for a given product.
+
+    Websites with pages sorted by price are scraped only until they yield CHEAPEST_TOP
+    products, which usually takes a single page. Other websites are scraped completely.
+    A cached complete search of the same product answers it as well.
+
+    Args:
+        product_name (str): product to scrape prices for
+        deadline (float): number of seconds after which the search returns partial results
+        on_progress (coroutine function): receives a formatted message with partial results every time
+            a website finishes, only called for searches which are actually scraped (optional)
+
+    Returns:
+        tuple: html formated string containing the cheapest products,
+               and the search result dict returned by search_websites
+    """
+    start_time = time.time()
+
+    async def report_progress(aggregated_data, finished, total):
+        # The final result is returned right after the last website finishes
+        if finished == total:
+            return
+
+        partial_output = format_cheapest(aggregated_data, product_name)
+        partial_output += f"⏳ Опитано магазинів: {finished} з {total}"
+        await on_progress(partial_output)
+
+    # A cached complete search counts as a hit, otherwise the cheapest-first search below counts the request
+    search_result = result_cache.lookup(normalize_query(product_name))
+
+    # Reuse a cached or an already running cheapest-first search for the same query
+    if search_result is None:
+        search_result = await result_cache.get_or_compute(
+            f"cheapest:{normalize_query(product_name)}",
+            lambda: search_websites(product_name, deadline, report_progress if on_progress else None, CHEAPEST_TOP),
+            cacheable=lambda result: not result["timed_out"]
+        )
+
+    formated_output = format_cheapest(search_result["results"], product_name)
+    formated_output += format_search_notes(search_result)
+
+    check_time = time.time() - start_time
+    formated_output += f"⏱ Час пошуку: {check_time:.0f} сек. (ліміт {deadline:.0f} сек.)"
+
+    return formated_output, search_result
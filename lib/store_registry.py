@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import time
+
+from lib.websites_scraper import WebsiteScraper
+
+
+# Stores are defined in a JSON data file, stores with "enabled": false are kept for reference but not scraped
+# (some online stores are currently not supported due to issues related to cloud hosting usage)
+STORES_FILE = os.getenv('STORES_FILE', os.path.join(os.path.dirname(__file__), 'stores.json'))
+# Minimum number of seconds between checks of the stores file for changes
+STORES_RELOAD_INTERVAL = float(os.getenv('STORES_RELOAD_INTERVAL', 5))
+
+# Keys of a store definition: required ones and optional ones with their defaults in WebsiteScraper
+REQUIRED_KEYS = {"name", "base_url", "search_query_url", "search_query_separator", "product_container_class", "extract_spec"}
+OPTIONAL_KEYS = {"enabled", "social_network", "tel_vodafone", "tel_kyivstar", "page_window", "parser", "parse_only_containers", "catalog_url", "cheapest_url"}
+
+
+def build_websites(config):
+    """
+    Validate store definitions and build a scraper for every enabled store.
+
+    Parameters:
+    - config: dict, the parsed stores file with optional 'defaults' and the 'stores' list
+
+    Returns:
+    - list of WebsiteScraper objects, scrapers of the enabled stores
+
+    Raises:
+    - ValueError if a store definition is invalid
+    """
+    if not isinstance(config, dict) or not isinstance(config.get("stores"), list):
+        raise ValueError("Stores file must be an object with a 'stores' list")
+
+    defaults = config.get("defaults", {})
+    websites = []
+    names = set()
+
+    for i, store in enumerate(config["stores"]):
+        if not isinstance(store, dict):
+            raise ValueError(f"Store #{i + 1} must be an object")
+
+        name = store.get("name", f"#{i + 1}")
+        definition = {**defaults, **store}
+
+        missing_keys = REQUIRED_KEYS - set(definition)
+        unknown_keys = set(definition) - REQUIRED_KEYS - OPTIONAL_KEYS
+
+        if missing_keys:
+            raise ValueError(f"Store {name} is missing keys: {', '.join(sorted(missing_keys))}")
+        if unknown_keys:
+            raise ValueError(f"Store {name} has unknown keys: {', '.join(sorted(unknown_keys))}")
+        if name in names:
+            raise ValueError(f"Store {name} is defined more than once")
+        if "{query}" not in definition["base_url"] or "{query}" not in definition["search_query_url"]:
+            raise ValueError(f"Store {name} URLs must contain a {{query}} placeholder")
+        if "cheapest_url" in definition and "{query}" not in definition["cheapest_url"]:
+            raise ValueError(f"Store {name} cheapest_url must contain a {{query}} placeholder")
+
+        names.add(name)
+
+        if not definition.pop("enabled", True):
+            continue
+
+        try:
+            websites.append(WebsiteScraper(
+                social_network=definition.pop("social_network", ""),
+                tel_vodafone=definition.pop("tel_vodafone", ""),
+                tel_kyivstar=definition.pop("tel_kyivstar", ""),
+                **definition
+            ))
+        except Exception as e:
+            # Invalid extraction specs or selectors
+            raise ValueError(f"Store {name} is invalid: {e}") from e
+
+    return websites
+
+
+class StoreRegistry:
+    def __init__(self, path, reload_interval=STORES_RELOAD_INTERVAL):
+        """
+        Provides scrapers of the stores defined in a JSON file.
+
+        The file is loaded on first use and reloaded when it changes, so store fixes apply
+        without restarting the bot. Searches which are already running keep the scrapers
+        they started with. A changed file which fails validation is ignored and the
+        previously loaded stores stay in use.
+
+        Parameters:
+        - path: str, path to the stores file
+        - reload_interval: float, minimum number of seconds between checks of the file for changes
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self.websites = None
+        self.file_signature = None
+        self.checked_at = 0.0
+        self.pinned = False
+
+
+    def get_websites(self):
+        """
+        Return scrapers of the enabled stores, loading or reloading the stores file if needed.
+
+        Returns:
+        - list of WebsiteScraper objects
+
+        Raises:
+        - ValueError or OSError if the stores file can not be loaded the first time
+        """
+        if self.pinned:
+            return self.websites
+
+        now = time.monotonic()
+
+        if self.websites is None or now - self.checked_at >= self.reload_interval:
+            self.checked_at = now
+            self.reload()
+
+        return self.websites
+
+
+    def reload(self):
+        """
+        Load the stores file if it changed since the last load.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            if self.websites is None:
+                raise
+            logging.error(f"Stores file {self.path} is not accessible, keeping {len(self.websites)} loaded stores")
+            return
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        if signature == self.file_signature:
+            return
+
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                websites = build_websites(json.load(f))
+        except (ValueError, OSError) as e:
+            if self.websites is None:
+                raise
+            logging.error(f"Failed to reload stores from {self.path}, keeping the previous ones: {e}")
+            # Do not retry the same broken file on every check
+            self.file_signature = signature
+            return
+
+        if self.websites is not None:
+            logging.warning(f"Reloaded {len(websites)} stores from {self.path}")
+
+        self.websites = websites
+        self.file_signature = signature
+
+
+    def pin(self, websites):
+        """
+        Use a fixed list of scrapers instead of the stores file, e.g. for benchmarks.
+
+        Parameters:
+        - websites: list of WebsiteScraper objects
+        """
+        self.websites = websites
+        self.pinned = True
+
+
+# Registry of stores shared by searches, the catalog crawler and the warm-up
+store_registry = StoreRegistry(STORES_FILE)
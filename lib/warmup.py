@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from lib import http_client
+from lib.parse_pool import parse_pool
+
+
+# Maximum number of seconds startup waits for the warm-up
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', 15))
+# Number of seconds between repeated warm-ups keeping idle connections open (only at startup if 0)
+WARMUP_INTERVAL = float(os.getenv('WARMUP_INTERVAL', 0))
+
+
+def store_origins(websites):
+    """
+    Collect the distinct hosts requested by the websites.
+
+    Parameters:
+    - websites: list of WebsiteScraper objects, the websites
+
+    Returns:
+    - list of str, origins such as 'https://example.com'
+    """
+    origins = []
+
+    for website in websites:
+        for url in (website.base_url, website.catalog_url):
+            if not url:
+                continue
+
+            parts = urlsplit(url)
+            origin = f"{parts.scheme}://{parts.netloc}"
+
+            if origin not in origins:
+                origins.append(origin)
+
+    return origins
+
+
+async def preconnect(client, origin):
+    """
+    Open a pooled connection to a host, resolving its name and completing the TLS handshake.
+
+    Parameters:
+    - client: httpx.AsyncClient, the client whose pool keeps the connection
+    - origin: str, the host origin
+
+    Returns:
+    - bool, True if the host answered
+    """
+    try:
+        await client.head(origin, headers={"User-Agent": http_client.random_user_agent()})
+        return True
+    except httpx.HTTPError as e:
+        logging.warning(f"Warm-up failed to connect to {origin}: {e!r}")
+        return False
+
+
+async def warm_up(websites, timeout=WARMUP_TIMEOUT):
+    """
+    Prepare the scraper for the first search: load the user agent pool, start the parse workers
+    and connect to every store host.
+
+    Parameters:
+    - websites: list of WebsiteScraper objects, the websites to connect to
+    - timeout: float, maximum number of seconds to wait for the hosts
+
+    Returns:
+    - dict, 'connected' and 'failed' lists of origins and the 'elapsed' number of seconds
+    """
+    started_at = time.monotonic()
+    http_client.random_user_agent()
+
+    # Start the parse workers before opening connections, the worker processes do not need them
+    if parse_pool is not None:
+        await parse_pool.warm_up(websites)
+
+    client = http_client.get_client()
+    origins = store_origins(websites)
+    tasks = {asyncio.ensure_future(preconnect(client, origin)): origin for origin in origins}
+
+    done, pending = await asyncio.wait(tasks, timeout=timeout) if tasks else (set(), set())
+
+    for task in pending:
+        task.cancel()
+
+    connected = [tasks[task] for task in done if task.result()]
+    failed = [origin for origin in origins if origin not in connected]
+
+    return {"connected": connected, "failed": failed, "elapsed": time.monotonic() - started_at}
+
+
+async def keep_warm(get_websites, interval=WARMUP_INTERVAL):
+    """
+    Repeat the warm-up every interval until cancelled, so idle pooled connections do not expire.
+
+    Parameters:
+    - get_websites: callable, returns the list of WebsiteScraper objects to connect to
+    - interval: float, number of seconds between warm-ups
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await warm_up(get_websites())
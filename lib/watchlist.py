@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    chat_id INTEGER NOT NULL,
+    query TEXT NOT NULL,
+    max_price INTEGER,
+    last_price INTEGER,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, query)
+);
+CREATE INDEX IF NOT EXISTS watches_query ON watches (query);
+"""
+
+# Maximum price at the end of a watch request, e.g. "до 3000", "<=3 000" or "≤ 3000 грн"
+MAX_PRICE_SUFFIX = re.compile(r"(?:^|\s)(до|<=|≤)\s*(\S*?(?:\s[0-9]{3})*)\s*(?:грн\.?|₴)?$", re.IGNORECASE)
+# Accepted maximum prices: ASCII digits only, optionally grouped by thousands, short enough for an SQLite integer
+MAX_PRICE = re.compile(r"[0-9]{1,9}|[0-9]{1,3}(?:\s[0-9]{3}){1,2}")
+
+
+def parse_watch_request(text):
+    """
+    Split a watch request into the product and the maximum price.
+
+    The maximum price needs an explicit marker, so numbers that are part of a product
+    name, like in "glock 17", are never taken for a price. "до" followed by a word is
+    a part of the product, like in "чохол до ножа".
+
+    Parameters:
+    - text: str, the arguments of the watch command
+
+    Returns:
+    - tuple, (str product, int maximum price or None if not specified)
+
+    Raises:
+    - ValueError if the marker is followed by something other than a price
+    """
+    match = MAX_PRICE_SUFFIX.search(text)
+
+    if match is None:
+        return text, None
+
+    marker, price = match.groups()
+
+    if not MAX_PRICE.fullmatch(price):
+        if marker.lower() == "до" and not any(char.isnumeric() for char in price):
+            return text, None
+        raise ValueError(f"Invalid maximum price: {price!r}")
+
+    return text[:match.start()], int("".join(price.split()))
+
+
+def watch_update(max_price, last_price, lowest_price, complete):
+    """
+    Decide whether a watch is notified about the lowest price found by a check.
+
+    A watch with a maximum price is notified when the price falls to the maximum, and again
+    only if it falls further or after it has risen above the maximum in between. A watch
+    without a maximum price is notified when the price falls below the one seen last time.
+
+    Parameters:
+    - max_price: int, the maximum price of the watch or None to watch for any drop
+    - last_price: int, the price the watch was last notified about or has seen, None if unknown
+    - lowest_price: int, the lowest price found by the check
+    - complete: bool, False if some stores did not respond, so the price may be higher than the actual one
+
+    Returns:
+    - tuple, (bool indicating a notification, int new last price of the watch)
+    """
+    if max_price is not None:
+        if lowest_price > max_price:
+            # Notify again once the price falls back to the maximum, unless the cheap store just did not respond
+            return False, last_price if not complete else None
+        if last_price is None or lowest_price < last_price:
+            return True, lowest_price
+        return False, last_price
+
+    if last_price is None:
+        return False, lowest_price
+    if lowest_price < last_price:
+        return True, lowest_price
+
+    # A partial result must not raise the price the next drop is compared to
+    return False, lowest_price if complete else last_price
+
+
+class WatchList:
+    def __init__(self, db_path, limit):
+        """
+        Price watches of chats in a local SQLite database.
+
+        Parameters:
+        - db_path: str, path to the SQLite database file
+        - limit: int, maximum number of watches of a chat
+        """
+        self.db_path = db_path
+        self.limit = limit
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        # The connection is used from worker threads, one at a time
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.connection_lock = threading.Lock()
+
+
+    def insert(self, chat_id, query, max_price):
+        """
+        Add or replace a watch, called from a worker thread.
+
+        Returns:
+        - bool, False if the chat has too many watches
+        """
+        with self.connection_lock, self.connection:
+            watches = self.connection.execute(
+                "SELECT COUNT(*) FROM watches WHERE chat_id = ? AND query != ?", (chat_id, query)
+            ).fetchone()[0]
+
+            if watches >= self.limit:
+                return False
+
+            self.connection.execute(
+                """INSERT OR REPLACE INTO watches (chat_id, query, max_price, last_price, created_at)
+                   VALUES (?, ?, ?, NULL, ?)""",
+                (chat_id, query, max_price, time.time())
+            )
+            return True
+
+
+    def delete(self, chat_id, query=None):
+        """
+        Remove a watch or all watches of a chat, called from a worker thread.
+
+        Returns:
+        - int, number of removed watches
+        """
+        with self.connection_lock, self.connection:
+            if query is None:
+                return self.connection.execute("DELETE FROM watches WHERE chat_id = ?", (chat_id,)).rowcount
+            return self.connection.execute("DELETE FROM watches WHERE chat_id = ? AND query = ?", (chat_id, query)).rowcount
+
+
+    def select_chat(self, chat_id):
+        """
+        Read the watches of a chat, called from a worker thread.
+        """
+        with self.connection_lock:
+            return self.connection.execute(
+                "SELECT query, max_price, last_price FROM watches WHERE chat_id = ? ORDER BY created_at", (chat_id,)
+            ).fetchall()
+
+
+    def select_all(self):
+        """
+        Read all watches grouped by query, called from a worker thread.
+        """
+        with self.connection_lock:
+            rows = self.connection.execute(
+                "SELECT query, chat_id, max_price, last_price FROM watches ORDER BY query"
+            ).fetchall()
+
+        watches = {}
+        for query, chat_id, max_price, last_price in rows:
+            watches.setdefault(query, []).append((chat_id, max_price, last_price))
+
+        return watches
+
+
+    def update_last_prices(self, query, last_prices):
+        """
+        Store the last prices of watches of a query, called from a worker thread.
+        """
+        with self.connection_lock, self.connection:
+            self.connection.executemany(
+                "UPDATE watches SET last_price = ? WHERE chat_id = ? AND query = ?",
+                [(last_price, chat_id, query) for chat_id, last_price in last_prices]
+            )
+
+
+    async def add(self, chat_id, query, max_price=None):
+        """
+        Start watching prices of a product, replacing the chat's previous watch of it.
+
+        Parameters:
+        - chat_id: int, the chat to notify
+        - query: str, the normalized search query
+        - max_price: int, notify only about prices up to this one (optional)
+
+        Returns:
+        - bool, False if the chat already has the maximum number of watches
+        """
+        return await asyncio.to_thread(self.insert, chat_id, query, max_price)
+
+
+    async def remove(self, chat_id, query=None):
+        """
+        Stop watching prices of a product, or of all products if the query is not specified.
+
+        Parameters:
+        - chat_id: int, the chat
+        - query: str, the normalized search query (optional)
+
+        Returns:
+        - int, number of removed watches
+        """
+        return await asyncio.to_thread(self.delete, chat_id, query)
+
+
+    async def chat_watches(self, chat_id):
+        """
+        Return the watches of a chat.
+
+        Parameters:
+        - chat_id: int, the chat
+
+        Returns:
+        - list of tuples, (query, maximum price or None, last price or None), oldest first
+        """
+        return await asyncio.to_thread(self.select_chat, chat_id)
+
+
+    async def all_watches(self):
+        """
+        Return all watches grouped by query.
+
+        Returns:
+        - dict, queries mapped to lists of tuples (chat_id, maximum price or None, last price or None)
+        """
+        return await asyncio.to_thread(self.select_all)
+
+
+    async def set_last_prices(self, query, last_prices):
+        """
+        Store the prices watches of a query were compared to.
+
+        Parameters:
+        - query: str, the normalized search query
+        - last_prices: list of tuples, (chat_id, last price or None)
+        """
+        await asyncio.to_thread(self.update_last_prices, query, last_prices)
+
+
+class WatchScheduler:
+    def __init__(self, watch_list, search, format_alert, interval, concurrency, alert_interval=0):
+        """
+        Periodically checks prices of watched products and notifies the watching chats.
+
+        Watches sharing a query are checked by a single search per interval, however many
+        chats watch it, and only chats whose threshold was crossed are notified.
+
+        Parameters:
+        - watch_list: WatchList object, the watches
+        - search: coroutine function, searches a normalized query and returns the search result dict
+        - format_alert: callable, formats a notification from the query, the website's data with the
+          lowest price and the maximum price of the watch
+        - interval: float, number of seconds between the starts of consecutive checks
+        - concurrency: int, maximum number of queries searched at once
+        - alert_interval: float, minimum number of seconds between consecutive notifications
+        """
+        self.watch_list = watch_list
+        self.search = search
+        self.format_alert = format_alert
+        self.interval = interval
+        self.concurrency = concurrency
+        self.alert_interval = alert_interval
+
+        # Notifications of all queries are sent one at a time, paced to stay under the Bot API rate limit
+        self.alert_lock = asyncio.Lock()
+        self.next_alert_at = 0.0
+
+
+    async def send_alert(self, notify, chat_id, text):
+        """
+        Send a notification, waiting until alert_interval has passed since the previous one.
+
+        Parameters:
+        - notify: coroutine function, sends a message to a chat, called with the chat ID and the html text
+        - chat_id: int, the chat to notify
+        - text: str, the html text of the notification
+        """
+        async with self.alert_lock:
+            delay = self.next_alert_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                await notify(chat_id, text)
+            finally:
+                self.next_alert_at = time.monotonic() + self.alert_interval
+
+
+    async def check_query(self, query, watches, notify):
+        """
+        Search a watched query once and notify the watches whose threshold was crossed.
+
+        Parameters:
+        - query: str, the normalized search query
+        - watches: list of tuples, (chat_id, maximum price or None, last price or None)
+        - notify: coroutine function, sends a message to a chat, called with the chat ID and the html text
+        """
+        search_result = await self.search(query)
+
+        if not search_result["results"]:
+            return
+
+        cheapest = min(search_result["results"], key=lambda website: website["price_uah_min"])
+        complete = not search_result["timed_out"] and not search_result["skipped"]
+        last_prices = []
+
+        # A failed notification does not stop the others, and prices of every notified chat are
+        # saved even if the check is cancelled midway, so no chat gets the same alert twice
+        try:
+            for chat_id, max_price, last_price in watches:
+                notified, new_last_price = watch_update(max_price, last_price, cheapest["price_uah_min"], complete)
+
+                if notified:
+                    try:
+                        await self.send_alert(notify, chat_id, self.format_alert(query, cheapest, max_price))
+                    except Exception as e:
+                        # Keep the previous price, so the chat is notified on the next check
+                        logging.warning(f"Failed to notify chat {chat_id} about '{query}': {e!r}")
+                        continue
+                if new_last_price != last_price:
+                    last_prices.append((chat_id, new_last_price))
+        finally:
+            if last_prices:
+                await self.watch_list.set_last_prices(query, last_prices)
+
+
+    async def check(self, notify):
+        """
+        Check every watched query, a few at a time, so the checks do not crowd out user searches.
+
+        Parameters:
+        - notify: coroutine function, sends a message to a chat, called with the chat ID and the html text
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check_with_limit(query, watches):
+            async with semaphore:
+                try:
+                    await self.check_query(query, watches, notify)
+                except Exception as e:
+                    logging.error(f"Error checking watched query '{query}': {e!r}")
+
+        watches = await self.watch_list.all_watches()
+        await asyncio.gather(*(check_with_limit(query, query_watches) for query, query_watches in watches.items()))
+
+
+    async def run(self, notify):
+        """
+        Check watched queries every interval until cancelled.
+
+        Parameters:
+        - notify: coroutine function, sends a message to a chat, called with the chat ID and the html text
+        """
+        while True:
+            started_at = time.monotonic()
+            await self.check(notify)
+            await asyncio.sleep(max(0, self.interval - (time.monotonic() - started_at)))
@@ -1,10 +1,23 @@
-import requests
+import asyncio
+import functools
+import hashlib
 import logging
 import os
+import time
+from collections import deque
 
+import httpx
 import regex
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+from bs4.builder import builder_registry
+
+from lib import http_client
+from lib.extraction import ExtractionSpec
+from lib.health import store_health
+from lib.host_scheduler import host_scheduler
+from lib.metrics import stage_seconds, pages_fetched, response_bytes
+from lib.page_cache import page_cache
+from lib.parse_pool import parse_pool
 
 
 # Create logs path
@@ -15,7 +28,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)  # Set the logging level for this module
 
 # Create file handler which logs messages to a file
-file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
+file_handler = logging.FileHandler(log_file_path, encoding='utf-8', delay=True)
 file_handler.setLevel(logging.WARNING)
 
 # Create a formatter and set it for the handler
@@ -25,12 +38,128 @@ file_handler.setFormatter(formatter)
 # Add the handler to the logger
 logger.addHandler(file_handler)
 
+# lxml is optional, without it every website falls back to the built-in parser
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Attributes lxml sets to their own name when a page writes them without a value,
+# while html.parser leaves them empty, e.g. a bare disabled becomes disabled="disabled"
+BOOLEAN_ATTRIBUTES = (
+    "checked", "compact", "declare", "defer", "disabled", "ismap", "multiple",
+    "nohref", "noresize", "noshade", "nowrap", "readonly", "selected"
+)
+# A boolean attribute written with its own name as the value, lxml cannot tell it from the bare one
+BOOLEAN_ATTRIBUTE_VALUE = regex.compile(
+    r"\s(" + "|".join(BOOLEAN_ATTRIBUTES) + r")\s*=\s*[\"']?\1\b", regex.IGNORECASE
+)
+
+# Connection stages reported by the httpx trace extension, mapped to metric stage names
+TRACED_STAGES = {
+    "connection.connect_tcp": "connect",   # includes DNS resolution
+    "connection.start_tls": "tls",
+}
+
 # Compile the regular expression pattern
 pattern = regex.compile(r'\P{Alnum}+')
 
 
+def normalize_query(text):
+    """
+    Normalize a search query: lowercase it and replace any non-alphanumeric characters with single spaces.
+
+    Parameters:
+    - text: str, the raw search query
+
+    Returns:
+    - str, the normalized search query
+    """
+    return pattern.sub(' ', text.lower()).strip()
+
+
+# Common inflectional endings of Ukrainian nouns and adjectives, longest first
+UKRAINIAN_ENDINGS = (
+    "ами", "ями", "ого", "ому", "ими", "ові",
+    "ою", "ею", "єю", "ої", "ий", "ій", "их", "ів", "їв", "ам", "ям", "ах", "ях", "ом", "ем",
+    "а", "я", "о", "е", "є", "і", "и", "у", "ю", "ь"
+)
+
+# Stems shorter than this are matched only exactly, longer alphabetic ones also match as prefixes.
+# Endings are not stripped when the stem would become shorter, so "шолом" keeps matching "Шоломи"
+MIN_PREFIX_LENGTH = 4
+
+
+@functools.lru_cache(maxsize=65536)
+def word_stem(word):
+    """
+    Strip a Ukrainian inflectional ending from a word, so different word forms share a stem.
+
+    Parameters:
+    - word: str, a lowercase word
+
+    Returns:
+    - str, the stem of the word
+    """
+    for ending in UKRAINIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_PREFIX_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+@functools.lru_cache(maxsize=65536)
+def tokenize(text):
+    """
+    Split a product name or a query into a set of word stems.
+
+    Results are cached, so names seen on many pages, stores or searches are tokenized once.
+
+    Parameters:
+    - text: str, the text to split
+
+    Returns:
+    - frozenset of str, the stems of the words
+    """
+    return frozenset(word_stem(word) for word in normalize_query(text).split())
+
+
+def is_prefix_token(token):
+    """
+    Check if a query stem may match as a prefix of a longer stem.
+
+    Numbers and model codes are matched only exactly, so "1000" does not match "10000".
+
+    Parameters:
+    - token: str, a stem of the search query
+
+    Returns:
+    - bool, True if the stem is alphabetic and long enough
+    """
+    return len(token) >= MIN_PREFIX_LENGTH and token.isalpha()
+
+
+def match_tokens(query_tokens, name_tokens):
+    """
+    Check if every query stem is present in the name stems, either exactly or, for alphabetic stems, as a prefix of a name stem.
+
+    Parameters:
+    - query_tokens: frozenset of str, stems of the search query
+    - name_tokens: frozenset of str, stems of the product name
+
+    Returns:
+    - bool, True if the name matches the query
+    """
+    for query_token in query_tokens:
+        if query_token in name_tokens:
+            continue
+        if not is_prefix_token(query_token) or not any(token.startswith(query_token) for token in name_tokens):
+            return False
+    return True
+
+
 class Product:
-    def __init__(self, name, price, stock_status):
+    def __init__(self, name, price, stock_status, url=None):
         """
         Represents a product with its name, price, and stock status.
 
@@ -38,14 +167,31 @@ class Product:
         - name: str, the name of the product
         - price: str, the price of the product
         - stock_status: bool, the availability status of the product
+        - url: str, the url of the page the product was found on
         """
         self.name = name
         self.price = price
         self.stock_status = stock_status
+        self.url = url
+
+
+class ScrapeSession:
+    def __init__(self, product):
+        """
+        Holds the state of a single scraping run, so a website can be scraped by many searches at once.
+
+        Parameters:
+        - product: str, the product to search for
+        """
+        self.product = product
+        self.query_tokens = tokenize(product)
+        self.previous_page_fingerprint = None
+        # Set when a request of the run failed, so its results may be missing pages
+        self.failed = False
 
 
 class WebsiteScraper:
-    def __init__(self, name, base_url, search_query_url, search_query_separator, product_container_class, extract_info_functions, social_network, tel_vodafone, tel_kyivstar):
+    def __init__(self, name, base_url, search_query_url, search_query_separator, product_container_class, extract_spec, social_network, tel_vodafone, tel_kyivstar, page_window=1, parser="html.parser", parse_only_containers=False, catalog_url=None, cheapest_url=None):
         """
         Represents a website scraper with specific parameters.
 
@@ -55,68 +201,229 @@ class WebsiteScraper:
         - search_query_url: str, the search query URL template
         - search_query_separator: str, separator for search queries in the URL
         - product_container_class: str, class name of the HTML container for product information
-        - extract_info_functions: function, function to extract information from a product container
+        - extract_spec: dict, declarative extraction spec of product name, price and stock status (see ExtractionSpec)
         - social_network: str, the social network associated with the website
         - tel_vodafone: str, Vodafone contact number for the website
         - tel_kyivstar: str, Kyivstar contact number for the website
+        - page_window: int, number of result pages fetched concurrently (1 fetches pages one by one)
+        - parser: str, BeautifulSoup parser backend, "html.parser" or the faster C-based "lxml"
+        - parse_only_containers: bool, build the tree only for product containers instead of the whole page
+        - catalog_url: str, URL template of pages listing the whole catalog, used by the catalog crawler (optional)
+        - cheapest_url: str, URL template of search pages sorted by price in ascending order, used by the cheapest-first search (optional)
         """
         self.name = name
         self.base_url = base_url
         self.search_query_url = search_query_url
         self.search_query_separator = search_query_separator
         self.product_container_class = product_container_class
-        self.extract_info_functions = extract_info_functions
+        self.extraction_spec = ExtractionSpec(extract_spec)
         self.social_network = social_network
         self.tel_vodafone = tel_vodafone
         self.tel_kyivstar = tel_kyivstar
-        self.previous_page_content = set()
-
-
-    def build_url(self, page, query):
+        self.page_window = page_window
+        self.parser = parser
+        self.parse_only_containers = parse_only_containers
+        self.catalog_url = catalog_url
+        self.cheapest_url = cheapest_url
+
+        # Fall back to the built-in parser if the selected backend is not installed
+        if builder_registry.lookup(self.parser) is None:
+            logging.warning(f"{self.name}: parser '{self.parser}' is not available, using 'html.parser' instead")
+            self.parser = "html.parser"
+
+        # Arguments rebuilding the page parsing of the website in a parse worker process
+        self.parser_definition = {
+            "name": self.name,
+            "product_container_class": self.product_container_class,
+            "extract_spec": extract_spec,
+            "parser": self.parser,
+            "parse_only_containers": self.parse_only_containers,
+        }
+
+        self.container_strainer = None
+        self.container_xpath = None
+
+        if parse_only_containers:
+            # Skip everything outside of product containers while building the tree
+            self.container_strainer = SoupStrainer(class_=self.product_container_class)
+
+        if parse_only_containers and self.parser == "lxml":
+            # Locate the outermost product containers with lxml, nested ones are kept inside them
+            self.container_xpath = lxml.etree.XPath(
+                f"//*[{self.container_xpath_condition()}][not(ancestor::*[{self.container_xpath_condition()}])]"
+            )
+            self.boolean_attributes_xpath = lxml.etree.XPath(
+                "descendant-or-self::*[" + " or ".join(f"@{name}='{name}'" for name in BOOLEAN_ATTRIBUTES) + "]"
+            )
+            self.previous_element_xpath = lxml.etree.XPath("(ancestor::* | preceding::*)[last()]")
+
+
+    def build_url(self, page, query, base_url=None):
         """
         Build a complete URL with filled in placeholders.
 
         Parameters:
         - page: int, the page number
         - query: str, the search query
+        - base_url: str, URL template used instead of the website's base_url (optional)
 
         Returns:
         - str, the constructed URL
         """
-        return self.base_url.format(page=page, query=query)
+        return (base_url or self.base_url).format(page=page, query=query)
 
 
-    def fetch_data(self, url):
+    async def fetch_data_async(self, client, url, session=None):
         """
-        Send a GET request to the specified URL with a random user agent.
+        Asynchronously send a GET request to the specified URL with a random user agent.
+
+        The request runs on the event loop using the pooled connections of the given client.
+        It waits for a slot of the shared host scheduler first, so concurrent searches stay
+        within the per-host budgets. Its outcome and latency are recorded in the website's health,
+        and the time spent queueing, connecting and fetching is recorded in stage metrics.
+
+        Pages are served from the page cache while they are fresh. Older cached pages
+        are revalidated with If-None-Match/If-Modified-Since, so unchanged pages are not downloaded again.
 
         Parameters:
+        - client: httpx.AsyncClient, the client used to send the request
         - url: str, the URL to send the GET request to
+        - session: ScrapeSession, the scraping run the request belongs to, used for fair queueing
+          and marked as failed if the request fails (optional)
 
         Returns:
         - bytes, the content of the response or None if an error occurs
         """
-        # Create an instance of the UserAgent class
-        ua = UserAgent()
+        cached_page = await page_cache.get(url) if page_cache is not None else None
+
+        if cached_page is not None and page_cache.is_fresh(cached_page):
+            return cached_page.content
+
+        headers = {"User-Agent": http_client.random_user_agent()}
+
+        # Ask the store to answer 304 if the cached page has not changed
+        if cached_page is not None and cached_page.etag:
+            headers["If-None-Match"] = cached_page.etag
+        if cached_page is not None and cached_page.last_modified:
+            headers["If-Modified-Since"] = cached_page.last_modified
 
-        headers = {"User-Agent": ua.random}
-        response = requests.get(url, headers=headers)
+        health = store_health.get(self.name)
+        queued_at = time.monotonic()
 
-        if response.status_code == 200:
-            return response.content
-        if response.status_code == 404:
+        try:
+            async with host_scheduler.slot(url, session):
+                started_at = time.monotonic()
+                stage_seconds.observe(started_at - queued_at, self.name, "queue")
+                response = await client.get(url, headers=headers, extensions={"trace": self.trace_connection()})
+        except httpx.HTTPError as e:
+            health.record_failure(time.monotonic() - started_at)
+            logging.warning(f"Request failed: {e!r} while connecting to {url}")
+
+            if session is not None:
+                session.failed = True
+            return None
+
+        elapsed = time.monotonic() - started_at
+        stage_seconds.observe(elapsed, self.name, "fetch")
+        response_bytes.observe(response.num_bytes_downloaded, self.name)
+
+        if response.status_code == 304 and cached_page is not None:
+            health.record_success(elapsed)
+            page_cache.revalidated(url, cached_page)
+            return cached_page.content
+
+        # Missing pages are a normal end of the results, refusals and server errors count against the website
+        if response.status_code in (200, 404):
+            health.record_success(elapsed)
+        else:
+            health.record_failure(elapsed)
+
+            if session is not None:
+                session.failed = True
+
+        if response.status_code == 200 and page_cache is not None:
+            page_cache.put(
+                url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                response.headers.get("Cache-Control")
+            )
+
+        return self.handle_response(url, response.status_code, response.content)
+
+
+    def trace_connection(self):
+        """
+        Build an httpx trace callback recording connection stages of a request in stage metrics.
+
+        Only requests opening a new connection report these stages, reused keep-alive connections do not.
+
+        Returns:
+        - coroutine function, the trace callback
+        """
+        stage_started_at = {}
+
+        async def trace(event_name, info):
+            event, _, phase = event_name.rpartition(".")
+
+            if event not in TRACED_STAGES:
+                return
+
+            if phase == "started":
+                stage_started_at[event] = time.monotonic()
+            elif phase == "complete" and event in stage_started_at:
+                stage_seconds.observe(time.monotonic() - stage_started_at[event], self.name, TRACED_STAGES[event])
+
+        return trace
+
+
+    def handle_response(self, url, status_code, content):
+        """
+        Check the response status code and return its content if the request succeeded.
+
+        Parameters:
+        - url: str, the requested URL used in logger
+        - status_code: int, the HTTP status code of the response
+        - content: bytes, the content of the response
+
+        Returns:
+        - bytes, the content of the response or None if the status code is not 200
+        """
+        if status_code == 200:
+            return content
+        if status_code == 404:
             return None
-        if response.status_code == 403:
+        if status_code == 403:
             logging.info(f"{url} >>> Server refuses to authorize the request")
             return None
         else:
-            logging.warning(f"Received an unexpected status code: {response.status_code} while connecting to {url}")
+            logging.warning(f"Received an unexpected status code: {status_code} while connecting to {url}")
             return None
 
 
+    def container_xpath_condition(self):
+        """
+        Build an XPath condition matching product containers the same way as find_all(class_=...).
+
+        A single class name matches any element having that class, while several space separated
+        class names must match the whole class attribute.
+
+        Returns:
+        - str, the XPath condition
+        """
+        if " " in self.product_container_class:
+            return f"normalize-space(@class)='{self.product_container_class}'"
+        return f"contains(concat(' ', normalize-space(@class), ' '), ' {self.product_container_class} ')"
+
+
     def parse_html(self, content):
         """
-        Parse the HTML content using BeautifulSoup.
+        Parse the HTML content using BeautifulSoup with the website's parser backend.
+
+        If parse_only_containers is enabled, only product containers are turned into tree nodes,
+        which is enough for the duplicate detection and the extraction functions. With lxml the
+        containers are located by the C parser and only their markup is handed to BeautifulSoup.
+        If a container has a boolean attribute written with its own name as the value, the page is
+        parsed with a SoupStrainer instead, so attribute selectors like button[disabled="disabled"]
+        match as with html.parser.
 
         Parameters:
         - content: bytes, the HTML content to parse
@@ -124,108 +431,117 @@ class WebsiteScraper:
         Returns:
         - BeautifulSoup object, the parsed HTML
         """
-        return BeautifulSoup(content, "html.parser")
+        if self.container_xpath is None:
+            return BeautifulSoup(content, self.parser, parse_only=self.container_strainer)
+
+        markup = UnicodeDammit(content, is_html=True).unicode_markup
+
+        try:
+            document = lxml.html.document_fromstring(markup)
+        except (lxml.etree.ParserError, ValueError):
+            # Empty documents or documents with an encoding declaration lxml refuses to parse from str
+            return BeautifulSoup(content, "html.parser", parse_only=SoupStrainer(class_=self.product_container_class))
+
+        containers = self.container_xpath(document)
+        bare_elements = [element for container in containers for element in self.boolean_attributes_xpath(container)]
+
+        if bare_elements:
+            lines = markup.split("\n")
 
+            # lxml reports the line a start tag ends on, and it starts after the previous one ended,
+            # so only these lines of the source are checked instead of the whole page
+            for element in bare_elements:
+                previous_elements = self.previous_element_xpath(element)
+                first_line = previous_elements[0].sourceline if previous_elements and previous_elements[0].sourceline else 1
 
-    def get_page_content(self, soup):
+                if BOOLEAN_ATTRIBUTE_VALUE.search("\n".join(lines[first_line - 1:element.sourceline or len(lines)])):
+                    return BeautifulSoup(content, self.parser, parse_only=self.container_strainer)
+
+        # Boolean attributes of the containers set to their own name are bare, so they are empty as in html.parser
+        for element in bare_elements:
+            for name in BOOLEAN_ATTRIBUTES:
+                if element.get(name) == name:
+                    element.set(name, "")
+
+        # XML serialization keeps attribute values as they are, HTML serialization would minimize them
+        containers_markup = "".join(
+            lxml.etree.tostring(container, encoding="unicode", method="xml", with_tail=False)
+            for container in containers
+        )
+        return BeautifulSoup(containers_markup, "html.parser")
+
+
+    def page_fingerprint(self, product_containers):
         """
-        Extract relevant content from the page and convert it to a set for comparison.
+        Compute a compact fingerprint of the page content for duplicate detection.
+
+        The fingerprint does not depend on the order of the containers, and repeated
+        containers are counted once, so it is equal for pages with the same set of products.
 
         Parameters:
-        - soup: BeautifulSoup object, the parsed HTML
+        - product_containers: list of Tag objects, product containers found on the page
 
         Returns:
-        - set, the extracted content set
+        - bytes, the fingerprint of the page
         """
-        product_names = [product.text for product in soup.find_all(class_=self.product_container_class)]
-        return set(product_names)
+        container_digests = {
+            hashlib.blake2b(container.text.encode(), digest_size=8).digest()
+            for container in product_containers
+        }
+        return hashlib.blake2b(b"".join(sorted(container_digests)), digest_size=16).digest()
 
 
-    def match_query(self, query, product_name):
+    def match_query(self, query_tokens, product_name):
         """
         Check if a given product name matches a search query.
 
         Args:
-            query (str): The search query to match against.
+            query_tokens (frozenset): Stems of the search query, computed once per search.
             product_name (str): The product name (in online store) to check for a match.
 
         Returns:
             bool: True if all words from the query are present in the product name, False otherwise.
         """
-        # Split both strings
-        query = query.lower().split()
-        product_name = pattern.sub(' ', product_name.lower()).strip().split()
-
-        # Check if all words from the query are present in the product name
-        return all(word in product_name for word in query)
-
-
-    def similarity_check(self, set1, set2):
-        """
-        Calculate the Jaccard similarity coefficient between two sets.
-
-        Parameters:
-        - set1: set, the first set
-        - set2: set, the second set
-
-        Returns:
-        - float, the Jaccard similarity coefficient
-        """
-        intersection_size = len(set1.intersection(set2))
-        union_size = len(set1.union(set2))
-        similarity_coefficient = intersection_size / union_size if union_size != 0 else 0
-        return similarity_coefficient
+        return match_tokens(query_tokens, tokenize(product_name))
 
 
-    def detect_duplicate_content(self, current_page_content):
+    def detect_duplicate_content(self, session, current_page_fingerprint):
         """
-        Compare the content of the current page with the previous page.
+        Compare the content of the current page with the previous page of the same scraping run.
 
         Parameters:
-        - current_page_content: set, the content set of the current page
+        - session: ScrapeSession, the state of the scraping run
+        - current_page_fingerprint: bytes, the fingerprint of the current page
 
         Returns:
         - bool, indicating whether the content is duplicate
         """
-        similarity = self.similarity_check(self.previous_page_content, current_page_content)
-        self.previous_page_content = current_page_content
-        return similarity >= 0.99  # Adjust the similarity threshold as needed
+        is_duplicate = current_page_fingerprint == session.previous_page_fingerprint
+        session.previous_page_fingerprint = current_page_fingerprint
+        return is_duplicate
 
 
-    def extract_information(self, soup, search_query, url):
+    def extract_information(self, product_containers, query_tokens, url):
         """
-        Extract product information from the parsed HTML.
+        Extract product information from the product containers of a page.
 
         Parameters:
-        - soup: BeautifulSoup object, the parsed HTML
-        - search_query: str, the search query
+        - product_containers: list of Tag objects, product containers found on the page
+        - query_tokens: frozenset of str, stems of the search query
         - url: str, the website url used in logger
 
         Returns:
-        - list of Product objects, the extracted product information
+        - list of tuples, (name, price) of the in-stock products matching the query
         """
-        product_containers = soup.find_all(class_=self.product_container_class)
         products = []
 
         for product_container in product_containers:
             try:
-                product_info = self.extract_info_functions(product_container)
-
-                if product_info is not None and product_info.get('stock_status', False):
-                    if 'name' in product_info and 'price' in product_info:
-                        # Check similarity between product name and search query
-                        check_names = self.match_query(search_query, product_info['name'])
-                        if check_names:
-                            product_name = product_info['name'].replace('"', "'")
-                            products.append(Product(
-                                name=product_name,
-                                price=product_info['price'],
-                                stock_status=True
-                            ))
-                    else:
-                        logging.error(f"Either name or price html elements were not specified")
-            except AttributeError:
-                pass
+                product_info = self.extraction_spec.extract(product_container)
+
+                # Check similarity between product name and search query
+                if product_info is not None and self.match_query(query_tokens, product_info['name']):
+                    products.append((product_info['name'].replace('"', "'"), product_info['price']))
 
             except Exception as e:
                 logging.error(f"Error extracting information: {e}\nURL: {url}")
@@ -251,7 +567,7 @@ class WebsiteScraper:
 
     def scrape(self, product):
         """
-        Main scraping function that iterates over pages and extracts information.
+        Synchronous entry point of the scraper, runs the asynchronous scraper in a new event loop.
 
         Parameters:
         - product: str, the product to search for
@@ -259,39 +575,193 @@ class WebsiteScraper:
         Returns:
         - list of Product objects, the aggregated product information
         """
-        page = 1
-        aggregated_products = []
+        async def scrape_with_own_client():
+            async with http_client.create_client() as client:
+                return await self.scrape_async(product, client)
 
-        while True:
-            query = product.replace(" ", self.search_query_separator)
-            url = self.build_url(page, query)
-            content = self.fetch_data(url)
+        return asyncio.run(scrape_with_own_client())
 
-            if not content or content is None:
-                logging.info(f"No content received from {url}")
-                break
 
-            soup = self.parse_html(content)
-            logging.debug(f"Scraping data from {url}...")
+    def parse_page(self, content, query_tokens, previous_fingerprint, url):
+        """
+        Parse a page and extract the matching products, unless the page repeats the previous one.
 
-            current_page_content = self.get_page_content(soup)
+        It does not touch any shared state, so it runs the same in a parse worker process.
 
-            if self.detect_duplicate_content(current_page_content):
-                logging.info(f"Detected duplicate content. Stopping scraping {url}")
-                break
+        Parameters:
+        - content: bytes, the HTML content of the page
+        - query_tokens: frozenset of str, stems of the search query
+        - previous_fingerprint: bytes, fingerprint of the previous page of the scraping run (None for the first page)
+        - url: str, the page url used in logger
 
-            try:
-                products_on_page = self.extract_information(soup, product, url)
+        Returns:
+        - tuple, (bytes fingerprint of the page, list of (name, price) tuples or None if extraction failed,
+          float parse time, float extract time in seconds)
+        """
+        started_at = time.monotonic()
+        soup = self.parse_html(content)
+        logging.debug(f"Scraping data from {url}...")
+
+        # Find containers once, they are used for both the duplicate detection and the extraction
+        product_containers = soup.find_all(class_=self.product_container_class)
+        fingerprint = self.page_fingerprint(product_containers)
+
+        parsed_at = time.monotonic()
+
+        if fingerprint == previous_fingerprint:
+            return fingerprint, [], parsed_at - started_at, 0.0
+
+        try:
+            products = self.extract_information(product_containers, query_tokens, url)
+        except Exception as e:
+            logging.error(f"Error extracting information: {e}")
+            products = None
+
+        return fingerprint, products, parsed_at - started_at, time.monotonic() - parsed_at
+
+
+    def finish_page(self, session, url, fingerprint, products, parse_time, extract_time):
+        """
+        Record the result of parse_page in the scraping run and the stage metrics.
+
+        Parameters:
+        - session: ScrapeSession, the state of the scraping run
+        - url: str, the page url
+        - fingerprint, products, parse_time, extract_time: the result of parse_page
+
+        Returns:
+        - tuple, (bool indicating duplicate content, list of Product objects or None if extraction failed)
+        """
+        stage_seconds.observe(parse_time, self.name, "parse")
+
+        if self.detect_duplicate_content(session, fingerprint):
+            return True, []
+
+        stage_seconds.observe(extract_time, self.name, "extract")
+
+        if products is None:
+            return False, None
+
+        return False, [Product(name=name, price=price, stock_status=True, url=url) for name, price in products]
 
-                if not products_on_page:
+
+    def process_page(self, session, content, url):
+        """
+        Parse a fetched page and extract products from it, recording the time of both stages.
+
+        Parameters:
+        - session: ScrapeSession, the state of the scraping run
+        - content: bytes, the HTML content of the page
+        - url: str, the page url used in logger
+
+        Returns:
+        - tuple, (bool indicating duplicate content, list of Product objects or None if extraction failed)
+        """
+        return self.finish_page(session, url, *self.parse_page(content, session.query_tokens, session.previous_page_fingerprint, url))
+
+
+    async def process_page_async(self, session, content, url):
+        """
+        Process a fetched page in the parse pool, or on the event loop if the pool is disabled or broken.
+
+        Time the page waits for a free worker and travels between processes is recorded as the parse_queue stage.
+
+        Parameters:
+        - session: ScrapeSession, the state of the scraping run
+        - content: bytes, the HTML content of the page
+        - url: str, the page url used in logger
+
+        Returns:
+        - tuple, (bool indicating duplicate content, list of Product objects or None if extraction failed)
+        """
+        if parse_pool is None:
+            return self.process_page(session, content, url)
+
+        submitted_at = time.monotonic()
+        result = await parse_pool.parse(self, content, session.query_tokens, session.previous_page_fingerprint, url)
+
+        if result is None:
+            return self.process_page(session, content, url)
+
+        _, _, parse_time, extract_time = result
+        stage_seconds.observe(max(0.0, time.monotonic() - submitted_at - parse_time - extract_time), self.name, "parse_queue")
+
+        return self.finish_page(session, url, *result)
+
+
+    async def scrape_async(self, product, client=None, base_url=None, limit=None, session=None):
+        """
+        Main scraping coroutine that iterates over pages and extracts information.
+
+        Pages are fetched on the event loop and parsed in the parse pool. Up to `page_window`
+        pages are requested ahead concurrently, while pages are still processed in order, so
+        the results and the duplicate detection are the same as when paging one by one.
+
+        With a limit, scraping stops after the page on which the number of found products
+        reaches it. Pages are then requested one by one, as the first ones are usually enough.
+
+        Parameters:
+        - product: str, the product to search for
+        - client: httpx.AsyncClient, the client used to send requests (shared client if not specified)
+        - base_url: str, URL template of the pages to scrape instead of the search pages (optional)
+        - limit: int, number of products after which no more pages are scraped (optional)
+        - session: ScrapeSession, the state of the run for the product, e.g. to check afterwards
+          whether a request failed (a new one if not specified)
+
+        Returns:
+        - list of Product objects, the aggregated product information
+        """
+        if client is None:
+            client = http_client.get_client()
+
+        # State of this run only, concurrent runs for the same website do not share it
+        if session is None:
+            session = ScrapeSession(product)
+        aggregated_products = []
+        query = product.replace(" ", self.search_query_separator)
+
+        # Pages requested ahead of the one being processed, kept in page order
+        pending_pages = deque()
+        next_page = 1
+        pages_received = 0
+        page_window = 1 if limit is not None else max(1, self.page_window)
+
+        try:
+            while True:
+                # Keep the window of speculatively requested pages full
+                while len(pending_pages) < page_window:
+                    next_url = self.build_url(next_page, query, base_url)
+                    pending_pages.append((next_url, asyncio.ensure_future(self.fetch_data_async(client, next_url, session))))
+                    next_page += 1
+
+                url, fetch_task = pending_pages.popleft()
+                content = await fetch_task
+
+                if not content or content is None:
+                    logging.info(f"No content received from {url}")
                     break
 
-            except Exception as e:
-                logging.error(f"Error extracting information: {e}")
+                pages_received += 1
+                is_duplicate, products_on_page = await self.process_page_async(session, content, url)
+
+                if is_duplicate:
+                    logging.info(f"Detected duplicate content. Stopping scraping {url}")
+                    break
+
+                if products_on_page is not None:
+                    if not products_on_page:
+                        break
+
+                    aggregated_products.extend(products_on_page)
+
+                    if limit is not None and len(aggregated_products) >= limit:
+                        break
 
-            else:
-                aggregated_products.extend(products_on_page)
+        finally:
+            # Cancel requests for pages past the last one
+            for _, fetch_task in pending_pages:
+                fetch_task.cancel()
 
-            page += 1
+            pages_fetched.observe(pages_received, self.name)
 
         return aggregated_products
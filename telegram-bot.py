@@ -2,15 +2,27 @@ import asyncio
 import string
 import os
 import logging
+import time
 from dotenv import load_dotenv
 
-import regex
-from telegram import Chat
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
-from telegram.error import BadRequest
+from telegram import Chat, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, MessageHandler, filters
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
 
-from lib import generate_formatted_output
-from lib import generate_bot_usage_data
+from lib import generate_formatted_output, generate_cheapest_output
+from lib import format_store_items, format_price_history, register_result, result_handles
+from lib import UsageRecorder
+from lib import close_client
+from lib import normalize_query
+from lib import SEARCH_DEADLINE
+from lib import catalog_crawler
+from lib import start_metrics_server, readiness, METRICS_PORT
+from lib import warm_up, keep_warm, WARMUP_INTERVAL
+from lib import store_registry
+from lib import parse_pool
+from lib import page_cache
+from lib import price_history
+from lib import WatchList, WatchScheduler, search_watched, format_price_alert, parse_watch_request
 
 
 # Load secret .env file
@@ -25,8 +37,12 @@ BOT_USERNAME = '@find_mil_gear_ua_bot'
 if not os.path.exists('data'):
     os.makedirs('data')
     
-# Define bot usage data path
+# Define bot usage data path (the former CSV log is imported into the database once)
 usage_data_dir = os.path.join('data','data.csv')
+usage_db_path = os.path.join('data','usage.db')
+
+# Define price watches path
+watch_db_path = os.path.join('data','watches.db')
 
 # Ensure the logs directory exists
 if not os.path.exists('logs'):
@@ -46,8 +62,24 @@ logging.basicConfig(
 
 logging.debug('Logging is configured correctly.')
 
-# Compile the regular expression pattern to process input product name
-pattern = regex.compile(r'\P{Alnum}+')
+
+# Minimum number of seconds between edits of a search progress message (Telegram rate limits edits)
+PROGRESS_EDIT_INTERVAL = float(os.getenv('PROGRESS_EDIT_INTERVAL', 3))
+
+# Number of "show items" buttons per keyboard row
+ITEMS_BUTTONS_PER_ROW = 2
+
+# Chats allowed to use admin commands
+ADMIN_CHAT_IDS = {int(chat_id) for chat_id in os.getenv('ADMIN_CHAT_IDS', '').split(',') if chat_id.strip()}
+
+# Price watches of chats are checked by one search per watched query every interval (watches are disabled if 0)
+WATCH_INTERVAL = float(os.getenv('WATCH_INTERVAL', 3600))
+
+# Buffered recorder of bot searches, price watches of chats and their checks, created in startup():
+# parse worker processes run this script again and must not open the databases
+usage_recorder = None
+watch_list = None
+watch_scheduler = None
 
 
 # Define a User class to store user-specific data
@@ -56,48 +88,271 @@ class User:
         self.chat_id = chat_id
         self.searching = False
         self.search_result = ""
+        self.reply_markup = None
+
+
+# Define a class to show search progress by editing the placeholder message
+class ProgressMessage:
+    def __init__(self, message):
+        self.message = message
+        self.last_text = message.text
+        self.last_edit_time = time.monotonic()
+
+    async def edit(self, text, reply_markup=None):
+        if text == self.last_text and reply_markup is None:
+            return
+
+        await self.message.edit_text(text, disable_web_page_preview=True, parse_mode='html', reply_markup=reply_markup)
+        self.last_text = text
+        self.last_edit_time = time.monotonic()
+
+    # Show partial results, skipping updates which come too soon after the previous edit
+    async def update(self, text):
+        if time.monotonic() - self.last_edit_time < PROGRESS_EDIT_INTERVAL:
+            return
+
+        # Any failure only skips this update, the final result is still shown
+        try:
+            await self.edit(text)
+        except TelegramError as e:
+            logging.warning(f"Failed to update search progress: {e}")
+
+    # Show the final result, replying with a new message if the placeholder can not be edited
+    async def finish(self, text, reply_markup=None):
+        try:
+            await self.edit(text, reply_markup)
+        except TelegramError as e:
+            logging.warning(f"Failed to edit search progress, sending a new message: {e}")
+            await self.message.reply_text(text, disable_web_page_preview=True, parse_mode='html', reply_markup=reply_markup)
+
+
+# Build "show items" buttons for every store of a search result, the items are formatted only when a button is pressed
+def build_items_keyboard(search_result):
+    if not search_result["results"]:
+        return None
+
+    handle = register_result(search_result)
+    buttons = [
+        InlineKeyboardButton(f"🔍 {website['website']} ({website['products_qty']})", callback_data=f"items:{handle}:{index}")
+        for index, website in enumerate(search_result["results"])
+    ]
+
+    return InlineKeyboardMarkup([buttons[i:i + ITEMS_BUTTONS_PER_ROW] for i in range(0, len(buttons), ITEMS_BUTTONS_PER_ROW)])
 
 
 # Handle the /start command
 async def start(update, context):
     await update.message.reply_text(
-        "<b>Надішли назву товару для пошуку</b>\nНаприклад: <i>мультитул leatherman</i>",
+        "<b>Надішли назву товару для пошуку</b>\nНаприклад: <i>мультитул leatherman</i>\n\n"
+        "Лише найдешевші товари: <i>/cheap мультитул leatherman</i>\n"
+        "Історія цін: <i>/history мультитул leatherman</i>\n"
+        "Сповіщення про зниження ціни: <i>/watch мультитул leatherman до 3000</i>",
         parse_mode='html'
     )
 
 
-# Handle user request
-async def handle_response(user, text):
+# Handle the /stats command, available to admin chats only
+async def stats(update, context):
+    if update.effective_chat.id not in ADMIN_CHAT_IDS:
+        return
+
+    usage = await usage_recorder.stats()
+
+    text = "<b>Користувачі за днями</b>\n"
+    for day, users, searches in usage["daily_users"]:
+        text += f"◽ {day}: {users} корист., {searches} пошуків\n"
+
+    text += "\n<b>Популярні запити</b>\n"
+    for query, searches in usage["top_queries"]:
+        text += f"◽ {query}: {searches}\n"
+
+    if usage["latency_p95"] is not None:
+        text += f"\n⏱ Час пошуку (p95): {usage['latency_p95']:.1f} сек."
+
+    await update.message.reply_text(text, parse_mode='html')
+
+
+# Handle the /history command, answering from the local price history without searching
+async def history(update, context):
+    processed = normalize_query(" ".join(context.args))
+
+    if len(processed) < 2:
+        await update.message.reply_text(
+            "⚠ <b>Вкажи назву товару</b>\nНаприклад: <i>/history мультитул leatherman</i>",
+            parse_mode='html'
+        )
+        return
+
+    if price_history is None:
+        await update.message.reply_text("⚠ <b>Історія цін вимкнена</b>", parse_mode='html')
+        return
+
+    trend = await price_history.trend(processed)
+    await update.message.reply_text(format_price_history(trend, processed), parse_mode='html')
+
+
+# Handle the /watch command: list watches without arguments, or watch a product with an optional maximum price
+async def watch(update, context):
+    chat_id = update.effective_chat.id
+
+    if WATCH_INTERVAL <= 0:
+        await update.message.reply_text("⚠ <b>Стеження за цінами вимкнене</b>", parse_mode='html')
+        return
+
+    if not context.args:
+        watches = await watch_list.chat_watches(chat_id)
+
+        if not watches:
+            await update.message.reply_text(
+                "<b>Стеження за цінами</b>\nНаприклад: <i>/watch мультитул leatherman до 3000</i>",
+                parse_mode='html'
+            )
+            return
+
+        text = "<b>Стеження за цінами</b>\n"
+        for query, max_price, last_price in watches:
+            text += f"◽ {query}"
+            text += f", до {max_price:,} грн." if max_price is not None else ""
+            text += f" (остання ціна {last_price:,} грн.)\n" if last_price is not None else "\n"
+
+        await update.message.reply_text(text, parse_mode='html')
+        return
+
+    try:
+        product, max_price = parse_watch_request(" ".join(context.args))
+    except ValueError:
+        await update.message.reply_text(
+            "⚠ <b>Вкажи максимальну ціну числом</b>\nНаприклад: <i>/watch мультитул leatherman до 3000</i>",
+            parse_mode='html'
+        )
+        return
+
+    query = normalize_query(product)
+
+    if len(query) < 2:
+        await update.message.reply_text("⚠ <b>Вкажи назву товару</b>", parse_mode='html')
+        return
+
+    if not await watch_list.add(chat_id, query, max_price):
+        await update.message.reply_text(f"⚠ <b>Можна стежити не більше ніж за {watch_list.limit} товарами</b>", parse_mode='html')
+        return
+
+    text = f"🔔 Стежу за цінами на <b>{query}</b>"
+    text += f" до {max_price:,} грн." if max_price is not None else ""
+    text += f"\nПеревірка кожні {WATCH_INTERVAL / 60:.0f} хв."
+    await update.message.reply_text(text, parse_mode='html')
+
+
+# Handle the /unwatch command, stopping watching a product or all products without arguments
+async def unwatch(update, context):
+    query = normalize_query(" ".join(context.args)) if context.args else None
+    removed = await watch_list.remove(update.effective_chat.id, query)
+
+    if removed:
+        await update.message.reply_text(f"🔕 Стеження припинено: {removed}", parse_mode='html')
+    else:
+        await update.message.reply_text("⚠ <b>Такого стеження немає</b>", parse_mode='html')
+
+
+# Send a price alert, waiting once when flood-limited and forgetting the watches of chats which blocked the bot,
+# other errors are raised so the scheduler retries the alert on the next check
+async def send_price_alert(bot, chat_id, text):
+    try:
+        try:
+            await bot.send_message(chat_id, text, disable_web_page_preview=True, parse_mode='html')
+        except RetryAfter as e:
+            logging.warning(f"Price alerts are flood-limited, retrying in {e.retry_after} seconds")
+            await asyncio.sleep(e.retry_after)
+            await bot.send_message(chat_id, text, disable_web_page_preview=True, parse_mode='html')
+    except Forbidden as e:
+        removed = await watch_list.remove(chat_id)
+        logging.warning(f"Removed {removed} watches of chat {chat_id}, the bot can not message it: {e}")
+
+
+# Handle a "show items" button, listing the cheapest items of a store from a recent search
+async def show_items(update, context):
+    query = update.callback_query
+    _, handle, index = query.data.split(':')
+    search_result = result_handles.get(handle)
+
+    if search_result is None or int(index) >= len(search_result["results"]):
+        await query.answer("Результати пошуку застаріли, повторіть пошук", show_alert=True)
+        return
+
+    await query.answer()
+    await query.message.reply_text(
+        format_store_items(search_result["results"][int(index)], search_result["query"]),
+        disable_web_page_preview=True,
+        parse_mode='html'
+    )
+
+
+# Handle user request, the search function is the full search by default
+async def handle_response(user, text, on_progress=None, search=generate_formatted_output):
     logging.debug(f"Raw input: text {text}")
-    processed = pattern.sub(' ', text.lower()).strip()
+    processed = normalize_query(text)
     logging.debug(f"Processed input: {processed}")
 
     # Check if processed text is empty or whitespace only
     if not processed or processed.isspace() or len(processed) < 2:
         logging.error("Invalid input received.")
         user.search_result = "⚠ <b>Повідомлення повинне містити назву товару для пошуку</b>"
+        user.reply_markup = None
         user.searching = False
         return
 
+    start_time = time.monotonic()
+
     try:
         # Call the asynchronous scraper function directly
-        formatted_message = await generate_formatted_output(processed)
+        formatted_message, search_result = await search(processed, on_progress=on_progress)
         user.search_result = formatted_message
+        user.reply_markup = build_items_keyboard(search_result)
+        usage_recorder.record(
+            user.chat_id, processed, time.monotonic() - start_time,
+            len(search_result["results"]), len(search_result["timed_out"])
+        )
     except Exception as e:
         logging.critical(f"Error during scraping process: {e}")
         user.search_result = "⚠ <b>Сталася помилка під час пошуку. Спробуйте ще раз пізніше.</b>"
+        user.reply_markup = None
+        usage_recorder.record(user.chat_id, processed, time.monotonic() - start_time)
 
     user.searching = False
     
     
+# Handle the /cheap command, searching only for the cheapest items
+async def cheap(update, context):
+    chat_id = update.message.chat_id
+    text = " ".join(context.args)
+
+    user = context.user_data.get(chat_id)
+    if not user:
+        user = User(chat_id)
+        context.user_data[chat_id] = user
+
+    try:
+        placeholder = await update.message.reply_text(
+            f"🐾 <b>Пошук найдешевших...</b>\n<i>Процес може тривати до {SEARCH_DEADLINE:.0f} сек.</i>",
+            parse_mode='html'
+        )
+        progress = ProgressMessage(placeholder)
+        user.searching = True
+        await handle_response(user, text, progress.update, search=generate_cheapest_output)
+        await progress.finish(user.search_result, user.reply_markup)
+    except Exception as e:
+        logging.critical(f"An error occurred in cheap: {e}")
+        await update.message.reply_text(
+            "⚠ <b>Сталася помилка під час обробки вашого запиту.</b>",
+            parse_mode='html'
+        )
+
+
 # Handle reply message
 async def handle_message(update, context):
     message_type = update.message.chat.type
     text = update.message.text
     chat_id = update.message.chat_id
-    
-    # Generate bot usage data for general analysis purposes
-    generate_bot_usage_data(usage_data_dir, chat_id)
 
     user = context.user_data.get(chat_id)
     if not user:
@@ -110,37 +365,36 @@ async def handle_message(update, context):
                 logging.debug('\nGroup chat bot use')
                 logging.debug(f"\nUser ({update.message.chat.id}) in {message_type}")
                 
-                await update.message.reply_text(
-                    "🐾 <b>Пошук...</b>\n<i>Процес може тривати ~1 хв</i>",
+                placeholder = await update.message.reply_text(
+                    f"🐾 <b>Пошук...</b>\n<i>Процес може тривати до {SEARCH_DEADLINE:.0f} сек.</i>",
                     parse_mode='html'
                 )
+                progress = ProgressMessage(placeholder)
                 new_text = text.replace(BOT_USERNAME, '').strip()
                 user.searching = True
-                await asyncio.gather(handle_response(user, new_text))
+                await asyncio.gather(handle_response(user, new_text, progress.update))
             else:
                 return
         elif message_type == Chat.PRIVATE:
             logging.debug('\nPrivate chat bot use')
             logging.debug(f"\nUser ({update.message.chat.id}) in {message_type}")
             
-            await update.message.reply_text(
-                "🐾 <b>Пошук...</b>\n<i>Процес може тривати ~1 хв</i>",
+            placeholder = await update.message.reply_text(
+                f"🐾 <b>Пошук...</b>\n<i>Процес може тривати до {SEARCH_DEADLINE:.0f} сек.</i>",
                 parse_mode='html'
             )
+            progress = ProgressMessage(placeholder)
             user.searching = True
-            await asyncio.gather(handle_response(user, text))
+            await asyncio.gather(handle_response(user, text, progress.update))
         else:
             logging.error(f"Unsupported message type: {message_type}")
+            return
 
-        # Always send the search result, even if the input was invalid
+        # Always show the search result in place of the progress message, even if the input was invalid
         if not user.searching:
             logging.debug(f"Search completed for user ({update.message.chat.id})")
             logging.debug(f"Search result: {user.search_result}")
-            await update.message.reply_text(
-                user.search_result, 
-                disable_web_page_preview=True, 
-                parse_mode='html'
-            )
+            await progress.finish(user.search_result, user.reply_markup)
     except Exception as e:
         logging.critical(f"An error occurred in handle_message: {e}")
         await update.message.reply_text(
@@ -149,6 +403,91 @@ async def handle_message(update, context):
         )
 
 
+# Open the databases, warm up and start background jobs once the bot is initialized
+async def startup(application):
+    global usage_recorder, watch_list, watch_scheduler
+
+    usage_recorder = UsageRecorder(usage_db_path, flush_interval=float(os.getenv('USAGE_FLUSH_INTERVAL', 10)))
+    watch_list = WatchList(watch_db_path, limit=int(os.getenv('WATCH_LIMIT', 10)))
+    watch_scheduler = WatchScheduler(
+        watch_list, search_watched, format_price_alert, WATCH_INTERVAL, concurrency=int(os.getenv('WATCH_CONCURRENCY', 2)),
+        alert_interval=float(os.getenv('WATCH_ALERT_INTERVAL', 0.05))
+    )
+
+    if METRICS_PORT:
+        application.bot_data['metrics_server'] = await start_metrics_server()
+
+    # Load user agents and connect to every store, so the first search is as fast as the following ones
+    warmup = await warm_up(store_registry.get_websites())
+    print(f"▣ Ready in {warmup['elapsed']:.1f} sec., connected to {len(warmup['connected'])} of {len(warmup['connected']) + len(warmup['failed'])} store hosts")
+    if warmup['failed']:
+        logging.warning(f"Warm-up could not connect to: {', '.join(warmup['failed'])}")
+    readiness['ready'] = True
+
+    if WARMUP_INTERVAL > 0:
+        application.bot_data['keep_warm_task'] = asyncio.create_task(keep_warm(store_registry.get_websites))
+
+    imported = usage_recorder.import_csv(usage_data_dir)
+    if imported:
+        logging.warning(f"Imported {imported} usage records from {usage_data_dir}")
+
+    application.bot_data['usage_recorder_task'] = asyncio.create_task(usage_recorder.run())
+
+    if price_history is not None:
+        application.bot_data['price_history_task'] = asyncio.create_task(price_history.run())
+
+    if page_cache is not None:
+        application.bot_data['page_cache_task'] = asyncio.create_task(page_cache.run())
+
+    if catalog_crawler is not None:
+        application.bot_data['catalog_crawler_task'] = asyncio.create_task(catalog_crawler.run())
+
+    if WATCH_INTERVAL > 0:
+        application.bot_data['watch_task'] = asyncio.create_task(
+            watch_scheduler.run(lambda chat_id, text: send_price_alert(application.bot, chat_id, text))
+        )
+
+
+# Stop background jobs, the metrics endpoint and parse workers, flush usage records, prices and cached pages and release pooled store connections on shutdown
+async def shutdown(application):
+    crawler_task = application.bot_data.get('catalog_crawler_task')
+    if crawler_task is not None:
+        crawler_task.cancel()
+
+    watch_task = application.bot_data.get('watch_task')
+    if watch_task is not None:
+        watch_task.cancel()
+
+    keep_warm_task = application.bot_data.get('keep_warm_task')
+    if keep_warm_task is not None:
+        keep_warm_task.cancel()
+
+    recorder_task = application.bot_data.get('usage_recorder_task')
+    if recorder_task is not None:
+        recorder_task.cancel()
+        await asyncio.gather(recorder_task, return_exceptions=True)
+
+    price_history_task = application.bot_data.get('price_history_task')
+    if price_history_task is not None:
+        price_history_task.cancel()
+        await asyncio.gather(price_history_task, return_exceptions=True)
+
+    page_cache_task = application.bot_data.get('page_cache_task')
+    if page_cache_task is not None:
+        page_cache_task.cancel()
+        await asyncio.gather(page_cache_task, return_exceptions=True)
+
+    metrics_server = application.bot_data.get('metrics_server')
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+
+    if parse_pool is not None:
+        parse_pool.close()
+
+    await close_client()
+
+
 # Handle errors
 async def error(update, context):
     error = context.error
@@ -173,9 +512,15 @@ async def error(update, context):
 
 if __name__ == "__main__":
     print('▢ Starting bot...')
-    app = Application.builder().token(TOKEN).concurrent_updates(True).build()
+    app = Application.builder().token(TOKEN).concurrent_updates(True).post_init(startup).post_shutdown(shutdown).build()
 
     app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("stats", stats))
+    app.add_handler(CommandHandler("cheap", cheap))
+    app.add_handler(CommandHandler("history", history))
+    app.add_handler(CommandHandler("watch", watch))
+    app.add_handler(CommandHandler("unwatch", unwatch))
+    app.add_handler(CallbackQueryHandler(show_items, pattern=r"^items:"))
     app.add_handler(MessageHandler(filters.TEXT, handle_message))
     app.add_error_handler(error)
 
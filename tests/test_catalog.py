@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+import lib.websites_scraper as websites_scraper
+from lib.catalog import CatalogCrawler, CatalogIndex
+from lib.host_scheduler import HostScheduler
+from lib.websites_scraper import Product, WebsiteScraper
+
+
+STORE_URL = "http://store.test/search?q={query}&page={page}"
+
+
+def store_transport(failing_page=None):
+    def handler(request):
+        page = int(request.url.params["page"])
+
+        if page == failing_page:
+            return httpx.Response(503)
+        if page > 2:
+            return httpx.Response(404)
+
+        name = f"Knife {request.url.params['q']} {page}"
+        return httpx.Response(200, html=(
+            f'<div class="product-layout"><h4><a href="/{page}">{name}</a></h4><p class="price">1 00{page} грн</p></div>'
+        ))
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def stub_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(websites_scraper, "page_cache", None)
+    monkeypatch.setattr(websites_scraper, "parse_pool", None)
+    monkeypatch.setattr(websites_scraper, "host_scheduler", HostScheduler(rate_limit=0))
+
+    website = WebsiteScraper(
+        name="Stub", base_url=STORE_URL, search_query_url=STORE_URL, search_query_separator=" ",
+        product_container_class="product-layout",
+        extract_spec={"name": ["h4", "a"], "price": ".price", "stock": {"absent": "button[disabled]"}},
+        social_network="", tel_vodafone="", tel_kyivstar="",
+    )
+    return website, CatalogCrawler(CatalogIndex(str(tmp_path / "catalog.db")), lambda: [website], ["knife"], 3600)
+
+
+def crawl_and_lookup(crawler, website, transport):
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await crawler.crawl_website(website, client)
+        return await crawler.index.lookup([website], "knife", 3600)
+
+    results, _ = asyncio.run(run())
+    return sorted(product.name for product in results.get(website, []))
+
+
+def test_crawl_replaces_indexed_products(stub_store):
+    website, crawler = stub_store
+
+    assert crawl_and_lookup(crawler, website, store_transport()) == ["Knife knife 1", "Knife knife 2"]
+
+
+def test_failed_crawl_keeps_indexed_products(stub_store):
+    website, crawler = stub_store
+    asyncio.run(crawler.index.replace_scope(website.name, "knife", [Product("Knife old", "900", True, STORE_URL)]))
+
+    # The store fails on the second page, the crawl found only part of the products
+    assert crawl_and_lookup(crawler, website, store_transport(failing_page=2)) == ["Knife old"]
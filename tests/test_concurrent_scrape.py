@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+import lib.websites_scraper as websites_scraper
+from lib.host_scheduler import HostScheduler
+from lib.websites_scraper import WebsiteScraper
+
+
+# Number of result pages of every query, later pages repeat the last one as many stores do
+PAGES = 4
+PRODUCTS_PER_PAGE = 6
+
+QUERIES = ["leatherman wave", "leatherman surge", "victorinox huntsman"]
+
+
+def product_markup(query, number):
+    # Every third product is out of stock, so the stock rule runs concurrently too
+    stock = '<button disabled="disabled">Buy</button>' if number % 3 == 0 else "<button>Buy</button>"
+    price = format(1000 + len(query) * 10 + number, ",").replace(",", " ")
+    return (
+        f'<div class="product-layout"><h4><a href="/p/{number}">{query.title()} {number}</a></h4>'
+        f'<p class="price">{price} грн</p>{stock}</div>'
+    )
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parameters = parse_qs(urlsplit(self.path).query)
+        query = parameters["q"][0]
+        page = min(int(parameters["page"][0]), PAGES)
+
+        # Let responses of concurrent runs arrive interleaved
+        time.sleep(0.01)
+
+        products = "".join(
+            product_markup(query, (page - 1) * PRODUCTS_PER_PAGE + i) for i in range(PRODUCTS_PER_PAGE)
+        )
+        body = f"<html><body><div class=\"results\">{products}</div></body></html>".encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def store_url(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StoreHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Every run goes to the stub: no page cache, pages parsed in the test process, no rate limit
+    monkeypatch.setattr(websites_scraper, "page_cache", None)
+    monkeypatch.setattr(websites_scraper, "parse_pool", None)
+    monkeypatch.setattr(websites_scraper, "host_scheduler", HostScheduler(max_in_flight=16, rate_limit=0))
+
+    yield f"http://127.0.0.1:{server.server_address[1]}/search?q={{query}}&page={{page}}"
+
+    server.shutdown()
+    server.server_close()
+
+
+def build_website(store_url, parser, parse_only_containers):
+    return WebsiteScraper(
+        name=f"Stub {parser}",
+        base_url=store_url,
+        search_query_url=store_url,
+        search_query_separator=" ",
+        product_container_class="product-layout",
+        extract_spec={
+            "name": ["h4", "a"],
+            "price": ".price",
+            "stock": {"absent": "button[disabled=\"disabled\"]"},
+        },
+        social_network="",
+        tel_vodafone="",
+        tel_kyivstar="",
+        page_window=3,
+        parser=parser,
+        parse_only_containers=parse_only_containers,
+    )
+
+
+def product_fields(products):
+    return [(product.name, product.price, product.stock_status, product.url) for product in products]
+
+
+def expected_names(query):
+    return [
+        f"{query.title()} {number}"
+        for number in range(PAGES * PRODUCTS_PER_PAGE)
+        if number % 3 != 0
+    ]
+
+
+@pytest.mark.parametrize("parser, parse_only_containers", [("html.parser", False), ("lxml", True)])
+def test_concurrent_runs_on_one_website_return_identical_results(store_url, parser, parse_only_containers):
+    website = build_website(store_url, parser, parse_only_containers)
+
+    async def scrape_all():
+        async with httpx.AsyncClient() as client:
+            sequential = {query: await website.scrape_async(query, client) for query in QUERIES}
+
+            # Many runs of the same website at once, the queries interleaved
+            runs = [QUERIES[i % len(QUERIES)] for i in range(30)]
+            concurrent = await asyncio.gather(*(website.scrape_async(query, client) for query in runs))
+
+        return sequential, list(zip(runs, concurrent))
+
+    sequential, concurrent = asyncio.run(scrape_all())
+
+    for query in QUERIES:
+        assert [product.name for product in sequential[query]] == expected_names(query)
+
+    for query, products in concurrent:
+        assert product_fields(products) == product_fields(sequential[query])
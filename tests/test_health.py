@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from lib.health import StoreHealth
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def open_circuit(health):
+    for _ in range(health.failure_threshold):
+        assert health.allow()
+        health.record_failure(latency=1.0)
+    assert health.state == "open"
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    health = StoreHealth("store", failure_threshold=3, cool_down=60, window=10)
+
+    health.record_failure()
+    health.record_failure()
+    health.record_success()
+    health.record_failure()
+    health.record_failure()
+    assert health.state == "closed"
+
+    health.record_failure()
+    assert health.state == "open"
+    assert not health.allow()
+
+
+def test_circuit_is_half_open_after_cool_down_with_a_single_probe(clock):
+    health = StoreHealth("store", failure_threshold=3, cool_down=60, window=10)
+    open_circuit(health)
+
+    clock.now += 59
+    assert not health.allow()
+
+    clock.now += 1
+    assert health.allow()
+    assert health.state == "half_open"
+
+    # Other searches skip the website while the probe runs
+    assert not health.allow()
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    health = StoreHealth("store", failure_threshold=3, cool_down=60, window=10)
+    open_circuit(health)
+    clock.now += 60
+    assert health.allow()
+
+    health.record_success(latency=0.5)
+
+    assert health.state == "closed"
+    assert health.allow() and health.allow()
+
+
+def test_failed_probe_opens_the_circuit_again(clock):
+    health = StoreHealth("store", failure_threshold=3, cool_down=60, window=10)
+    open_circuit(health)
+    clock.now += 60
+    assert health.allow()
+
+    health.record_failure()
+
+    assert health.state == "open"
+    assert not health.allow()
+
+    # The cool-down starts again from the failed probe
+    clock.now += 59
+    assert not health.allow()
+    clock.now += 1
+    assert health.allow()
+
+
+def test_probe_which_never_reports_back_is_replaced(clock):
+    health = StoreHealth("store", failure_threshold=3, cool_down=60, window=10)
+    open_circuit(health)
+    clock.now += 60
+    assert health.allow()
+
+    clock.now += 60
+    assert health.allow()
+    assert not health.allow()
+
+
+def test_snapshot_reports_error_rate_and_latencies(clock):
+    health = StoreHealth("store", failure_threshold=3, cool_down=60, window=4)
+
+    for latency in (0.1, 0.2, 0.3):
+        health.record_success(latency)
+    health.record_failure(2.0)
+    health.record_success(0.4)
+
+    snapshot = health.snapshot()
+
+    # Only the last 4 requests are kept
+    assert snapshot["error_rate"] == 0.25
+    assert snapshot["latency_p50"] == 0.4
+    assert snapshot["latency_p95"] == 2.0
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from lib.host_scheduler import HostQueue, HostScheduler
+
+
+def test_searches_are_served_round_robin():
+    async def run():
+        queue = HostQueue(max_in_flight=1, rate_limit=0, burst=1)
+        order = []
+
+        async def request(key):
+            await queue.acquire(key)
+            order.append(key)
+            queue.release()
+
+        # Hold the only slot while both searches queue their requests
+        await queue.acquire("held")
+        tasks = [asyncio.create_task(request(key)) for key in ("a", "a", "a", "b", "b")]
+        await asyncio.sleep(0)
+        queue.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["a", "b", "a", "b", "a"]
+
+
+def test_rate_limit_delays_requests_until_a_token_is_earned():
+    async def run():
+        queue = HostQueue(max_in_flight=10, rate_limit=20, burst=1)
+        started_at = time.monotonic()
+        admitted_at = []
+
+        async def request():
+            await queue.acquire(None)
+            admitted_at.append(time.monotonic() - started_at)
+
+        await asyncio.gather(*(request() for _ in range(3)))
+        return admitted_at, queue.in_flight, queue.wakeup
+
+    admitted_at, in_flight, wakeup = asyncio.run(run())
+
+    # One request per 50 ms after the burst, admitted by the wakeup timer while no request finishes
+    assert admitted_at[0] < 0.02
+    assert admitted_at[1] >= 0.045
+    assert admitted_at[2] >= 0.095
+    assert in_flight == 3
+    assert wakeup is None
+
+
+def test_slot_granted_right_before_cancellation_is_released():
+    async def run():
+        queue = HostQueue(max_in_flight=1, rate_limit=0, burst=1)
+        await queue.acquire(None)
+
+        waiting = asyncio.create_task(queue.acquire("a"))
+        await asyncio.sleep(0)
+
+        # The slot is handed to the waiting request, which is cancelled before it resumes
+        queue.release()
+        assert queue.in_flight == 1
+        waiting.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        in_flight = queue.in_flight
+        await asyncio.wait_for(queue.acquire("b"), timeout=1)
+        return in_flight
+
+    assert asyncio.run(run()) == 0
+
+
+def test_cancelled_waiter_is_skipped():
+    async def run():
+        queue = HostQueue(max_in_flight=1, rate_limit=0, burst=1)
+        await queue.acquire(None)
+
+        cancelled = asyncio.create_task(queue.acquire("a"))
+        waiting = asyncio.create_task(queue.acquire("b"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        queue.release()
+        await asyncio.wait_for(waiting, timeout=1)
+        return queue.in_flight, queue.waiters
+
+    assert asyncio.run(run()) == (1, {})
+
+
+def test_scheduler_keeps_a_queue_per_host():
+    async def run():
+        scheduler = HostScheduler(max_in_flight=1, rate_limit=0, burst=1)
+
+        async with scheduler.slot("https://a.test/search?q=1"):
+            # Another host is not blocked by the busy one
+            async with scheduler.slot("https://b.test/search?q=1"):
+                stats = scheduler.stats()
+
+        return stats, scheduler.stats()
+
+    during, after = asyncio.run(run())
+
+    assert during == {"a.test": {"in_flight": 1, "waiting": 0}, "b.test": {"in_flight": 1, "waiting": 0}}
+    assert after == {"a.test": {"in_flight": 0, "waiting": 0}, "b.test": {"in_flight": 0, "waiting": 0}}
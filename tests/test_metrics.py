@@ -0,0 +1,55 @@
+import asyncio
+
+from lib import health, host_scheduler, scraper
+from lib.health import HealthRegistry
+from lib.host_scheduler import HostScheduler
+from lib.metrics import render_metrics
+from lib.result_cache import ResultCache
+
+
+async def compute_result():
+    return {"results": [], "timed_out": []}
+
+
+def test_result_cache_counters_are_exposed(monkeypatch):
+    monkeypatch.setattr(scraper, "result_cache", ResultCache(ttl=60, maxsize=8))
+
+    async def search_twice():
+        await scraper.result_cache.get_or_compute("knife", compute_result)
+        await scraper.result_cache.get_or_compute("knife", compute_result)
+
+    asyncio.run(search_twice())
+    lines = render_metrics().splitlines()
+
+    assert 'result_cache_requests_total{result="hit"} 1' in lines
+    assert 'result_cache_requests_total{result="miss"} 1' in lines
+    assert 'result_cache_entries{state="cached"} 1' in lines
+
+
+def test_store_health_is_exposed(monkeypatch):
+    registry = HealthRegistry(failure_threshold=2, cool_down=60, window=10)
+    monkeypatch.setattr(health, "store_health", registry)
+
+    registry.get("Stub").record_success(0.2)
+    registry.get("Stub").record_failure(1.0)
+    registry.get("Stub").record_failure(1.0)
+
+    lines = render_metrics().splitlines()
+
+    assert 'store_circuit_state{store="Stub",state="open"} 1' in lines
+    assert 'store_circuit_state{store="Stub",state="closed"} 0' in lines
+    assert 'store_consecutive_failures{store="Stub"} 2' in lines
+    assert 'store_request_latency_seconds{store="Stub",quantile="0.95"} 1.0' in lines
+
+
+def test_host_load_is_exposed(monkeypatch):
+    monkeypatch.setattr(host_scheduler, "host_scheduler", HostScheduler(max_in_flight=1, rate_limit=0))
+
+    async def hold_slot():
+        async with host_scheduler.host_scheduler.slot("https://store.test/search"):
+            return render_metrics().splitlines()
+
+    lines = asyncio.run(hold_slot())
+
+    assert 'host_requests{host="store.test",state="in_flight"} 1' in lines
+    assert 'host_requests{host="store.test",state="waiting"} 0' in lines
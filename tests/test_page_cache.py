@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from lib.page_cache import PageCache, is_cacheable
+
+
+URL = "https://store.test/search?q=knife&page=1"
+
+
+def create_cache(tmp_path, **kwargs):
+    return PageCache(str(tmp_path / "pages.db"), ttl=300, max_age=3600, **kwargs)
+
+
+@pytest.mark.parametrize("cache_control, expected", [
+    (None, True),
+    ("max-age=60, public", True),
+    ("no-store", False),
+    ("Private, max-age=0", False),
+    ("no-cache", True),
+])
+def test_is_cacheable(cache_control, expected):
+    assert is_cacheable(cache_control) == expected
+
+
+def test_database_is_opened_on_first_use(tmp_path):
+    cache = create_cache(tmp_path)
+    assert not (tmp_path / "pages.db").exists()
+
+    assert asyncio.run(cache.get(URL)) is None
+    assert (tmp_path / "pages.db").exists()
+
+
+def test_pages_are_written_in_batches_and_read_back(tmp_path):
+    async def run():
+        cache = create_cache(tmp_path)
+        cache.put(URL, b"<html>page</html>", etag='"1"')
+
+        # Served from memory before anything is written
+        assert (await cache.get(URL)).content == b"<html>page</html>"
+        await cache.flush()
+
+        reopened = create_cache(tmp_path)
+        page = await reopened.get(URL)
+        return page.content, page.etag
+
+    assert asyncio.run(run()) == (b"<html>page</html>", '"1"')
+
+
+def test_uncacheable_response_replaces_cached_page(tmp_path):
+    async def run():
+        cache = create_cache(tmp_path)
+        cache.put(URL, b"<html>page</html>")
+        await cache.flush()
+
+        cache.put(URL, b"<html>private</html>", cache_control="private")
+        await cache.flush()
+
+        return await cache.get(URL), await create_cache(tmp_path).get(URL)
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_least_recently_used_pages_leave_memory(tmp_path):
+    async def run():
+        cache = create_cache(tmp_path, memory_size=10)
+        cache.put("https://store.test/1", b"123456")
+        cache.put("https://store.test/2", b"123456")
+        in_memory = list(cache.pages)
+
+        # The evicted page is still served from the database once written
+        await cache.flush()
+        page = await cache.get("https://store.test/1")
+        return in_memory, page.content
+
+    assert asyncio.run(run()) == (["https://store.test/2"], b"123456")
+
+
+def test_revalidated_page_is_fresh_again(tmp_path):
+    async def run():
+        cache = create_cache(tmp_path)
+        cache.put(URL, b"<html>page</html>")
+        await cache.flush()
+
+        reopened = create_cache(tmp_path)
+        page = await reopened.get(URL)
+        page.stored_at -= 600
+        assert not reopened.is_fresh(page)
+
+        reopened.revalidated(URL, page)
+        await reopened.flush()
+
+        final = create_cache(tmp_path)
+        return final.is_fresh(await final.get(URL))
+
+    assert asyncio.run(run())
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from bs4 import SoupStrainer
+
+from lib.store_registry import STORES_FILE, build_websites
+
+
+# Pages covering the markup the lxml container path has to hand to BeautifulSoup unchanged,
+# "{container}" is replaced with the product container class of a store
+PAGES = {
+    "bare boolean attributes": """
+        <html><body><ul class="menu"><li><a href="/">Home</a></li></ul>
+        <div class="{container}"><h4><a href="/1">Knife A</a></h4><p class="price">1 200 грн</p>
+          <button disabled>Buy</button><input type="checkbox" checked></div>
+        <div class="{container}"><h4><a href="/2">Knife B</a></h4><p class="price">900 грн</p>
+          <select><option selected>1</option></select><button>Buy</button></div>
+        </body></html>""",
+    "boolean attributes with values": """
+        <html><body>
+        <div class="{container}"><h4><a href="/1">Knife A</a></h4><p class="price">1 200 грн</p>
+          <button disabled="disabled">Buy</button></div>
+        <div class="{container}"><h4><a href="/2">Knife B</a></h4><p class="price">900 грн</p>
+          <button disabled>Buy</button><input readonly=""></div>
+        </body></html>""",
+    "boolean attributes with values outside containers": """
+        <html><head><script defer="defer" src="/app.js"></script></head><body>
+        <select name="sort"><option selected="selected">Price</option></select>
+        <div class="{container}"><h4><a href="/1">Knife A</a></h4><p class="price">1 200 грн</p>
+          <button disabled>Buy</button><input disabled="true"></div>
+        </body></html>""",
+    "start tags over several lines": """
+        <html><body>
+        <div class="{container}"><h4><a href="/1">Knife A</a></h4><p class="price">1 200 грн</p>
+          <button
+            class="buy"
+            disabled="disabled"
+          >Buy</button></div>
+        <div class="{container}"><h4><a href="/2">Knife B</a></h4><p class="price">900 грн</p>
+          <button class="buy"
+            disabled>Buy</button></div>
+        </body></html>""",
+    "entities and void elements": """
+        <html><body>
+        <div class="{container} extra" data-id="7"><h4><a href="/1?a=1&amp;b=2">Knife &amp; sheath</a></h4>
+          <img src="/1.jpg" alt="Knife"><br><p class="price">1&nbsp;200 грн</p></div>
+        </body></html>""",
+    "nested containers": """
+        <html><body>
+        <div class="{container}"><h4><a href="/1">Kit</a></h4><p class="price">3 000 грн</p>
+          <div class="{container}"><h4><a href="/2">Knife</a></h4><p class="price">1 000 грн</p></div></div>
+        </body></html>""",
+    "no containers": "<html><body><p>Nothing found</p></body></html>",
+}
+
+
+def build_pair():
+    """
+    Build every store twice: as configured and with the full html.parser parse used as the baseline.
+    """
+    with open(STORES_FILE, encoding="utf-8") as stores_file:
+        config = json.load(stores_file)
+
+    baseline_config = {
+        "defaults": {**config.get("defaults", {}), "parser": "html.parser", "parse_only_containers": False},
+        "stores": [{**store, "parser": "html.parser", "parse_only_containers": False} for store in config["stores"]],
+    }
+
+    return list(zip(build_websites(config), build_websites(baseline_config)))
+
+
+WEBSITE_PAIRS = build_pair()
+
+
+def parsed_containers(website, content):
+    soup = website.parse_html(content)
+    return [str(container) for container in soup.find_all(class_=website.product_container_class)]
+
+
+@pytest.mark.parametrize("page", PAGES)
+@pytest.mark.parametrize("website, baseline", WEBSITE_PAIRS, ids=[website.name for website, _ in WEBSITE_PAIRS])
+@pytest.mark.parametrize("encoding", ["utf-8", "cp1251"])
+def test_containers_match_html_parser(website, baseline, page, encoding):
+    markup = PAGES[page].replace("{container}", website.product_container_class)
+
+    if encoding != "utf-8":
+        markup = markup.replace("<html>", f'<html><head><meta charset="{encoding}"></head>')
+
+    content = markup.encode(encoding)
+
+    assert parsed_containers(website, content) == parsed_containers(baseline, content)
+
+
+@pytest.mark.parametrize("website, baseline", WEBSITE_PAIRS, ids=[website.name for website, _ in WEBSITE_PAIRS])
+def test_extraction_matches_html_parser(website, baseline):
+    for page in PAGES.values():
+        content = page.replace("{container}", website.product_container_class).encode()
+
+        assert [
+            website.extraction_spec.extract(container)
+            for container in website.parse_html(content).find_all(class_=website.product_container_class)
+        ] == [
+            baseline.extraction_spec.extract(container)
+            for container in baseline.parse_html(content).find_all(class_=baseline.product_container_class)
+        ]
+
+
+def test_bare_disabled_button_keeps_product():
+    website, baseline = next(pair for pair in WEBSITE_PAIRS if pair[0].name == "Ataka")
+    content = PAGES["bare boolean attributes"].replace("{container}", website.product_container_class).encode()
+
+    products = website.parse_page(content, frozenset({"knife"}), None, "https://example.com")[1]
+
+    assert len(products) == 2
+    assert products == baseline.parse_page(content, frozenset({"knife"}), None, "https://example.com")[1]
+
+
+def test_boolean_attributes_outside_containers_keep_the_lxml_path():
+    website = next(website for website, _ in WEBSITE_PAIRS if website.container_xpath is not None)
+    content = PAGES["boolean attributes with values outside containers"].replace(
+        "{container}", website.product_container_class
+    ).encode()
+
+    # The SoupStrainer fallback would find no containers
+    website.container_strainer = SoupStrainer(class_="no-such-class")
+    try:
+        assert len(parsed_containers(website, content)) == 1
+    finally:
+        website.container_strainer = SoupStrainer(class_=website.product_container_class)
@@ -0,0 +1,24 @@
+import asyncio
+
+from lib.price_history import PriceHistory
+from lib.websites_scraper import Product
+
+
+def test_database_is_opened_on_first_use(tmp_path):
+    history = PriceHistory(str(tmp_path / "prices.db"), max_age=86400)
+    assert not (tmp_path / "prices.db").exists()
+
+    results = [{
+        "website": "store", "price_uah_min": 900, "price_uah_max": 1200, "products_qty": 2,
+        "products": [Product("Ніж", "900", True), Product("Ніж складний", "1200", True)],
+    }]
+
+    async def run():
+        history.record("ніж", results)
+        return await history.trend("ніж")
+
+    trend = asyncio.run(run())
+
+    assert (tmp_path / "prices.db").exists()
+    assert [(day_min, stores) for _, day_min, stores in trend["daily"]] == [(900, 1)]
+    assert trend["lowest"][:3] == ("Ніж", "store", 900)
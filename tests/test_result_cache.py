@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from lib import scraper
+from lib.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    cache = ResultCache(ttl=60, maxsize=10)
+
+    cache.put("knife", "result")
+    clock.now += 59
+    assert cache.get("knife") == "result"
+
+    clock.now += 1
+    assert cache.get("knife") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(ttl=60, maxsize=2)
+
+    cache.put("knife", 1)
+    cache.put("axe", 2)
+    cache.get("knife")
+    cache.put("saw", 3)
+
+    assert cache.get("axe") is None
+    assert cache.get("knife") == 1
+    assert cache.get("saw") == 3
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResultCache(ttl=60, maxsize=10)
+    calls = []
+
+    async def search():
+        calls.append(1)
+        return {"timed_out": True}
+
+    async def run():
+        for _ in range(2):
+            await cache.get_or_compute("knife", search, cacheable=lambda result: not result["timed_out"])
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
+    assert cache.stats() == {"hits": 0, "misses": 2, "coalesced": 0, "size": 0, "in_flight": 0}
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = ResultCache(ttl=60, maxsize=10)
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"timed_out": False}
+
+    async def run():
+        results = await asyncio.gather(cache.get_or_compute("knife", search), cache.get_or_compute("knife", search))
+        return results, await cache.get_or_compute("knife", search)
+
+    (first, second), third = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert first is second is third
+    assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 1, "size": 1, "in_flight": 0}
+
+
+def test_cheapest_search_counts_a_cached_complete_search_as_hit(monkeypatch):
+    cache = ResultCache(ttl=60, maxsize=10)
+    monkeypatch.setattr(scraper, "result_cache", cache)
+    cache.put("ніж", {"query": "ніж", "results": [], "timed_out": False, "skipped": [], "catalog_time": None})
+
+    _, search_result = asyncio.run(scraper.generate_cheapest_output("Ніж"))
+
+    assert search_result["query"] == "ніж"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 0
@@ -0,0 +1,115 @@
+import importlib
+import json
+import os
+
+import pytest
+
+from lib.store_registry import STORES_FILE, StoreRegistry, build_websites
+
+store_registry_module = importlib.import_module("lib.store_registry")
+
+
+def load_config():
+    with open(STORES_FILE, encoding="utf-8") as stores_file:
+        return json.load(stores_file)
+
+
+def store_definition(name="Store"):
+    config = load_config()
+    store = next(store for store in config["stores"] if store.get("enabled", True))
+    return {**store, "name": name}
+
+
+def write_stores(path, stores, mtime_ns=None):
+    path.write_text(json.dumps({"stores": stores}), encoding="utf-8")
+
+    # Make every write change the file signature, even within the file system's timestamp resolution
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_configured_stores_are_valid():
+    assert build_websites(load_config())
+
+
+def test_disabled_stores_are_not_built():
+    websites = build_websites({"stores": [store_definition("A"), {**store_definition("B"), "enabled": False}]})
+
+    assert [website.name for website in websites] == ["A"]
+
+
+@pytest.mark.parametrize("config, message", [
+    ({"stores": {}}, "'stores' list"),
+    ({"stores": ["Store"]}, "must be an object"),
+    ({"stores": [{key: value for key, value in store_definition().items() if key != "base_url"}]}, "missing keys: base_url"),
+    ({"stores": [{**store_definition(), "colour": "red"}]}, "unknown keys: colour"),
+    ({"stores": [store_definition("A"), {**store_definition("A"), "enabled": False}]}, "defined more than once"),
+    ({"stores": [{**store_definition(), "base_url": "https://store.test/"}]}, "{query} placeholder"),
+])
+def test_invalid_definitions_are_rejected(config, message):
+    with pytest.raises(ValueError, match=message.replace("{", r"\{").replace("}", r"\}")):
+        build_websites(config)
+
+
+def test_defaults_apply_to_every_store():
+    websites = build_websites({"defaults": {"parser": "html.parser"}, "stores": [store_definition("A"), store_definition("B")]})
+
+    assert [website.parser for website in websites] == ["html.parser", "html.parser"]
+
+
+def test_changed_file_is_picked_up(tmp_path):
+    path = tmp_path / "stores.json"
+    write_stores(path, [store_definition("A")], mtime_ns=1_000_000_000)
+    registry = StoreRegistry(str(path), reload_interval=0)
+
+    assert [website.name for website in registry.get_websites()] == ["A"]
+
+    write_stores(path, [store_definition("A"), store_definition("B")], mtime_ns=2_000_000_000)
+
+    assert [website.name for website in registry.get_websites()] == ["A", "B"]
+
+
+def test_broken_file_keeps_previous_stores_and_is_not_retried(tmp_path, monkeypatch):
+    path = tmp_path / "stores.json"
+    write_stores(path, [store_definition("A")], mtime_ns=1_000_000_000)
+    registry = StoreRegistry(str(path), reload_interval=0)
+    websites = registry.get_websites()
+
+    builds = []
+    monkeypatch.setattr(store_registry_module, "build_websites", lambda config: builds.append(config) or build_websites(config))
+
+    write_stores(path, [store_definition("A"), store_definition("A")], mtime_ns=2_000_000_000)
+
+    assert registry.get_websites() is websites
+    assert registry.get_websites() is websites
+    assert len(builds) == 1
+
+    # A fixed file is loaded again
+    write_stores(path, [store_definition("B")], mtime_ns=3_000_000_000)
+
+    assert [website.name for website in registry.get_websites()] == ["B"]
+
+
+def test_missing_file_fails_the_first_load_only(tmp_path):
+    path = tmp_path / "stores.json"
+    registry = StoreRegistry(str(path), reload_interval=0)
+
+    with pytest.raises(OSError):
+        registry.get_websites()
+
+    write_stores(path, [store_definition("A")])
+    websites = registry.get_websites()
+    path.unlink()
+
+    assert registry.get_websites() is websites
+
+
+def test_file_is_checked_once_per_reload_interval(tmp_path):
+    path = tmp_path / "stores.json"
+    write_stores(path, [store_definition("A")], mtime_ns=1_000_000_000)
+    registry = StoreRegistry(str(path), reload_interval=3600)
+    registry.get_websites()
+
+    write_stores(path, [store_definition("B")], mtime_ns=2_000_000_000)
+
+    assert [website.name for website in registry.get_websites()] == ["A"]
@@ -0,0 +1,38 @@
+import pytest
+
+from lib.websites_scraper import match_tokens, tokenize
+
+
+def test_tokenize_normalizes_and_stems():
+    assert tokenize("Рюкзаки, ТАКТИЧНІ!") == frozenset({"рюкзак", "тактичн"})
+    assert tokenize("Glock 19") == frozenset({"glock", "19"})
+
+
+def test_tokenize_keeps_short_stems_whole():
+    assert tokenize("шолом") == frozenset({"шолом"})
+    assert tokenize("Шоломи") == tokenize("Шолома") == frozenset({"шолом"})
+
+
+@pytest.mark.parametrize("query, name", [
+    ("рюкзаки", "Рюкзак тактичний 40 л"),
+    ("куртки", "Куртка софтшел"),
+    ("шолом", "Шоломи балістичні"),
+    ("шолом", "Чохол для шолома"),
+    ("glock 19", "Glock 19 Gen5"),
+    ("ліхт", "Ліхтар налобний"),
+])
+def test_match_tokens_matches(query, name):
+    assert match_tokens(tokenize(query), tokenize(name))
+
+
+@pytest.mark.parametrize("query, name", [
+    # Numbers and model codes are not prefixes
+    ("ліхтар 1000", "Ліхтар 10000 люмен"),
+    ("glock 1911", "Glock 19110"),
+    ("ak47", "ak470"),
+    # Short stems match only exactly
+    ("ніж", "Ніжка штатива"),
+    ("рюкзак", "Куртка софтшел"),
+])
+def test_match_tokens_rejects(query, name):
+    assert not match_tokens(tokenize(query), tokenize(name))
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from lib.watchlist import WatchList, WatchScheduler, parse_watch_request
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("мультитул leatherman до 3000", ("мультитул leatherman", 3000)),
+    ("ніж <=3000", ("ніж", 3000)),
+    ("ніж <= 3 000 грн", ("ніж", 3000)),
+    ("ніж ≤2500₴", ("ніж", 2500)),
+    ("ніж ДО 100", ("ніж", 100)),
+    # Numbers without a marker belong to the product
+    ("glock 17", ("glock 17", None)),
+    ("вода до 3 л", ("вода до 3 л", None)),
+    # "до" followed by a word is a preposition
+    ("чохол до ножа", ("чохол до ножа", None)),
+])
+def test_parse_watch_request(text, expected):
+    assert parse_watch_request(text) == expected
+
+
+@pytest.mark.parametrize("text", ["ніж до ²", "ніж до 3000.5", "ніж <=", "ніж <=99999999999"])
+def test_parse_watch_request_rejects_invalid_prices(text):
+    with pytest.raises(ValueError):
+        parse_watch_request(text)
+
+
+def make_scheduler(tmp_path, **kwargs):
+    watch_list = WatchList(str(tmp_path / "watches.db"), limit=10)
+
+    async def search(query):
+        return {"results": [{"website": "store", "price_uah_min": 900}], "timed_out": False, "skipped": []}
+
+    def format_alert(query, cheapest, max_price):
+        return f"{query}: {cheapest['price_uah_min']}"
+
+    return WatchScheduler(watch_list, search, format_alert, interval=3600, concurrency=2, **kwargs)
+
+
+def test_check_query_saves_prices_of_notified_chats_when_a_notification_fails(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    sent = []
+
+    async def notify(chat_id, text):
+        sent.append(chat_id)
+        if chat_id == 2:
+            raise RuntimeError("flood limit")
+
+    async def scenario():
+        for chat_id in (1, 2, 3):
+            await scheduler.watch_list.add(chat_id, "ніж", max_price=1000)
+        await scheduler.check(notify)
+        first = list(sent)
+        sent.clear()
+        await scheduler.check(notify)
+        return first, list(sent)
+
+    first, second = asyncio.run(scenario())
+
+    # Chat 3 is notified despite the failure before it, and only the failed chat is retried
+    assert first == [1, 2, 3]
+    assert second == [2]
+    watches = asyncio.run(scheduler.watch_list.all_watches())
+    assert sorted(watches["ніж"]) == [(1, 1000, 900), (2, 1000, None), (3, 1000, 900)]
+
+
+def test_check_query_paces_notifications(tmp_path):
+    scheduler = make_scheduler(tmp_path, alert_interval=0.05)
+    sent_at = []
+
+    async def notify(chat_id, text):
+        sent_at.append(time.monotonic())
+
+    async def scenario():
+        for chat_id in (1, 2, 3):
+            await scheduler.watch_list.add(chat_id, "ніж", max_price=1000)
+        await scheduler.check(notify)
+
+    asyncio.run(scenario())
+
+    assert len(sent_at) == 3
+    assert all(later - earlier >= 0.045 for earlier, later in zip(sent_at, sent_at[1:]))